@@ -0,0 +1,77 @@
+# assets.py
+import gzip
+import hashlib
+import os
+
+# brotli es opcional: si no está, solo se sirve gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# =========================================================
+# ASSETS DEL PANEL (construidos una vez al arrancar)
+# =========================================================
+WEB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "web")
+ASSET_URL_PREFIX = "/assets/"
+
+# assets con hash en la URL: se cachean "para siempre"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# shell HTML: siempre revalida con ETag
+SHELL_CACHE = "no-cache"
+
+MIMETYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+}
+
+
+class Asset:
+    """Contenido + variantes precomprimidas + ETag, todo calculado una sola vez."""
+
+    __slots__ = ("name", "mimetype", "etag", "variants")
+
+    def __init__(self, name: str, body: bytes, mimetype: str):
+        digest = hashlib.sha256(body).hexdigest()
+        self.name = name
+        self.mimetype = mimetype
+        self.etag = f'"{digest[:16]}"'
+        self.variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+
+    def pick(self, accept_encoding: str):
+        """Elige la variante más chica que acepte el cliente -> (encoding, bytes)."""
+        accepted = {e.split(";")[0].strip() for e in (accept_encoding or "").lower().split(",")}
+        for enc in ("br", "gzip"):
+            if enc in accepted and enc in self.variants:
+                return enc, self.variants[enc]
+        return "identity", self.variants["identity"]
+
+
+def _read(name: str) -> bytes:
+    with open(os.path.join(WEB_DIR, name), "rb") as f:
+        return f.read()
+
+
+def build_assets():
+    """
+    Lee web/, pone el hash del contenido en el nombre de css/js y arma el shell
+    HTML apuntando a esas URLs. Devuelve (shell, {nombre_con_hash: Asset}).
+    """
+    hashed = {}
+    urls = {}
+    for name in ("dashboard.css", "dashboard.js"):
+        body = _read(name)
+        base, ext = os.path.splitext(name)
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        hashed_name = f"{base}.{digest}{ext}"
+        hashed[hashed_name] = Asset(hashed_name, body, MIMETYPES[ext])
+        urls[ext.lstrip(".") + "_url"] = ASSET_URL_PREFIX + hashed_name
+
+    html = _read("dashboard.html").decode("utf-8")
+    for key, url in urls.items():
+        html = html.replace("{{" + key + "}}", url)
+    shell = Asset("dashboard.html", html.encode("utf-8"), MIMETYPES[".html"])
+    return shell, hashed
@@ -0,0 +1,61 @@
+# bench_klines.py
+"""
+Benchmark de decodificación de klines (payload sintético de 1000 velas).
+
+    python bench_klines.py
+"""
+import json
+import random
+import timeit
+
+import candles
+from candles import Candles, decode_klines
+
+BARS = 1000
+NUMBER = 200
+
+
+def make_payload(bars: int = BARS) -> bytes:
+    rows = []
+    price = 100.0
+    t0 = 1_700_000_000_000
+    for i in range(bars):
+        o = price
+        price += random.uniform(-1, 1)
+        rows.append([
+            t0 + i * 60000, f"{o:.8f}", f"{max(o, price) + 0.5:.8f}",
+            f"{min(o, price) - 0.5:.8f}", f"{price:.8f}", "1234.567",
+            t0 + i * 60000 + 59999, "98765.4321", 321, "600.1", "49000.2", "0",
+        ])
+    return json.dumps(rows, separators=(",", ":")).encode()
+
+
+def legacy_dicts(raw: bytes):
+    # lo que hacía get_klines antes: json + dict + float() por vela
+    return [
+        {
+            "open_time": k[0],
+            "open": float(k[1]),
+            "high": float(k[2]),
+            "low": float(k[3]),
+            "close": float(k[4]),
+            "close_time": k[6],
+        }
+        for k in json.loads(raw)
+    ]
+
+
+def bench(label, fn):
+    best = min(timeit.repeat(fn, number=NUMBER, repeat=5)) / NUMBER
+    print(f"{label:<28} {best * 1000:8.3f} ms / payload")
+
+
+if __name__ == "__main__":
+    raw = make_payload()
+    print(f"payload: {BARS} velas, {len(raw)} bytes")
+    bench("json + dicts (antes)", lambda: legacy_dicts(raw))
+    bench("json + Candles", lambda: Candles.from_klines(json.loads(raw)))
+    bench("flat puro Python", lambda: candles._decode_flat(raw))
+    if candles.orjson is not None:
+        bench("orjson + Candles", lambda: Candles.from_klines(candles.orjson.loads(raw)))
+    bench("decode_klines (activo)", lambda: decode_klines(raw))
@@ -0,0 +1,235 @@
+# chart.py
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+from candles import TF_MS
+from db import load_candles, load_candle_buckets, load_close_extremes, save_candles, iter_patterns, PATTERN_COLUMNS, POINTS
+from kline_cache import SingleFlight, fetch_klines, last_closed_open_time
+from ratelimit import PRIORITY_BACKFILL, RateLimited
+
+# =========================================================
+# CONFIG
+# =========================================================
+CHART_DEFAULT_BARS = 1000    # sin start: las últimas N velas
+CHART_BACKFILL_LIMIT = 1500  # máximo de /fapi/v1/klines por pedido
+CHART_MAX_BARS = 5000        # tope de `bars` (son velas leídas de la base por pedido)
+# mode=lttb con rango grande: SQLite reduce a ~N × width puntos (min/max) y LTTB sigue desde ahí
+CHART_LTTB_PREREDUCE = 4
+CHART_CACHE_SIZE = 128
+# respaldo por si la última vela todavía no estaba guardada al armar la respuesta
+CHART_CACHE_TTL_S = 30
+
+
+
+
+class ChartError(Exception):
+    """No se puede armar el gráfico; `status` es el código HTTP para /candles."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+# =========================================================
+# DOWNSAMPLING
+# =========================================================
+def minmax_ohlc(candles, width: int) -> dict:
+    """
+    Agrupa las velas en `width` buckets contiguos: open del primero, close del
+    último, máximo de highs y mínimo de lows. Mechas y extremos se conservan,
+    que es lo que se ve en un gráfico de velas.
+    """
+    n = len(candles)
+    t, o, h, l, c = candles.open_time, candles.open, candles.high, candles.low, candles.close
+    if n <= width:
+        return {"t": t.tolist(), "o": o.tolist(), "h": h.tolist(), "l": l.tolist(), "c": c.tolist()}
+    out = {"t": [], "o": [], "h": [], "l": [], "c": []}
+    for k in range(width):
+        a = k * n // width
+        b = (k + 1) * n // width
+        out["t"].append(t[a])
+        out["o"].append(o[a])
+        out["h"].append(max(h[a:b]))
+        out["l"].append(min(l[a:b]))
+        out["c"].append(c[b - 1])
+    return out
+
+
+def lttb(xs, ys, threshold: int) -> list:
+    """Largest-Triangle-Three-Buckets: índices de los puntos que mejor conservan la forma."""
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    idx = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # promedio del bucket siguiente (tercer vértice)
+        nxt_lo = int((i + 1) * every) + 1
+        nxt_hi = min(int((i + 2) * every) + 1, n)
+        span = nxt_hi - nxt_lo
+        avg_x = sum(xs[nxt_lo:nxt_hi]) / span
+        avg_y = sum(ys[nxt_lo:nxt_hi]) / span
+
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        idx.append(best)
+        a = best
+    idx.append(n - 1)
+    return idx
+
+
+# =========================================================
+# ARMADO DE LA RESPUESTA
+# =========================================================
+def _pattern_overlay(symbol, tf, start, end) -> list:
+    """Patrones guardados con D dentro del rango, con sus puntos XABCD."""
+    out = []
+    for r in iter_patterns(symbol=symbol, timeframe=tf, d_from=start, d_to=end):
+        row = dict(zip(PATTERN_COLUMNS, r))
+        out.append({
+            "id": row["id"],
+            "pattern_type": row["pattern_type"],
+            "direction": row["direction"],
+            "score": row["score"],
+            "points": [{"p": p.upper(), "time": row[f"{p}_time"], "price": row[f"{p}_price"]}
+                       for p in POINTS],
+        })
+    return out
+
+
+def _response(symbol, tf, mode, start, end, bars, series) -> dict:
+    return {
+        "symbol": symbol,
+        "tf": tf,
+        "mode": mode,
+        "start": start,
+        "end": end,
+        "bars": bars,
+        "points": len(series["t"]),
+        "series": series,
+        "patterns": _pattern_overlay(symbol, tf, start, end + TF_MS[tf]) if bars else [],
+    }
+
+
+def _backfill(symbol: str, tf: str, bars: int, symbol_ok=None):
+    """
+    Baja lo reciente (cerradas) y lo guarda. Solo para símbolos que pasan
+    symbol_ok: /candles es público y cada pedido gasta peso de la API.
+    """
+    if symbol_ok is not None and not symbol_ok(symbol):
+        raise ChartError(f"símbolo desconocido: {symbol}", 404)
+    try:
+        fetched = fetch_klines(symbol, tf, min(bars + 1, CHART_BACKFILL_LIMIT),
+                               priority=PRIORITY_BACKFILL)
+    except requests.HTTPError as e:
+        # Binance responde 400 a un símbolo inválido
+        status = 404 if e.response is not None and e.response.status_code == 400 else 502
+        raise ChartError(f"sin velas para {symbol}: {e}", status) from None
+    except (RateLimited, requests.RequestException) as e:
+        raise ChartError(f"no se pudieron bajar velas de {symbol}: {e}", 503) from None
+    save_candles(symbol, tf, fetched[:-1])
+
+
+def build_chart(symbol: str, tf: str, start: int | None, end: int,
+                width: int, mode: str = "ohlc", bars: int = CHART_DEFAULT_BARS,
+                symbol_ok=None) -> dict:
+    tf_ms = TF_MS[tf]
+    if mode == "ohlc" and start is not None and (end - start) // tf_ms + 1 > width:
+        # rango grande: se agrega dentro de SQLite (un año de 1m sin cargar 500k velas)
+        bucket_ms = -(-(end - start + tf_ms) // width)
+        bucket_ms = -(-bucket_ms // tf_ms) * tf_ms
+        agg = load_candle_buckets(symbol, tf, start, end, bucket_ms)
+        series = agg["series"]
+        first = series["t"][0] if series["t"] else start
+        return _response(symbol, tf, mode, first, end, agg["bars"], series)
+
+    if mode == "lttb" and start is not None and (end - start) // tf_ms + 1 > CHART_LTTB_PREREDUCE * width:
+        # igual para la línea: min/max de cierres por bucket en SQLite, LTTB sobre eso
+        buckets = max(1, CHART_LTTB_PREREDUCE * width // 2)
+        bucket_ms = -(-(end - start + tf_ms) // buckets)
+        bucket_ms = -(-bucket_ms // tf_ms) * tf_ms
+        agg = load_close_extremes(symbol, tf, start, end, bucket_ms)
+        xs, ys = agg["series"]["t"], agg["series"]["c"]
+        keep = lttb(xs, ys, width)
+        series = {"t": [xs[i] for i in keep], "c": [ys[i] for i in keep]}
+        return _response(symbol, tf, mode, xs[0] if xs else start, end, agg["bars"], series)
+
+    candles = load_candles(symbol, tf, start=start, end=end,
+                           limit=None if start is not None else bars)
+    if not len(candles) and start is None:
+        # nada local todavía: bajamos lo reciente (cerradas) y lo guardamos
+        _backfill(symbol, tf, bars, symbol_ok)
+        candles = load_candles(symbol, tf, end=end, limit=bars)
+
+    n = len(candles)
+    if mode == "lttb":
+        xs, ys = candles.open_time, candles.close
+        keep = lttb(xs, ys, width)
+        series = {"t": [xs[i] for i in keep], "c": [ys[i] for i in keep]}
+    else:
+        series = minmax_ohlc(candles, width)
+
+    first = candles.open_time[0] if n else start
+    return _response(symbol, tf, mode, first, end, n, series)
+
+
+# =========================================================
+# CACHE (LRU por símbolo, TF, rango y ancho)
+# =========================================================
+class ChartCache:
+    def __init__(self, size: int = CHART_CACHE_SIZE, ttl_s: float = CHART_CACHE_TTL_S):
+        self.size = size
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expira, respuesta)
+        # pedidos iguales concurrentes arman el gráfico una sola vez (la LRU es la cache)
+        self._flights = SingleFlight(ttl_s=0)
+
+    def get(self, key, build):
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and hit[0] > now:
+                self._data.move_to_end(key)
+                return hit[1]
+
+        def fill():
+            value = build()
+            # se guarda antes de soltar el vuelo: el que llegue después ya lo encuentra
+            with self._lock:
+                self._data[key] = (time.monotonic() + self.ttl_s, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.size:
+                    self._data.popitem(last=False)
+            return value
+
+        return self._flights.do(key, fill)
+
+
+CHARTS = ChartCache()
+
+
+def chart(symbol: str, tf: str, start: int | None = None, end: int | None = None,
+          width: int = 800, mode: str = "ohlc", bars: int = CHART_DEFAULT_BARS,
+          symbol_ok=None) -> dict:
+    """
+    Punto de entrada de /candles. Sin end se usa la última vela cerrada, así
+    la clave cambia sola cuando cierra una vela nueva. symbol_ok(symbol)
+    decide si se puede bajar historia de un símbolo sin velas locales;
+    levanta ChartError si no.
+    """
+    if end is None:
+        end = last_closed_open_time(tf)
+    bars = max(1, min(bars, CHART_MAX_BARS))
+    key = (symbol, tf, start, end, width, mode, None if start is not None else bars)
+    return CHARTS.get(key, lambda: build_chart(symbol, tf, start, end, width, mode, bars, symbol_ok))
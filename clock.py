@@ -0,0 +1,150 @@
+# clock.py
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from ratelimit import governed_get, PRIORITY_LIVE
+
+# =========================================================
+# CONFIG
+# =========================================================
+BINANCE_BASE = os.getenv("BINANCE_BASE", "https://fapi.binance.com")
+BINANCE_TIME_URL = BINANCE_BASE + "/fapi/v1/time"
+# contra simulate.py: el reloj es virtual y acelerado (ver /sim/clock)
+SIM_CLOCK = os.getenv("SIM_CLOCK", "") == "1"
+SIM_CLOCK_URL = BINANCE_BASE + "/sim/clock"
+SYNC_SAMPLES = 5          # muestras por sincronización
+RESYNC_SECONDS = 600      # cada cuánto re-medimos el offset
+# una muestra con RTT mayor a esto × el mejor RTT se descarta
+RTT_OUTLIER_FACTOR = 1.5
+RTT_OUTLIER_SLACK_MS = 5.0
+
+
+def _probe():
+    """Una medición estilo NTP -> (offset_ms, rtt_ms)."""
+    r = governed_get(BINANCE_TIME_URL, priority=PRIORITY_LIVE, timeout=5)
+    t1 = time.time() * 1000.0
+    # RTT = envío -> headers (resp.elapsed): la espera en la cola del governor no cuenta
+    t0 = t1 - r.elapsed.total_seconds() * 1000.0
+    server_ms = r.json()["serverTime"]
+    # asumimos camino simétrico: el server leyó su reloj a mitad del RTT
+    return server_ms - (t0 + t1) / 2.0, t1 - t0
+
+
+def _sim_anchor():
+    """Ancla del reloj virtual del simulador -> (real_s, virtual_ms, speed)."""
+    r = requests.get(SIM_CLOCK_URL, timeout=5)
+    r.raise_for_status()
+    data = r.json()
+    return float(data["real"]), float(data["virtual_ms"]), float(data["speed"])
+
+
+# =========================================================
+# RELOJ DEL SERVIDOR
+# =========================================================
+class ServerClock:
+    """
+    Offset entre el reloj local y el de Binance, medido cada tanto y leído
+    localmente. bot_loop y run_detector usan el mismo reloj, así que ya no
+    hace falta un /fapi/v1/time por minuto y ambos coinciden en la hora.
+    """
+
+    def __init__(self, probe=_probe, samples: int = SYNC_SAMPLES,
+                 resync_seconds: float = RESYNC_SECONDS, sim: bool = SIM_CLOCK):
+        self._probe = probe
+        self.sim = sim
+        # en modo simulación: hora = virtual_ms + (ahora - real) * speed
+        self.speed = 1.0
+        self._anchor = None
+        self.samples = samples
+        self.resync_seconds = resync_seconds
+        self.offset_ms = 0.0
+        self.rtt_ms = None
+        self.last_sync = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def sync(self) -> bool:
+        """Mide varias veces, descarta muestras con RTT alto y usa la mediana del resto."""
+        if self.sim:
+            return self._sync_sim()
+        measured = []
+        for _ in range(self.samples):
+            try:
+                measured.append(self._probe())
+            except Exception as e:
+                self.last_error = str(e)
+        if not measured:
+            return False
+
+        best_rtt = min(rtt for _, rtt in measured)
+        limit = best_rtt * RTT_OUTLIER_FACTOR + RTT_OUTLIER_SLACK_MS
+        kept = sorted(off for off, rtt in measured if rtt <= limit)
+        offset = kept[len(kept) // 2]
+
+        self.offset_ms = offset
+        self.rtt_ms = best_rtt
+        self.last_sync = time.time()
+        self.last_error = None
+        return True
+
+    def _sync_sim(self) -> bool:
+        try:
+            real_s, virtual_ms, speed = _sim_anchor()
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+        self._anchor = (real_s, virtual_ms)
+        self.speed = speed
+        self.offset_ms = 0.0
+        self.rtt_ms = None
+        self.last_sync = time.time()
+        self.last_error = None
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.resync_seconds)
+            if not self.sync():
+                print(f"[clock] error sincronizando: {self.last_error}")
+
+    def ensure_started(self):
+        """Primera sincronización (bloqueante) + hilo de re-sync. Idempotente."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            if not self.sync():
+                print(f"[clock] sin sync inicial, uso reloj local: {self.last_error}")
+            self._thread = threading.Thread(target=self._run, name="clock-sync", daemon=True)
+            self._thread.start()
+
+    # ---------- lectura (sin red) ----------
+    def server_now_ms(self) -> int:
+        anchor = self._anchor
+        if anchor is not None:
+            return int(anchor[1] + (time.time() - anchor[0]) * 1000.0 * self.speed)
+        return int(time.time() * 1000.0 + self.offset_ms)
+
+    def sleep(self, seconds: float):
+        """Duerme `seconds` de hora del servidor (acelerada en simulación)."""
+        time.sleep(max(0.0, seconds) / self.speed)
+
+    def server_now(self) -> datetime:
+        return datetime.fromtimestamp(self.server_now_ms() / 1000.0, tz=timezone.utc)
+
+    def info(self) -> dict:
+        return {
+            "offset_ms": round(self.offset_ms, 1),
+            "rtt_ms": None if self.rtt_ms is None else round(self.rtt_ms, 1),
+            "last_sync": self.last_sync,
+            "last_error": self.last_error,
+            **({"sim_speed": self.speed} if self.sim else {}),
+        }
+
+
+# reloj compartido por bot y detector
+CLOCK = ServerClock()
@@ -0,0 +1,153 @@
+# confluence.py
+import threading
+from collections import deque
+
+from candles import TF_MS
+
+# =========================================================
+# CONFIG
+# =========================================================
+# un patrón sigue "fresco" estas velas de su TF después de D
+PATTERN_WINDOW_BARS = 8
+# señales breakout guardadas para cruzarlas con patrones que se detectan tarde
+# (el detector confirma D dos velas después: en 1h son 2h)
+SIGNAL_WINDOW_MS = 3 * 3_600_000
+# tope por (símbolo, tipo, TF) para que un símbolo ruidoso no crezca sin límite
+MAX_EVENTS_PER_KEY = 64
+
+# peso del TF en el ranking
+TF_WEIGHT = {"1m": 0.5, "5m": 0.7, "15m": 1.0, "1h": 1.5, "4h": 2.0, "1d": 2.5}
+
+SIDE_DIRECTION = {"buy": "BULLISH", "sell": "BEARISH"}
+
+
+def _overlap(lo1, hi1, lo2, hi2) -> bool:
+    return lo1 <= hi2 and lo2 <= hi1
+
+
+# =========================================================
+# MOTOR DE CONFLUENCIA
+# =========================================================
+class ConfluenceEngine:
+    """
+    Join en streaming entre patrones armónicos (detector) y señales breakout
+    (process_new_candle) por símbolo y ventana de tiempo. El estado es un dict
+    símbolo -> deques por (tipo, TF), así que cada evento solo mira lo vivo
+    de su propio símbolo: O(1) respecto a la cantidad de símbolos.
+    """
+
+    def __init__(self, max_alerts: int = 100):
+        self._lock = threading.Lock()
+        self._state = {}  # symbol -> {("pattern"|"signal", tf): deque[event]}
+        self.recent = deque(maxlen=max_alerts)
+
+    # ---------- estado ----------
+    def _queues(self, symbol):
+        return self._state.setdefault(symbol, {})
+
+    def _push(self, symbol, kind, tf, event):
+        q = self._queues(symbol).setdefault((kind, tf), deque(maxlen=MAX_EVENTS_PER_KEY))
+        q.append(event)
+
+    def _live(self, symbol, kind, now_ms):
+        """Eventos vivos de un tipo para el símbolo; desaloja los vencidos al frente."""
+        out = []
+        for (k, _tf), q in self._queues(symbol).items():
+            if k != kind:
+                continue
+            while q and q[0]["expires_at"] <= now_ms:
+                q.popleft()
+            out.extend(e for e in q if e["expires_at"] > now_ms)
+        return out
+
+    def alerts(self) -> list:
+        """Copia de las últimas alertas (más vieja primero)."""
+        with self._lock:
+            return list(self.recent)
+
+    def _emit(self, found):
+        found.sort(key=lambda a: a["rank"], reverse=True)
+        self.recent.extend(found)
+        return found
+
+    # ---------- eventos ----------
+    def on_pattern(self, symbol, tf, direction, template, score, lo, hi, d_time, now_ms):
+        """Patrón completado (zona D [lo, hi]). Devuelve confluencias nuevas, mejor primero."""
+        ev = {
+            "kind": "pattern", "symbol": symbol, "tf": tf, "direction": direction,
+            "template": template, "score": score, "lo": min(lo, hi), "hi": max(lo, hi),
+            "time": d_time, "expires_at": d_time + PATTERN_WINDOW_BARS * TF_MS.get(tf, 0),
+        }
+        found = []
+        with self._lock:
+            # patrón vs patrón en otro TF con zonas D superpuestas
+            for other in self._live(symbol, "pattern", now_ms):
+                if other["tf"] == tf or other["direction"] != direction:
+                    continue
+                if _overlap(ev["lo"], ev["hi"], other["lo"], other["hi"]):
+                    found.append(self._pattern_pair(ev, other))
+            # señales que ya ocurrieron dentro de la zona después de D
+            for sig in self._live(symbol, "signal", now_ms):
+                if self._signal_matches(sig, ev):
+                    found.append(self._signal_in_zone(sig, ev, now_ms))
+            self._push(symbol, "pattern", tf, ev)
+            return self._emit(found)
+
+    def on_signal(self, symbol, tf, side, price, t_ms):
+        """Señal BUY/SELL de process_new_candle. Devuelve confluencias nuevas, mejor primero."""
+        ev = {
+            "kind": "signal", "symbol": symbol, "tf": tf, "side": side.lower(),
+            "price": price, "time": t_ms, "expires_at": t_ms + SIGNAL_WINDOW_MS,
+        }
+        found = []
+        with self._lock:
+            for pat in self._live(symbol, "pattern", t_ms):
+                if self._signal_matches(ev, pat):
+                    found.append(self._signal_in_zone(ev, pat, t_ms))
+            self._push(symbol, "signal", tf, ev)
+            return self._emit(found)
+
+    # ---------- reglas + ranking ----------
+    @staticmethod
+    def _signal_matches(sig, pat) -> bool:
+        return (SIDE_DIRECTION.get(sig["side"]) == pat["direction"]
+                and sig["time"] >= pat["time"]
+                and pat["lo"] <= sig["price"] <= pat["hi"])
+
+    @staticmethod
+    def _signal_in_zone(sig, pat, now_ms):
+        # más peso a patrón con buen score, TF alto y señal cerca de D en el tiempo
+        window = pat["expires_at"] - pat["time"] or 1
+        freshness = max(0.0, 1.0 - (sig["time"] - pat["time"]) / window)
+        rank = (pat["score"] / 100.0) * TF_WEIGHT.get(pat["tf"], 1.0) \
+            + TF_WEIGHT.get(sig["tf"], 1.0) * 0.5 + freshness
+        return {
+            "type": "signal_in_prz",
+            "symbol": sig["symbol"],
+            "rank": round(rank, 3),
+            "template": pat["template"],
+            "score": pat["score"],
+            "text": (f"{sig['side'].upper()} {sig['tf']} @ {sig['price']} dentro de PRZ "
+                     f"{pat['template']} {pat['direction']} {pat['tf']} (score {pat['score']:.1f})"),
+            "time": now_ms,
+        }
+
+    @staticmethod
+    def _pattern_pair(a, b):
+        rank = (a["score"] / 100.0) * TF_WEIGHT.get(a["tf"], 1.0) \
+            + (b["score"] / 100.0) * TF_WEIGHT.get(b["tf"], 1.0)
+        lo, hi = max(a["lo"], b["lo"]), min(a["hi"], b["hi"])
+        return {
+            "type": "multi_tf_prz",
+            "symbol": a["symbol"],
+            "rank": round(rank, 3),
+            "template": a["template"],
+            "score": min(a["score"], b["score"]),
+            "text": (f"{a['template']} {a['tf']} + {b['template']} {b['tf']} {a['direction']} "
+                     f"con zonas D superpuestas [{lo:.4f} – {hi:.4f}]"),
+            "time": max(a["time"], b["time"]),
+        }
+
+
+# motor compartido (detector y bot_loop en el mismo proceso)
+CONFLUENCE = ConfluenceEngine()
@@ -1,8 +1,11 @@
 # db.py
 import sqlite3
+from array import array
 from datetime import datetime, timezone
 from typing import List, Dict, Any
 
+from candles import Candles, COLUMNS
+
 DB_PATH = "harmonics.db"
 
 
@@ -10,25 +13,220 @@ def get_conn():
     return sqlite3.connect(DB_PATH)
 
 
+# versión del esquema (PRAGMA user_version)
+SCHEMA_VERSION = 1
+
+POINTS = ("x", "a", "b", "c", "d")
+RATIOS = ("ab_xa", "bc_ab", "cd_bc", "ad_xa")
+
+PATTERNS_DDL = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT,
+        timeframe TEXT,
+        pattern_type TEXT,
+        direction TEXT,
+        score REAL,
+        x_time INTEGER,
+        a_time INTEGER,
+        b_time INTEGER,
+        c_time INTEGER,
+        d_time INTEGER,
+        x_price REAL,
+        a_price REAL,
+        b_price REAL,
+        c_price REAL,
+        d_price REAL,
+        ab_xa REAL,
+        bc_ab REAL,
+        cd_bc REAL,
+        ad_xa REAL,
+        s_ab_xa REAL,
+        s_bc_ab REAL,
+        s_cd_bc REAL,
+        s_ad_xa REAL,
+        created_at TEXT
+    )
+"""
+
+# columnas que devuelve list_patterns (en este orden)
+PATTERN_COLUMNS = (
+    ("id", "symbol", "timeframe", "pattern_type", "direction", "score")
+    + tuple(f"{p}_time" for p in POINTS)
+    + tuple(f"{p}_price" for p in POINTS)
+    + RATIOS
+    + tuple(f"s_{r}" for r in RATIOS)
+    + ("created_at",)
+)
+
+
+def _migrate(conn):
+    """
+    v0 -> v1: tiempos XABCD de ISO TEXT a epoch ms INTEGER, y columnas nuevas
+    para precios, ratios y sub-scores. Se reconstruye la tabla porque SQLite
+    no cambia el tipo de una columna con ALTER.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    conn.execute("BEGIN")
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(patterns)")}
+    if cols and "x_price" not in cols:
+        to_ms = "CAST(strftime('%s', {0}) AS INTEGER) * 1000"
+        conn.execute(PATTERNS_DDL.format(name="patterns_v1"))
+        conn.execute(f"""
+            INSERT INTO patterns_v1
+            (id, symbol, timeframe, pattern_type, direction, score,
+             x_time, a_time, b_time, c_time, d_time, created_at)
+            SELECT id, symbol, timeframe, pattern_type, direction, score,
+                   {to_ms.format("x_time")}, {to_ms.format("a_time")},
+                   {to_ms.format("b_time")}, {to_ms.format("c_time")},
+                   {to_ms.format("d_time")}, created_at
+            FROM patterns
+        """)
+        conn.execute("DROP TABLE patterns")
+        conn.execute("ALTER TABLE patterns_v1 RENAME TO patterns")
+
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+
+
 def init_db():
     conn = get_conn()
     c = conn.cursor()
+    if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+        # base nueva: auto_vacuum solo se elige gratis antes de la primera tabla
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    _migrate(conn)
+    c.execute(PATTERNS_DDL.format(name="patterns"))
+    # resultado de cada patrón (PRZ aguantó o falló)
     c.execute("""
-        CREATE TABLE IF NOT EXISTS patterns (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+        CREATE TABLE IF NOT EXISTS pattern_outcomes (
+            pattern_id INTEGER PRIMARY KEY REFERENCES patterns(id),
             symbol TEXT,
             timeframe TEXT,
-            pattern_type TEXT,
             direction TEXT,
-            score REAL,
-            x_time TEXT,
-            a_time TEXT,
-            b_time TEXT,
-            c_time TEXT,
-            d_time TEXT,
+            entry_price REAL,
+            stop_price REAL,
+            target1_price REAL,
+            target2_price REAL,
+            horizon_end INTEGER,
+            last_checked INTEGER,
+            max_favorable REAL DEFAULT 0,
+            max_adverse REAL DEFAULT 0,
+            hit_target1 INTEGER DEFAULT 0,
+            hit_target2 INTEGER DEFAULT 0,
+            hit_stop INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'open',
+            closed_at INTEGER
+        )
+    """)
+    # velas cerradas; la PK (símbolo, TF, open_time) es también el índice de rango
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS candles (
+            symbol TEXT NOT NULL,
+            timeframe TEXT NOT NULL,
+            open_time INTEGER NOT NULL,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            close_time INTEGER,
+            PRIMARY KEY (symbol, timeframe, open_time)
+        ) WITHOUT ROWID
+    """)
+    # retención: agregados diarios de patrones ya compactados + índice de archivos
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS pattern_rollups (
+            day TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            timeframe TEXT NOT NULL,
+            pattern_type TEXT NOT NULL,
+            direction TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            score_sum REAL,
+            score_max REAL,
+            hit_target1 INTEGER DEFAULT 0,
+            hit_target2 INTEGER DEFAULT 0,
+            hit_stop INTEGER DEFAULT 0,
+            PRIMARY KEY (day, symbol, timeframe, pattern_type, direction)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS pattern_archives (
+            path TEXT PRIMARY KEY,
+            first_id INTEGER,
+            last_id INTEGER,
+            d_min INTEGER,
+            d_max INTEGER,
+            rows INTEGER,
             created_at TEXT
         )
     """)
+    # diario de señales BUY/SELL del bot (append-only) + última por símbolo/TF
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS signals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            timeframe TEXT NOT NULL,
+            side TEXT NOT NULL,
+            price REAL,
+            tsl REAL,
+            candle_time INTEGER NOT NULL,
+            emitted_at INTEGER,
+            latency_ms INTEGER,
+            alerted INTEGER DEFAULT 1
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS signal_latest (
+            symbol TEXT NOT NULL,
+            timeframe TEXT NOT NULL,
+            signal_id INTEGER,
+            side TEXT,
+            price REAL,
+            tsl REAL,
+            candle_time INTEGER,
+            emitted_at INTEGER,
+            latency_ms INTEGER,
+            alerted INTEGER,
+            PRIMARY KEY (symbol, timeframe)
+        ) WITHOUT ROWID
+    """)
+    # único: un replay tras reinicio no duplica señales; también sirve de índice por símbolo
+    c.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_signals_sym_time
+        ON signals (symbol, timeframe, candle_time, side)
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_signals_time ON signals (candle_time)")
+    # suscripciones de alertas (filtros CSV; NULL = cualquiera)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS alert_subscriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            channel TEXT NOT NULL,
+            target TEXT NOT NULL,
+            symbols TEXT,
+            timeframes TEXT,
+            pattern_types TEXT,
+            kinds TEXT,
+            min_score REAL DEFAULT 0,
+            enabled INTEGER DEFAULT 1,
+            created_at TEXT,
+            updated_at INTEGER
+        )
+    """)
+    # índices para filtros y paginación de /patterns
+    c.execute("CREATE INDEX IF NOT EXISTS idx_patterns_sym_tf ON patterns (symbol, timeframe, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_patterns_type_dir ON patterns (pattern_type, direction, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_patterns_d_time ON patterns (d_time)")
+    # índice parcial: el tracker solo mira los abiertos, sin recorrer la tabla
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outcomes_open
+        ON pattern_outcomes (symbol, timeframe, horizon_end)
+        WHERE status = 'open'
+    """)
     conn.commit()
     conn.close()
 
@@ -38,90 +236,814 @@ def save_pattern(symbol: str,
                  pattern_type: str,
                  direction: str,
                  score: float,
-                 points: dict):
+                 points: dict,
+                 ratios: dict | None = None,
+                 subscores: dict | None = None):
+    """
+    points: {"x": {"time": ms, "price": p}, ..., "d": {...}} (pivots del detector)
+    ratios / subscores: claves de RATIOS (ab_xa, bc_ab, cd_bc, ad_xa)
+    """
+    ratios = ratios or {}
+    subscores = subscores or {}
     conn = get_conn()
     c = conn.cursor()
     now = datetime.now(timezone.utc).isoformat()
-    c.execute("""
-        INSERT INTO patterns
-        (symbol, timeframe, pattern_type, direction, score,
-         x_time, a_time, b_time, c_time, d_time, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    cols = PATTERN_COLUMNS[1:]
+    c.execute(f"""
+        INSERT INTO patterns ({", ".join(cols)})
+        VALUES ({", ".join("?" * len(cols))})
     """, (
         symbol,
         timeframe,
         pattern_type,
         direction,
         score,
-        points.get("x"),
-        points.get("a"),
-        points.get("b"),
-        points.get("c"),
-        points.get("d"),
+        *(points[p]["time"] for p in POINTS),
+        *(points[p]["price"] for p in POINTS),
+        *(ratios.get(r) for r in RATIOS),
+        *(subscores.get(r) for r in RATIOS),
         now
     ))
+    pattern_id = c.lastrowid
     conn.commit()
     conn.close()
+    return pattern_id
+
+
+def _pattern_row(r) -> Dict[str, Any]:
+    row = dict(zip(PATTERN_COLUMNS, r))
+    out = {k: row[k] for k in ("id", "symbol", "timeframe", "pattern_type", "direction", "score", "d_time")}
+    out["points"] = {p: {"time": row[f"{p}_time"], "price": row[f"{p}_price"]} for p in POINTS}
+    out["ratios"] = {k: row[k] for k in RATIOS}
+    out["subscores"] = {k: row[f"s_{k}"] for k in RATIOS}
+    out["created_at"] = row["created_at"]
+    return out
+
+
+def _pattern_filters(symbol: str | None = None,
+                     timeframe: str | None = None,
+                     pattern_type: str | None = None,
+                     direction: str | None = None,
+                     d_from: int | None = None,
+                     d_to: int | None = None,
+                     before_id: int | None = None,
+                     after_id: int | None = None):
+    where = []
+    params = []
+    if symbol:
+        where.append("p.symbol = ?")
+        params.append(symbol)
+    if timeframe:
+        where.append("p.timeframe = ?")
+        params.append(timeframe)
+    if pattern_type:
+        where.append("p.pattern_type = ?")
+        params.append(pattern_type)
+    if direction:
+        where.append("p.direction = ?")
+        params.append(direction.upper())
+    if d_from is not None:
+        where.append("p.d_time >= ?")
+        params.append(d_from)
+    if d_to is not None:
+        where.append("p.d_time < ?")
+        params.append(d_to)
+    if before_id is not None:
+        where.append("p.id < ?")
+        params.append(before_id)
+    if after_id is not None:
+        where.append("p.id > ?")
+        params.append(after_id)
+    return (" WHERE " + " AND ".join(where)) if where else "", params
 
 
 def list_patterns(limit: int = 50,
                   symbol: str | None = None,
-                  timeframe: str | None = None) -> List[Dict[str, Any]]:
+                  timeframe: str | None = None,
+                  pattern_type: str | None = None,
+                  direction: str | None = None,
+                  d_from: int | None = None,
+                  d_to: int | None = None,
+                  before_id: int | None = None,
+                  after_id: int | None = None) -> List[Dict[str, Any]]:
+    """
+    Paginación por keyset sobre id (siempre se devuelve de más nuevo a más viejo):
+    before_id -> página siguiente (más viejos), after_id -> página anterior (más nuevos).
+    """
     conn = get_conn()
     c = conn.cursor()
 
-    q = "SELECT id, symbol, timeframe, pattern_type, direction, score, d_time, created_at FROM patterns"
+    q = f"""
+        SELECT {", ".join("p." + k for k in PATTERN_COLUMNS)},
+               o.status, o.entry_price, o.stop_price, o.target1_price, o.target2_price,
+               o.max_favorable, o.max_adverse, o.hit_target1, o.hit_target2, o.hit_stop
+        FROM patterns p
+        LEFT JOIN pattern_outcomes o ON o.pattern_id = p.id
+    """
+    where, params = _pattern_filters(symbol, timeframe, pattern_type, direction,
+                                     d_from, d_to, before_id, after_id)
+    q += where
+
+    # con after_id recorremos hacia arriba desde el cursor y después invertimos
+    ascending = after_id is not None and before_id is None
+    q += " ORDER BY p.id ASC LIMIT ?" if ascending else " ORDER BY p.id DESC LIMIT ?"
+    params.append(limit)
+
+    rows = c.execute(q, params).fetchall()
+    conn.close()
+
+    n = len(PATTERN_COLUMNS)
+    out = []
+    for r in rows:
+        item = _pattern_row(r[:n])
+        o = r[n:]
+        item["outcome"] = None if o[0] is None else {
+            "status": o[0],
+            "entry_price": o[1],
+            "stop_price": o[2],
+            "target1_price": o[3],
+            "target2_price": o[4],
+            "max_favorable": o[5],
+            "max_adverse": o[6],
+            "hit_target1": bool(o[7]),
+            "hit_target2": bool(o[8]),
+            "hit_stop": bool(o[9]),
+        }
+        out.append(item)
+    if ascending:
+        out.reverse()
+    return out
+
+
+def iter_patterns(batch_size: int = 1000, **filters):
+    """
+    Recorre patrones en orden de id (ascendente) con un cursor del lado del
+    servidor, de a batch_size filas, para exportar sin cargar todo en memoria.
+    Cada fila es una tupla en el orden de PATTERN_COLUMNS.
+    """
+    where, params = _pattern_filters(**filters)
+    conn = get_conn()
+    try:
+        cur = conn.execute(
+            f"SELECT {', '.join('p.' + k for k in PATTERN_COLUMNS)} FROM patterns p"
+            f"{where} ORDER BY p.id ASC",
+            params,
+        )
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def _stats_by(c, col: str):
+    """Conteo por columna sumando filas vivas y agregados de pattern_rollups."""
+    return c.execute(f"""
+        SELECT {col}, SUM(n) FROM (
+            SELECT {col}, COUNT(*) AS n FROM patterns GROUP BY {col}
+            UNION ALL
+            SELECT {col}, SUM(count) AS n FROM pattern_rollups GROUP BY {col}
+        )
+        GROUP BY {col}
+        ORDER BY SUM(n) DESC
+    """).fetchall()
+
+
+def stats():
+    conn = get_conn()
+    c = conn.cursor()
+    live = c.execute("SELECT COUNT(*) FROM patterns").fetchone()[0]
+    rolled = c.execute("SELECT COALESCE(SUM(count), 0) FROM pattern_rollups").fetchone()[0]
+    by_symbol = _stats_by(c, "symbol")
+    by_tf = _stats_by(c, "timeframe")
+    conn.close()
+    return {
+        "total": live + rolled,
+        "live": live,
+        "rolled_up": rolled,
+        "by_symbol": by_symbol,
+        "by_timeframe": by_tf,
+    }
+
+
+# =========================================================
+# OUTCOMES (seguimiento de patrones abiertos)
+# =========================================================
+OUTCOME_COLUMNS = (
+    "pattern_id", "symbol", "timeframe", "direction",
+    "entry_price", "stop_price", "target1_price", "target2_price",
+    "horizon_end", "last_checked", "max_favorable", "max_adverse",
+    "hit_target1", "hit_target2", "hit_stop", "status", "closed_at",
+)
+
+
+def open_outcome(pattern_id: int,
+                 symbol: str,
+                 timeframe: str,
+                 direction: str,
+                 levels: dict,
+                 start_ms: int,
+                 horizon_end_ms: int):
+    conn = get_conn()
+    conn.execute("""
+        INSERT OR IGNORE INTO pattern_outcomes
+        (pattern_id, symbol, timeframe, direction,
+         entry_price, stop_price, target1_price, target2_price,
+         horizon_end, last_checked)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        pattern_id, symbol, timeframe, direction,
+        levels["entry"], levels["stop"], levels["target1"], levels["target2"],
+        horizon_end_ms, start_ms,
+    ))
+    conn.commit()
+    conn.close()
+
+
+def list_open_outcomes(symbol: str, timeframe: str) -> List[Dict[str, Any]]:
+    conn = get_conn()
+    rows = conn.execute(f"""
+        SELECT {", ".join(OUTCOME_COLUMNS)} FROM pattern_outcomes
+        WHERE status = 'open' AND symbol = ? AND timeframe = ?
+    """, (symbol, timeframe)).fetchall()
+    conn.close()
+    return [dict(zip(OUTCOME_COLUMNS, r)) for r in rows]
+
+
+def update_outcomes(rows: List[Dict[str, Any]]):
+    """Guarda en una sola transacción los outcomes que cambiaron."""
+    if not rows:
+        return
+    conn = get_conn()
+    conn.executemany("""
+        UPDATE pattern_outcomes
+        SET last_checked = :last_checked,
+            max_favorable = :max_favorable,
+            max_adverse = :max_adverse,
+            hit_target1 = :hit_target1,
+            hit_target2 = :hit_target2,
+            hit_stop = :hit_stop,
+            status = :status,
+            closed_at = :closed_at
+        WHERE pattern_id = :pattern_id
+    """, rows)
+    conn.commit()
+    conn.close()
+
+
+def outcome_stats(symbol: str | None = None,
+                  timeframe: str | None = None) -> List[Dict[str, Any]]:
+    """Resumen por plantilla/dirección: cuántos llegaron a target vs stop."""
+    q = """
+        SELECT p.pattern_type, p.direction,
+               COUNT(*),
+               SUM(o.status = 'open'),
+               SUM(o.hit_target1),
+               SUM(o.hit_target2),
+               SUM(o.hit_stop),
+               AVG(o.max_favorable / o.entry_price) * 100,
+               AVG(o.max_adverse / o.entry_price) * 100
+        FROM pattern_outcomes o
+        JOIN patterns p ON p.id = o.pattern_id
+    """
     params = []
     where = []
+    if symbol:
+        where.append("o.symbol = ?")
+        params.append(symbol)
+    if timeframe:
+        where.append("o.timeframe = ?")
+        params.append(timeframe)
+    if where:
+        q += " WHERE " + " AND ".join(where)
+    q += " GROUP BY p.pattern_type, p.direction ORDER BY COUNT(*) DESC"
+
+    conn = get_conn()
+    rows = conn.execute(q, params).fetchall()
+    conn.close()
+
+    out = []
+    for r in rows:
+        decided = (r[5] or 0) + (r[6] or 0)
+        out.append({
+            "pattern_type": r[0],
+            "direction": r[1],
+            "total": r[2],
+            "open": r[3] or 0,
+            "hit_target1": r[4] or 0,
+            "hit_target2": r[5] or 0,
+            "hit_stop": r[6] or 0,
+            "win_rate": (r[5] / decided) if decided else None,
+            "avg_mfe_pct": r[7],
+            "avg_mae_pct": r[8],
+        })
+    return out
+
+
+# =========================================================
+# RETENCIÓN (rollup + archivo de patrones viejos)
+# =========================================================
+ARCHIVE_COLUMNS = PATTERN_COLUMNS + ("outcome_status", "hit_target1", "hit_target2", "hit_stop")
+
 
+def patterns_older_than(cutoff_ms: int, limit: int) -> List[Dict[str, Any]]:
+    """Los `limit` patrones más viejos con D antes de cutoff_ms, con su outcome (si hay)."""
+    conn = get_conn()
+    rows = conn.execute(f"""
+        SELECT {', '.join('p.' + k for k in PATTERN_COLUMNS)},
+               o.status, o.hit_target1, o.hit_target2, o.hit_stop
+        FROM patterns p
+        LEFT JOIN pattern_outcomes o ON o.pattern_id = p.id
+        WHERE p.d_time < ?
+        ORDER BY p.d_time ASC
+        LIMIT ?
+    """, (cutoff_ms, limit)).fetchall()
+    conn.close()
+    return [dict(zip(ARCHIVE_COLUMNS, r)) for r in rows]
+
+
+def _day(ms) -> str:
+    return datetime.fromtimestamp((ms or 0) / 1000.0, tz=timezone.utc).date().isoformat()
+
+
+def compact_patterns(rows: List[Dict[str, Any]], archive_path: str) -> int:
+    """
+    En una sola transacción corta: suma las filas a pattern_rollups, registra
+    el archivo donde quedaron y borra patrones + outcomes. El archivo tiene
+    que estar escrito antes de llamar a esto.
+    """
+    if not rows:
+        return 0
+    groups = {}
+    for r in rows:
+        key = (_day(r["d_time"]), r["symbol"], r["timeframe"], r["pattern_type"], r["direction"])
+        g = groups.setdefault(key, [0, 0.0, None, 0, 0, 0])
+        score = r["score"] or 0.0
+        g[0] += 1
+        g[1] += score
+        g[2] = score if g[2] is None else max(g[2], score)
+        g[3] += r["hit_target1"] or 0
+        g[4] += r["hit_target2"] or 0
+        g[5] += r["hit_stop"] or 0
+
+    ids = [(r["id"],) for r in rows]
+    d_times = [r["d_time"] for r in rows if r["d_time"] is not None]
+    conn = get_conn()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("""
+            INSERT INTO pattern_rollups
+                (day, symbol, timeframe, pattern_type, direction,
+                 count, score_sum, score_max, hit_target1, hit_target2, hit_stop)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (day, symbol, timeframe, pattern_type, direction) DO UPDATE SET
+                count = count + excluded.count,
+                score_sum = score_sum + excluded.score_sum,
+                score_max = MAX(score_max, excluded.score_max),
+                hit_target1 = hit_target1 + excluded.hit_target1,
+                hit_target2 = hit_target2 + excluded.hit_target2,
+                hit_stop = hit_stop + excluded.hit_stop
+        """, [k + tuple(v) for k, v in groups.items()])
+        conn.execute("""
+            INSERT OR REPLACE INTO pattern_archives
+                (path, first_id, last_id, d_min, d_max, rows, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (archive_path, min(i for (i,) in ids), max(i for (i,) in ids),
+              min(d_times, default=None), max(d_times, default=None), len(rows),
+              datetime.now(timezone.utc).isoformat()))
+        conn.executemany("DELETE FROM pattern_outcomes WHERE pattern_id = ?", ids)
+        conn.executemany("DELETE FROM patterns WHERE id = ?", ids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def list_archives(d_from: int | None = None, d_to: int | None = None) -> List[Dict[str, Any]]:
+    """Archivos cuyo rango de d_time se cruza con [d_from, d_to)."""
+    where, params = [], []
+    if d_from is not None:
+        where.append("d_max >= ?")
+        params.append(d_from)
+    if d_to is not None:
+        where.append("d_min < ?")
+        params.append(d_to)
+    q = "SELECT path, first_id, last_id, d_min, d_max, rows FROM pattern_archives"
+    if where:
+        q += " WHERE " + " AND ".join(where)
+    q += " ORDER BY d_min"
+    conn = get_conn()
+    rows = conn.execute(q, params).fetchall()
+    conn.close()
+    keys = ("path", "first_id", "last_id", "d_min", "d_max", "rows")
+    return [dict(zip(keys, r)) for r in rows]
+
+
+def list_rollups(symbol: str | None = None, timeframe: str | None = None,
+                 day_from: str | None = None, day_to: str | None = None) -> List[Dict[str, Any]]:
+    where, params = [], []
+    for col, val in (("symbol", symbol), ("timeframe", timeframe)):
+        if val:
+            where.append(f"{col} = ?")
+            params.append(val)
+    if day_from:
+        where.append("day >= ?")
+        params.append(day_from)
+    if day_to:
+        where.append("day < ?")
+        params.append(day_to)
+    q = """SELECT day, symbol, timeframe, pattern_type, direction, count,
+                  score_sum, score_max, hit_target1, hit_target2, hit_stop
+           FROM pattern_rollups"""
+    if where:
+        q += " WHERE " + " AND ".join(where)
+    q += " ORDER BY day, symbol, timeframe"
+    conn = get_conn()
+    rows = conn.execute(q, params).fetchall()
+    conn.close()
+    out = []
+    for r in rows:
+        out.append({
+            "day": r[0], "symbol": r[1], "timeframe": r[2],
+            "pattern_type": r[3], "direction": r[4], "count": r[5],
+            "avg_score": r[6] / r[5] if r[5] else None, "max_score": r[7],
+            "hit_target1": r[8], "hit_target2": r[9], "hit_stop": r[10],
+        })
+    return out
+
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def auto_vacuum_mode() -> int:
+    """PRAGMA auto_vacuum: 0 NONE, 1 FULL, 2 INCREMENTAL."""
+    conn = get_conn()
+    try:
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def enable_incremental_vacuum() -> bool:
+    """
+    Pasa una base existente a auto_vacuum=INCREMENTAL. Requiere un VACUUM
+    completo que reescribe toda la base con el lock de escritura tomado: es un
+    paso de mantenimiento offline (retention.py --incremental-vacuum, con el
+    bot parado), nunca desde el servidor. Devuelve True si hubo que convertirla.
+    """
+    conn = get_conn()
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return True
+    finally:
+        conn.close()
+
+
+def incremental_vacuum(pages: int = 1000) -> int:
+    """Devuelve al disco hasta `pages` páginas libres; devuelve cuántas quedan libres."""
+    conn = get_conn()
+    try:
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        return conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# =========================================================
+# VELAS LOCALES (cerradas; para /candles y análisis offline)
+# =========================================================
+def insert_candles(conn, symbol: str, timeframe: str, candles) -> int:
+    """INSERT OR IGNORE de un Candles en la conexión dada, sin commit (lo maneja quien llama)."""
+    if not len(candles):
+        return 0
+    rows = zip(
+        (symbol,) * len(candles), (timeframe,) * len(candles),
+        candles.open_time, candles.open, candles.high, candles.low, candles.close, candles.close_time,
+    )
+    cur = conn.executemany("""
+        INSERT OR IGNORE INTO candles
+            (symbol, timeframe, open_time, open, high, low, close, close_time)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    return cur.rowcount
+
+
+def save_candles(symbol: str, timeframe: str, candles) -> int:
+    """Guarda velas cerradas (Candles). Una vela cerrada no cambia: las repetidas se ignoran."""
+    if not len(candles):
+        return 0
+    conn = get_conn()
+    n = insert_candles(conn, symbol, timeframe, candles)
+    conn.commit()
+    conn.close()
+    return n
+
+
+def bulk_conn(cache_mb: int = 64):
+    """
+    Conexión para cargas masivas (importador): transacciones explícitas
+    (BEGIN/COMMIT a cargo de quien llama) y un cache de páginas grande.
+    """
+    conn = get_conn()
+    conn.isolation_level = None
+    conn.execute(f"PRAGMA cache_size = -{int(cache_mb) * 1024}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def candle_range(symbol: str, timeframe: str):
+    """(primer open_time, último open_time, cantidad) guardados, o None."""
+    conn = get_conn()
+    row = conn.execute(
+        "SELECT MIN(open_time), MAX(open_time), COUNT(*) FROM candles WHERE symbol = ? AND timeframe = ?",
+        (symbol, timeframe),
+    ).fetchone()
+    conn.close()
+    return None if row[0] is None else row
+
+
+def load_candles(symbol: str, timeframe: str,
+                 start: int | None = None, end: int | None = None,
+                 limit: int | None = None):
+    """
+    Velas guardadas con open_time en [start, end] como Candles (en orden).
+    Con limit y sin start devuelve las últimas `limit`.
+    """
+    where = ["symbol = ?", "timeframe = ?"]
+    params: list = [symbol, timeframe]
+    if start is not None:
+        where.append("open_time >= ?")
+        params.append(start)
+    if end is not None:
+        where.append("open_time <= ?")
+        params.append(end)
+    q = ("SELECT open_time, open, high, low, close, close_time FROM candles WHERE "
+         + " AND ".join(where))
+    if limit is not None and start is None:
+        # las últimas N: se leen al revés por la PK y se dan vuelta
+        q = f"SELECT * FROM ({q} ORDER BY open_time DESC LIMIT ?) ORDER BY open_time ASC"
+        params.append(limit)
+    else:
+        q += " ORDER BY open_time ASC"
+        if limit is not None:
+            q += " LIMIT ?"
+            params.append(limit)
+
+    conn = get_conn()
+    rows = conn.execute(q, params).fetchall()
+    conn.close()
+
+    cols = {name: array(tc) for name, _, tc in COLUMNS}
+    if rows:
+        for (name, _, _), values in zip(COLUMNS, zip(*rows)):
+            cols[name].extend(values)
+    return Candles(cols)
+
+
+
+def load_candle_buckets(symbol: str, timeframe: str, start: int, end: int, bucket_ms: int) -> dict:
+    """
+    OHLC agregado por buckets de bucket_ms dentro de SQLite (sin traer cada
+    vela a Python): high/low extremos del bucket, open de la primera vela y
+    close de la última (lookups por PK). Devuelve columnas t/o/h/l/c y el
+    total de velas agregadas.
+    """
+    conn = get_conn()
+    rows = conn.execute("""
+        SELECT g.t_first, o1.open, g.h, g.l, o2.close, g.n
+        FROM (
+            SELECT MIN(open_time) AS t_first, MAX(open_time) AS t_last,
+                   MAX(high) AS h, MIN(low) AS l, COUNT(*) AS n
+            FROM candles
+            WHERE symbol = ? AND timeframe = ? AND open_time BETWEEN ? AND ?
+            GROUP BY (open_time - ?) / ?
+        ) g
+        JOIN candles o1 ON o1.symbol = ? AND o1.timeframe = ? AND o1.open_time = g.t_first
+        JOIN candles o2 ON o2.symbol = ? AND o2.timeframe = ? AND o2.open_time = g.t_last
+        ORDER BY g.t_first
+    """, (symbol, timeframe, start, end, start, bucket_ms,
+          symbol, timeframe, symbol, timeframe)).fetchall()
+    conn.close()
+    out = {"t": [], "o": [], "h": [], "l": [], "c": []}
+    total = 0
+    for t, o, h, l, c, n in rows:
+        out["t"].append(t)
+        out["o"].append(o)
+        out["h"].append(h)
+        out["l"].append(l)
+        out["c"].append(c)
+        total += n
+    return {"series": out, "bars": total}
+
+
+def load_close_extremes(symbol: str, timeframe: str, start: int, end: int, bucket_ms: int) -> dict:
+    """
+    Para la línea de cierres (LTTB) de un rango grande: por cada bucket de
+    bucket_ms, el cierre mínimo y el máximo con la vela en que ocurrieron
+    (columnas "desnudas" junto a MIN/MAX en SQLite). Hasta 2 puntos por
+    bucket, en orden de tiempo; bars es el total de velas del rango.
+    """
+    conn = get_conn()
+    rows = conn.execute("""
+        WITH r AS (
+            SELECT (open_time - ?) / ? AS b, open_time, close
+            FROM candles
+            WHERE symbol = ? AND timeframe = ? AND open_time BETWEEN ? AND ?
+        )
+        SELECT open_time, MIN(close), COUNT(*) FROM r GROUP BY b
+        UNION ALL
+        SELECT open_time, MAX(close), 0 FROM r GROUP BY b
+        ORDER BY 1
+    """, (start, bucket_ms, symbol, timeframe, start, end)).fetchall()
+    conn.close()
+    out = {"t": [], "c": []}
+    total = 0
+    for t, c, n in rows:
+        total += n
+        if out["t"] and out["t"][-1] == t:
+            continue  # mínimo y máximo en la misma vela
+        out["t"].append(t)
+        out["c"].append(c)
+    return {"series": out, "bars": total}
+
+
+# =========================================================
+# DIARIO DE SEÑALES
+# =========================================================
+SIGNAL_COLUMNS = ("id", "symbol", "timeframe", "side", "price", "tsl",
+                  "candle_time", "emitted_at", "latency_ms", "alerted")
+
+
+def insert_signals(conn, signals: list) -> int:
+    """
+    Agrega un lote de señales (dicts) y actualiza signal_latest, sin commit:
+    el diario hace un solo commit por lote. Las repetidas se ignoran.
+    """
+    inserted = 0
+    for sig in signals:
+        cur = conn.execute("""
+            INSERT OR IGNORE INTO signals
+                (symbol, timeframe, side, price, tsl, candle_time, emitted_at, latency_ms, alerted)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (sig["symbol"], sig["timeframe"], sig["side"], sig["price"], sig.get("tsl"),
+              sig["candle_time"], sig.get("emitted_at"), sig.get("latency_ms"),
+              int(sig.get("alerted", True))))
+        if not cur.rowcount:
+            continue
+        inserted += 1
+        conn.execute("""
+            INSERT INTO signal_latest
+                (symbol, timeframe, signal_id, side, price, tsl, candle_time, emitted_at, latency_ms, alerted)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (symbol, timeframe) DO UPDATE SET
+                signal_id = excluded.signal_id, side = excluded.side,
+                price = excluded.price, tsl = excluded.tsl,
+                candle_time = excluded.candle_time, emitted_at = excluded.emitted_at,
+                latency_ms = excluded.latency_ms, alerted = excluded.alerted
+            WHERE excluded.candle_time >= signal_latest.candle_time
+        """, (sig["symbol"], sig["timeframe"], cur.lastrowid, sig["side"], sig["price"],
+              sig.get("tsl"), sig["candle_time"], sig.get("emitted_at"),
+              sig.get("latency_ms"), int(sig.get("alerted", True))))
+    return inserted
+
+
+def list_signals(symbol: str | None = None, timeframe: str | None = None,
+                 side: str | None = None, start: int | None = None,
+                 end: int | None = None, limit: int = 200) -> List[Dict[str, Any]]:
+    """
+    Señales con candle_time en [start, end), la más nueva primero. Con symbol
+    (y timeframe) usa idx_signals_sym_time; sin symbol, idx_signals_time.
+    """
+    where, params = [], []
     if symbol:
         where.append("symbol = ?")
         params.append(symbol)
     if timeframe:
         where.append("timeframe = ?")
         params.append(timeframe)
+    if side:
+        where.append("side = ?")
+        params.append(side)
+    if start is not None:
+        where.append("candle_time >= ?")
+        params.append(start)
+    if end is not None:
+        where.append("candle_time < ?")
+        params.append(end)
+    q = f"SELECT {', '.join(SIGNAL_COLUMNS)} FROM signals"
+    if where:
+        q += " WHERE " + " AND ".join(where)
+    q += " ORDER BY candle_time DESC LIMIT ?"
+    params.append(limit)
+    conn = get_conn()
+    rows = conn.execute(q, params).fetchall()
+    conn.close()
+    return [dict(zip(SIGNAL_COLUMNS, r)) for r in rows]
+
 
+def latest_signals(symbol: str | None = None, timeframe: str | None = None) -> List[Dict[str, Any]]:
+    """Última señal por símbolo/TF (tabla signal_latest: no recorre el diario)."""
+    cols = ("symbol", "timeframe", "signal_id", "side", "price", "tsl",
+            "candle_time", "emitted_at", "latency_ms", "alerted")
+    where, params = [], []
+    if symbol:
+        where.append("symbol = ?")
+        params.append(symbol)
+    if timeframe:
+        where.append("timeframe = ?")
+        params.append(timeframe)
+    q = f"SELECT {', '.join(cols)} FROM signal_latest"
     if where:
         q += " WHERE " + " AND ".join(where)
+    q += " ORDER BY symbol, timeframe"
+    conn = get_conn()
+    rows = conn.execute(q, params).fetchall()
+    conn.close()
+    return [dict(zip(cols, r)) for r in rows]
 
-    q += " ORDER BY id DESC LIMIT ?"
-    params.append(limit)
 
-    rows = c.execute(q, params).fetchall()
+# =========================================================
+# SUSCRIPCIONES DE ALERTAS
+# =========================================================
+SUBSCRIPTION_COLUMNS = ("id", "name", "channel", "target", "symbols", "timeframes",
+                        "pattern_types", "kinds", "min_score", "enabled", "created_at")
+SUBSCRIPTION_LISTS = ("symbols", "timeframes", "pattern_types", "kinds")
+
+
+def _csv(values) -> str | None:
+    if not values:
+        return None
+    if isinstance(values, str):
+        values = values.split(",")
+    values = [v.strip() for v in values if v and v.strip()]
+    return ",".join(dict.fromkeys(values)) or None
+
+
+def add_subscriptions(subs: list) -> list:
+    """Alta de suscripciones (dicts con channel, target y filtros opcionales) en una transacción."""
+    now = datetime.now(timezone.utc)
+    conn = get_conn()
+    ids = []
+    for s in subs:
+        cur = conn.execute(f"""
+            INSERT INTO alert_subscriptions ({", ".join(SUBSCRIPTION_COLUMNS[1:])}, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            s.get("name"), s["channel"], str(s["target"]),
+            *(_csv(s.get(k)) for k in SUBSCRIPTION_LISTS),
+            float(s.get("min_score") or 0), int(s.get("enabled", True)),
+            now.isoformat(), int(now.timestamp() * 1000),
+        ))
+        ids.append(cur.lastrowid)
+    conn.commit()
+    conn.close()
+    return ids
+
+
+def add_subscription(channel: str, target: str, **filters) -> int:
+    return add_subscriptions([dict(filters, channel=channel, target=target)])[0]
+
+
+def delete_subscription(sub_id: int) -> bool:
+    conn = get_conn()
+    cur = conn.execute("DELETE FROM alert_subscriptions WHERE id = ?", (sub_id,))
+    conn.commit()
     conn.close()
+    return cur.rowcount > 0
+
 
+def list_subscriptions(enabled_only: bool = False) -> List[Dict[str, Any]]:
+    """Suscripciones con los filtros como listas (None = cualquiera)."""
+    q = f"SELECT {', '.join(SUBSCRIPTION_COLUMNS)} FROM alert_subscriptions"
+    if enabled_only:
+        q += " WHERE enabled = 1"
+    q += " ORDER BY id"
+    conn = get_conn()
+    rows = conn.execute(q).fetchall()
+    conn.close()
     out = []
     for r in rows:
-        out.append({
-            "id": r[0],
-            "symbol": r[1],
-            "timeframe": r[2],
-            "pattern_type": r[3],
-            "direction": r[4],
-            "score": r[5],
-            "d_time": r[6],
-            "created_at": r[7],
-        })
+        sub = dict(zip(SUBSCRIPTION_COLUMNS, r))
+        for k in SUBSCRIPTION_LISTS:
+            sub[k] = sub[k].split(",") if sub[k] else None
+        sub["enabled"] = bool(sub["enabled"])
+        out.append(sub)
     return out
 
 
-def stats():
+def subscriptions_version() -> tuple:
+    """Cambia con cualquier alta/baja (para recargar el índice sin leer la tabla)."""
     conn = get_conn()
-    c = conn.cursor()
-    total = c.execute("SELECT COUNT(*) FROM patterns").fetchone()[0]
-    by_symbol = c.execute("""
-        SELECT symbol, COUNT(*) FROM patterns
-        GROUP BY symbol
-        ORDER BY COUNT(*) DESC
-    """).fetchall()
-    by_tf = c.execute("""
-        SELECT timeframe, COUNT(*) FROM patterns
-        GROUP BY timeframe
-        ORDER BY COUNT(*) DESC
-    """).fetchall()
+    row = conn.execute(
+        "SELECT COUNT(*), MAX(id), MAX(updated_at) FROM alert_subscriptions"
+    ).fetchone()
     conn.close()
-    return {
-        "total": total,
-        "by_symbol": by_symbol,
-        "by_timeframe": by_tf,
-    }
+    return tuple(row)
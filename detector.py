@@ -1,99 +1,67 @@
 # detector.py
-import requests
+import os
+import threading
 import time
-from datetime import datetime, timezone
-from db import init_db, save_pattern
+from collections import OrderedDict
+from functools import partial
+from db import init_db, save_pattern, save_candles
+from candles import Candles
+from clock import CLOCK
+from outcomes import track_pattern, update_open_outcomes
+from prz import PROJECTOR, project_d_bands
+from confluence import CONFLUENCE
+from ratelimit import PRIORITY_DETECTOR
+from kline_cache import fetch_klines
+from indicators import ZigZag, atr_series, push_pivots
+from warmstart import WARM, WARM_SEEN_MAX
+from templates import TEMPLATES, CompiledTemplates
 
 # =========================================================
 # CONFIG
 # =========================================================
-BINANCE_BASE = "https://fapi.binance.com"
+BINANCE_BASE = os.getenv("BINANCE_BASE", "https://fapi.binance.com")
 SYMBOLS = ["LTCUSDT"]
 KLINES_LIMIT = 500
 
+# solo swings de al menos N × ATR(14) (ZigZag sobre los pivots locales); 0 = sin filtro.
+# Apagado por defecto: cambia qué patrones salen, así que se prende a propósito (p. ej. 3)
+PIVOT_ATR_MULT = float(os.getenv("PIVOT_ATR_MULT", 0))
+PIVOT_ATR_PERIOD = 14
+
 # Umbral y tolerancia más estrictos
 MIN_SCORE = 70.0
 DEFAULT_TOLERANCE = 0.08  # 8%
 
-# Plantillas con chequeo extra por AD/XA o AD/XA extensión
-HARMONIC_TEMPLATES = [
-    # Gartley: D ≈ 0.786 de XA
-    {
-        "name": "Gartley",
-        "ab_xa": (0.618, 0.618),
-        "bc_ab": (0.382, 0.886),
-        "cd_bc": (1.27, 1.618),
-        "ad_xa": (0.76, 0.82),   # ventana alrededor de 0.786 (ajustable)
-    },
-    # Bat: D ≈ 0.886 de XA
-    {
-        "name": "Bat",
-        "ab_xa": (0.382, 0.50),
-        "bc_ab": (0.382, 0.886),
-        "cd_bc": (1.618, 2.618),
-        "ad_xa": (0.86, 0.91),   # ventana alrededor de 0.886
-    },
-    # Butterfly: D = extensión 1.27–1.618 de XA
-    {
-        "name": "Butterfly",
-        "ab_xa": (0.786, 0.786),
-        "bc_ab": (0.382, 0.886),
-        "cd_bc": (1.618, 2.24),
-        "ad_xa_ext": (1.27, 1.618),
-    },
-    # Crab: D = extensión ~1.618 de XA (rango amplio)
-    {
-        "name": "Crab",
-        "ab_xa": (0.382, 0.618),
-        "bc_ab": (0.382, 0.886),
-        "cd_bc": (2.24, 3.618),
-        "ad_xa_ext": (1.55, 1.75),
-    },
-    # Cypher (proxy por AD/XA; ideal: AD/XC≈0.786 y C=1.27–1.414 de XA)
-    {
-        "name": "Cypher",
-        "ab_xa": (0.382, 0.618),
-        "bc_ab": (1.27, 1.414),
-        "cd_bc": (1.27, 2.00),
-        "ad_xa": (0.74, 0.82),
-    },
-
-]
+# Plantillas: harmonic_templates.json (recarga en caliente, ver templates.py)
+
+# memo por slot (símbolo, TF, última vela cerrada): entradas en LRU
+DETECTOR_MEMO_SIZE = int(os.getenv("DETECTOR_MEMO_SIZE", 1024))
+PIVOT_LEFT = 2
+PIVOT_RIGHT = 2
 
 
 
 # =========================================================
 # HELPERS DE RED Y VELAS
 # =========================================================
-def get_klines(symbol: str, interval: str, limit: int = 500):
-    url = f"{BINANCE_BASE}/fapi/v1/klines"
-    params = {"symbol": symbol, "interval": interval, "limit": limit}
-    resp = requests.get(url, params=params, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
-    out = []
-    for k in data:
-        out.append(
-            {
-                "open_time": k[0],
-                "open": float(k[1]),
-                "high": float(k[2]),
-                "low": float(k[3]),
-                "close": float(k[4]),
-            }
-        )
-    return out
+def get_klines(symbol: str, interval: str, limit: int = 500, priority: int = PRIORITY_DETECTOR,
+               timeout: float = 10, wait_s: float | None = None):
+    return fetch_klines(symbol, interval, limit, priority=priority, timeout=timeout, wait_s=wait_s)
 
 
 # =========================================================
 # DETECCIÓN DE PIVOTS Y CANDIDATOS
 # =========================================================
-def find_pivots(candles, left=2, right=2):
-    highs = [c["high"] for c in candles]
-    lows = [c["low"] for c in candles]
+def find_pivots(candles: Candles, left=2, right=2, start=None, stop=None):
+    """Pivots locales con índice en [start, stop) (por defecto, todos los posibles)."""
+    highs = candles.high
+    lows = candles.low
+    times = candles.open_time
     pivots = []
 
-    for i in range(left, len(candles) - right):
+    start = left if start is None else max(left, start)
+    stop = len(candles) - right if stop is None else min(len(candles) - right, stop)
+    for i in range(start, stop):
         is_high = all(highs[i] >= highs[i - j] for j in range(1, left + 1)) and \
                   all(highs[i] > highs[i + j] for j in range(1, right + 1))
         is_low = all(lows[i] <= lows[i - j] for j in range(1, left + 1)) and \
@@ -103,14 +71,14 @@ def find_pivots(candles, left=2, right=2):
             pivots.append({
                 "index": i,
                 "price": highs[i],
-                "time": candles[i]["open_time"],
+                "time": times[i],
                 "type": "high",
             })
         if is_low:
             pivots.append({
                 "index": i,
                 "price": lows[i],
-                "time": candles[i]["open_time"],
+                "time": times[i],
                 "type": "low",
             })
 
@@ -171,7 +139,9 @@ def score_ratio(actual, expected_min, expected_max, tolerance=DEFAULT_TOLERANCE)
     return 0.0
 
 
-def validate_against_templates(cand):
+def validate_against_templates(cand, tpls: CompiledTemplates | None = None):
+    """Mejor plantilla para la cadena XABCD contra las bandas ya compiladas."""
+    tpls = tpls or TEMPLATES.current()
     x = cand["x"]["price"]
     a = cand["a"]["price"]
     b = cand["b"]["price"]
@@ -185,103 +155,273 @@ def validate_against_templates(cand):
     ad = abs(d - a)
 
     if xa == 0 or ab == 0 or bc == 0:
-        return False, 0.0, None
-
-    best_ok = False
-    best_score = 0.0
-    best_name = None
-
-    for tpl in HARMONIC_TEMPLATES:
-        r_ab_xa = _ratio(ab, xa)
-        r_bc_ab = _ratio(bc, ab)
-        r_cd_bc = _ratio(cd, bc)
-        r_ad_xa = _ratio(ad, xa)
-
-        # pesos: retracciones 60–70%, AD/XA 30–40%
-        s1 = score_ratio(r_ab_xa, *tpl["ab_xa"])
-        s2 = score_ratio(r_bc_ab, *tpl["bc_ab"])
-        s3 = score_ratio(r_cd_bc, *tpl["cd_bc"])
-
-        # chequeo extra por AD/XA o extensión
-        if "ad_xa" in tpl:
-            s4 = score_ratio(r_ad_xa, *tpl["ad_xa"])
-        elif "ad_xa_ext" in tpl:
-            s4 = score_ratio(r_ad_xa, *tpl["ad_xa_ext"])
-        else:
-            s4 = 0.0
+        return False, 0.0, None, None
+
+    r_ab_xa = _ratio(ab, xa)
+    r_bc_ab = _ratio(bc, ab)
+    r_cd_bc = _ratio(cd, bc)
+    r_ad_xa = _ratio(ad, xa)
+
+    # pesos por defecto: (AB/XA, BC/AB, CD/BC, AD/XA) = 0.28, 0.24, 0.28, 0.20
+    best_score, best_name, best_subscores = tpls.best((r_ab_xa, r_bc_ab, r_cd_bc, r_ad_xa))
+
+    detail = {
+        "ratios": {"ab_xa": r_ab_xa, "bc_ab": r_bc_ab, "cd_bc": r_cd_bc, "ad_xa": r_ad_xa},
+        "subscores": best_subscores,
+    }
+    return best_score >= MIN_SCORE, best_score, best_name, detail
+
 
-        # ponderación: (AB/XA, BC/AB, CD/BC, AD/XA)
-        score = (s1 * 0.28) + (s2 * 0.24) + (s3 * 0.28) + (s4 * 0.20)
-        score_pct = score * 100.0
 
-        if score_pct > best_score:
-            best_score = score_pct
-            best_name = tpl["name"]
-            best_ok = score_pct >= MIN_SCORE
+def d_zone(cand, pname, tpls: CompiledTemplates | None = None):
+    """Zona D (PRZ) de la plantilla ganadora; si no hay banda, D ± tolerancia/10."""
+    tpls = tpls or TEMPLATES.current()
+    bands = project_d_bands(cand["x"]["price"], cand["a"]["price"], cand["b"]["price"],
+                            cand["c"]["price"], cand["direction"], tpls.by_name(pname),
+                            tpls.tolerance, partial(score_ratio, tolerance=tpls.tolerance))
+    d = cand["d"]["price"]
+    if bands:
+        _, lo, hi = bands[0]
+        return min(lo, d), max(hi, d)
+    pad = d * tpls.tolerance / 10
+    return d - pad, d + pad
 
-    return best_ok, best_score, best_name
 
+# =========================================================
+# MEMO POR SLOT (etapas sobre velas cerradas)
+# =========================================================
+# Dentro de un bloque de 15m / 1h los tres disparos ven las mismas velas
+# cerradas: solo cambia la vela en formación. Los pivots con índice
+# i <= n - right - 2 no la tocan, y el ATR de una vela solo depende de las
+# anteriores, así que pivots, ZigZag y el scoring de los candidatos que no
+# usan el último pivot se calculan una vez por slot. Lo que depende de la
+# vela en formación (un pivot a lo sumo, y las cadenas que lo incluyen) se
+# rehace en cada disparo.
+class StageMemo:
+    """LRU de etapas del detector por (símbolo, TF, vela cerrada, parámetros)."""
+
+    def __init__(self, maxsize: int = DETECTOR_MEMO_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def info(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        return {"size": size, "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+STAGES = StageMemo()
+
+
+def _closed_stages(symbol: str, tf: str, klines: Candles):
+    """
+    Pivots (ya filtrados por ZigZag) de las velas cerradas, para este slot.
+    Devuelve (entry, nuevo) donde nuevo=False si salió del memo.
+    """
+    n = len(klines)
+    params = (PIVOT_LEFT, PIVOT_RIGHT, PIVOT_ATR_MULT, PIVOT_ATR_PERIOD, MIN_SCORE)
+    key = (symbol, tf, klines.open_time[n - 2] if n > 1 else None, n, params)
+    entry = STAGES.get(key)
+    if entry is not None:
+        return entry, False
+
+    # pivots que no dependen de la vela en formación (índice n - 1)
+    raw = find_pivots(klines, PIVOT_LEFT, PIVOT_RIGHT, stop=n - 1 - PIVOT_RIGHT)
+    zz = atr = None
+    if PIVOT_ATR_MULT > 0:
+        atr = atr_series(klines[:-1], PIVOT_ATR_PERIOD)
+        zz = ZigZag(atr_mult=PIVOT_ATR_MULT)
+        push_pivots(zz, raw, atr)
+        pivots = zz.pivots
+    else:
+        pivots = raw
+    entry = {"pivots": pivots, "zz": zz, "atr": atr, "scored": None}
+    STAGES.put(key, entry)
+    return entry, True
+
+
+def _with_forming_tail(entry: dict, klines: Candles) -> list:
+    """Pivots completos: los del memo + los que dependen de la vela en formación."""
+    n = len(klines)
+    tail = find_pivots(klines, PIVOT_LEFT, PIVOT_RIGHT, start=n - 1 - PIVOT_RIGHT)
+    if entry["zz"] is None:
+        return entry["pivots"] + tail
+    zz = entry["zz"].copy()
+    return push_pivots(zz, tail, entry["atr"])
+
+
+def _evaluate(cands, tpls: CompiledTemplates) -> list:
+    evaluated = []
+    for cand in cands:
+        ok, score, pname, detail = validate_against_templates(cand, tpls)
+        if not ok:
+            continue
+        evaluated.append((cand["d"]["time"], score, pname, cand, detail))
+    return evaluated
+
+
+def _evaluate_staged(entry: dict, pivots: list, tpls: CompiledTemplates) -> list:
+    """
+    Candidatos válidos en el mismo orden que build_candidates(pivots). Las
+    cadenas que no usan el último pivot del memo (el ZigZag puede
+    reemplazarlo con el de la cola) se puntúan una vez por slot y versión de
+    plantillas; el resto, en cada disparo.
+    """
+    stable = max(0, len(entry["pivots"]) - 1)
+    tkey = (tpls.source, tpls.loaded_at)
+    scored = entry["scored"]
+    if scored is None or scored[0] != tkey:
+        scored = (tkey, _evaluate(build_candidates(pivots[:stable]), tpls))
+        entry["scored"] = scored
+    # ventanas de 5 pivots que llegan a la zona inestable
+    tail = build_candidates(pivots[max(0, stable - 4):])
+    return scored[1] + _evaluate(tail, tpls)
 
 
 # =========================================================
 # DETECCIÓN POR TF (llamado solo cuando toca)
 # =========================================================
+class ScanCancelled(Exception):
+    """El scan pasó su deadline (slot del screener vencido) y se abandonó."""
+
+
+def _left(deadline: float | None) -> float | None:
+    """Segundos hasta el deadline (time.monotonic); ScanCancelled si ya pasó."""
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise ScanCancelled("deadline del slot vencido")
+    return left
+
+
+def scan_symbol(symbol: str, tf: str, priority: int = PRIORITY_DETECTOR,
+                deadline: float | None = None):
+    """
+    Baja velas, actualiza outcomes/PRZ y devuelve el mejor patrón válido por
+    bucket (misma vela de D), sin emitir nada. Propaga errores de red.
+    Con deadline (time.monotonic) el pedido de velas no espera más que eso y
+    entre paso y paso se corta con ScanCancelled.
+    """
+    left = _left(deadline)
+    if left is None:
+        klines = get_klines(symbol, tf, KLINES_LIMIT, priority=priority)
+    else:
+        klines = get_klines(symbol, tf, KLINES_LIMIT, priority=priority,
+                            timeout=min(10.0, left), wait_s=left)
+
+    # seguimiento de patrones abiertos con las velas ya cerradas (sin la que se forma)
+    _left(deadline)
+    update_open_outcomes(symbol, tf, klines[:-1])
+
+    # en mercados laterales casi todo es pivot local: nos quedamos con los swings
+    # relevantes (ZigZag por ATR); lo de velas cerradas sale del memo del slot
+    _left(deadline)
+    entry, fresh = _closed_stages(symbol, tf, klines)
+    if fresh:
+        save_candles(symbol, tf, klines[:-1])  # repetir el slot no trae velas cerradas nuevas
+    pivots = _with_forming_tail(entry, klines)
+
+    # zonas PRZ de la cadena XABC viva (D todavía formándose) para alertas tempranas;
+    # antes de reemplazarlas, las que tocó el precio quedan pendientes para el bot
+    PROJECTOR.observe(symbol, klines[-2:])
+    # una sola versión de las plantillas para todo el scan (aunque se recarguen en el medio)
+    tpls = TEMPLATES.current()
+    PROJECTOR.project(symbol, tf, pivots, klines, tpls.templates, tpls.tolerance,
+                      partial(score_ratio, tolerance=tpls.tolerance))
+
+    # 1) evaluar todos
+    _left(deadline)
+    evaluated = _evaluate_staged(entry, pivots, tpls)
+
+    # 2) agrupar por bucket (misma vela de D)
+    buckets = {}
+    for d_time, score, pname, cand, detail in evaluated:
+        key = f"{symbol}:{tf}:{d_time//60000}"
+        cur = buckets.get(key)
+        if (cur is None) or (score > cur["score"]):
+            buckets[key] = {"symbol": symbol, "tf": tf, "score": score, "pname": pname,
+                            "cand": cand, "detail": detail}
+    return list(buckets.values())
+
+
+def pattern_key(item) -> str:
+    """Clave de dedupe de un patrón de scan_symbol (la que guarda `seen`)."""
+    cand = item["cand"]
+    return f"{item['symbol']}:{item['tf']}:{cand['d']['time']}:{item['pname']}:{cand['direction']}"
+
+
+def emit_pattern(item, send_fn, log_fn, seen: set) -> bool:
+    """Guarda y avisa un patrón (con dedupe). True si era nuevo."""
+    symbol = item["symbol"]
+    tf = item["tf"]
+    cand = item["cand"]
+    score = item["score"]
+    pname = item["pname"]
+    d_time = cand["d"]["time"]
+    direction = cand["direction"]
+
+    dedup_key = pattern_key(item)
+    if dedup_key in seen:
+        return False
+
+    points = {p: cand[p] for p in ("x", "a", "b", "c", "d")}
+    detail = item["detail"]
+
+    pattern_id = save_pattern(symbol, tf, pname, direction, score, points,
+                              ratios=detail["ratios"], subscores=detail["subscores"])
+    track_pattern(pattern_id, symbol, tf, cand)
+    msg = f"📐 Patrón armónico {pname} {direction} en {symbol} TF={tf} score={score:.1f}"
+
+    print(f"[detector] {msg}")
+    if log_fn:
+        log_fn(msg)   # ← consola del panel
+    if send_fn:
+        # ← Telegram (+ suscriptores que filtran por símbolo/TF/plantilla/score)
+        send_fn(msg, {"kind": "pattern", "symbol": symbol, "timeframe": tf,
+                      "pattern_type": pname, "direction": direction, "score": score})
+
+    seen.add(dedup_key)
+
+    # join con otros TF y con señales breakout del mismo símbolo
+    lo, hi = d_zone(cand, pname)
+    for alert in CONFLUENCE.on_pattern(symbol, tf, direction, pname, score, lo, hi,
+                                       d_time, CLOCK.server_now_ms()):
+        cmsg = f"🔗 Confluencia {symbol} (rank {alert['rank']}): {alert['text']}"
+        print(f"[detector] {cmsg}")
+        if log_fn:
+            log_fn(cmsg)
+        if send_fn:
+            send_fn(cmsg, {"kind": "confluence", "symbol": symbol, "timeframe": tf,
+                           "pattern_type": alert.get("template"), "score": alert.get("score")})
+    return True
+
+
 def detect_for_tf(symbol: str, tf: str, send_fn, log_fn, seen: set):
     try:
-        klines = get_klines(symbol, tf, KLINES_LIMIT)
-        pivots = find_pivots(klines, left=2, right=2)
-        cands = build_candidates(pivots)
-
-        # 1) evaluar todos
-        evaluated = []
-        for cand in cands:
-            ok, score, pname = validate_against_templates(cand)
-            if not ok:
-                continue
-            d_time = cand["d"]["time"]
-            evaluated.append((d_time, score, pname, cand))
-
-        if not evaluated:
-            return
-
-        # 2) agrupar por bucket (misma vela de D)
-        buckets = {}
-        for d_time, score, pname, cand in evaluated:
-            key = f"{symbol}:{tf}:{d_time//60000}"
-            cur = buckets.get(key)
-            if (cur is None) or (score > cur["score"]):
-                buckets[key] = {"score": score, "pname": pname, "cand": cand}
-
         # 3) emitir solo el mejor por bucket (con dedupe)
-        for key, item in buckets.items():
-            cand = item["cand"]
-            score = item["score"]
-            pname = item["pname"]
-            d_time = cand["d"]["time"]
-            direction = cand["direction"]
-
-            dedup_key = f"{symbol}:{tf}:{d_time}:{pname}:{direction}"
-            if dedup_key in seen:
-                continue
-
-            points = {
-                "x": datetime.utcfromtimestamp(cand["x"]["time"] / 1000).isoformat(),
-                "a": datetime.utcfromtimestamp(cand["a"]["time"] / 1000).isoformat(),
-                "b": datetime.utcfromtimestamp(cand["b"]["time"] / 1000).isoformat(),
-                "c": datetime.utcfromtimestamp(cand["c"]["time"] / 1000).isoformat(),
-                "d": datetime.utcfromtimestamp(cand["d"]["time"] / 1000).isoformat(),
-            }
-
-            save_pattern(symbol, tf, pname, direction, score, points)
-            msg = f"📐 Patrón armónico {pname} {direction} en {symbol} TF={tf} score={score:.1f}"
-
-            print(f"[detector] {msg}")
-            if log_fn:
-                log_fn(msg)   # ← consola del panel
-            if send_fn:
-                send_fn(msg)  # ← Telegram
-
-            seen.add(dedup_key)
+        for item in scan_symbol(symbol, tf):
+            emit_pattern(item, send_fn, log_fn, seen)
 
     except Exception as e:
         print(f"[detector] error en {tf}: {e}")
@@ -293,6 +433,13 @@ def detect_for_tf(symbol: str, tf: str, send_fn, log_fn, seen: set):
 # =========================================================
 # LOOP PRINCIPAL CON TUS HORARIOS
 # =========================================================
+def seen_tail(seen: set, limit: int = WARM_SEEN_MAX) -> list:
+    """Las `limit` claves de dedupe más recientes por tiempo de D (symbol:tf:d_time:...)."""
+    if len(seen) <= limit:
+        return list(seen)
+    return sorted(seen, key=lambda k: int(k.split(":")[2]))[-limit:]
+
+
 def run_detector(send_fn=None, log_fn=None):
     """Detector armónico con doble salida (console + Telegram)."""
     if log_fn is None:
@@ -301,16 +448,30 @@ def run_detector(send_fn=None, log_fn=None):
     log_fn("[detector] iniciado (horario 3x15m y 3x1h)")
     print("[detector] iniciando detector armónico (horario 3x15m y 3x1h)")
 
-    init_db()
-    seen = set()
-
+    # import diferido: screener importa este módulo
+    from screener import SCREENER_ENABLED, screen_slot
 
-    # para no ejecutar dos veces el mismo disparo
-    last_run_15m = None
-    last_run_1h = None
+    init_db()
+    CLOCK.ensure_started()  # mismo reloj que bot_loop (hora del servidor)
+
+    # dedupe y últimos disparos del snapshot: tras un reinicio no se repiten
+    # patrones ya avisados ni se vuelve a correr un slot que ya corrió
+    warm = WARM.section("detector") or {}
+    seen = set(warm.get("seen", ()))
+    last_run_15m = warm.get("last_run_15m")
+    last_run_1h = warm.get("last_run_1h")
+    if warm:
+        log_fn(f"[detector] estado restaurado ({len(seen)} patrones ya avisados)")
+
+    def checkpoint():
+        WARM.put("detector", {
+            "seen": seen_tail(seen),
+            "last_run_15m": last_run_15m,
+            "last_run_1h": last_run_1h,
+        }, flush=True)
 
     while True:
-        now = datetime.utcnow().replace(tzinfo=timezone.utc)
+        now = CLOCK.server_now()
         m = now.minute
         s = now.second
         h = now.hour
@@ -338,9 +499,13 @@ def run_detector(send_fn=None, log_fn=None):
         if run_15m and last_run_15m != slot_15m:
             if log_fn:
                 log_fn(f"[ventana] 15m {slot_15m} → ejecutando detección")
-            for sym in SYMBOLS:
-                detect_for_tf(sym, "15m", send_fn, log_fn, seen)
+            if SCREENER_ENABLED:
+                screen_slot("15m", send_fn, log_fn, seen)
+            else:
+                for sym in SYMBOLS:
+                    detect_for_tf(sym, "15m", send_fn, log_fn, seen)
             last_run_15m = slot_15m
+            checkpoint()
 
         # ---------- 1h ----------
         # 3 disparos: 20:30, 40:30, 59:30
@@ -360,12 +525,16 @@ def run_detector(send_fn=None, log_fn=None):
         if run_1h and last_run_1h != slot_1h:
             if log_fn:
                 log_fn(f"[ventana] 1h {slot_1h} → ejecutando detección")
-            for sym in SYMBOLS:
-                detect_for_tf(sym, "1h", send_fn, log_fn, seen)
+            if SCREENER_ENABLED:
+                screen_slot("1h", send_fn, log_fn, seen)
+            else:
+                for sym in SYMBOLS:
+                    detect_for_tf(sym, "1h", send_fn, log_fn, seen)
             last_run_1h = slot_1h
+            checkpoint()
 
         # loop ligero
-        time.sleep(1)
+        CLOCK.sleep(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,11 @@
+# gunicorn.conf.py
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 10000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 8))
+# sin preload: cada worker importa la app después del fork (hilos + flock por proceso)
+preload_app = False
+timeout = 60
+keepalive = 5
@@ -0,0 +1,202 @@
+# indicators.py
+import math
+from array import array
+from collections import deque
+
+# =========================================================
+# INDICADORES EN STREAMING (O(1) por vela)
+# =========================================================
+# Cada indicador recibe una vela a la vez con update(...) y guarda solo lo
+# necesario para la siguiente: sirven tanto para recorrer las columnas de un
+# Candles completo (detector) como para ir vela a vela (process_new_candle).
+
+
+class ATR:
+    """Average True Range con suavizado de Wilder. value es None hasta tener `period` velas."""
+
+    __slots__ = ("period", "value", "_prev_close", "_n", "_sum")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.value = None
+        self._prev_close = None
+        self._n = 0
+        self._sum = 0.0
+
+    def update(self, high: float, low: float, close: float):
+        pc = self._prev_close
+        tr = high - low if pc is None else max(high - low, abs(high - pc), abs(low - pc))
+        self._prev_close = close
+        if self.value is None:
+            self._n += 1
+            self._sum += tr
+            if self._n == self.period:
+                self.value = self._sum / self.period
+        else:
+            self.value += (tr - self.value) / self.period
+        return self.value
+
+
+class RollingMax:
+    """Máximo de las últimas `window` entradas (deque monótona, O(1) amortizado)."""
+
+    __slots__ = ("window", "_q", "_i")
+
+    def __init__(self, window: int):
+        self.window = window
+        self._q = deque()  # (índice, valor) con valores decrecientes
+        self._i = 0
+
+    def update(self, v: float) -> float:
+        q = self._q
+        while q and q[-1][1] <= v:
+            q.pop()
+        q.append((self._i, v))
+        if q[0][0] <= self._i - self.window:
+            q.popleft()
+        self._i += 1
+        return q[0][1]
+
+    @property
+    def value(self):
+        return self._q[0][1] if self._q else None
+
+
+class RollingMin(RollingMax):
+    """Mínimo de las últimas `window` entradas."""
+
+    __slots__ = ()
+
+    def update(self, v: float) -> float:
+        return -super().update(-v)
+
+    @property
+    def value(self):
+        return -self._q[0][1] if self._q else None
+
+
+class RollingVolatility:
+    """Desvío estándar de los log-retornos de cierre en una ventana (sumas móviles)."""
+
+    __slots__ = ("window", "value", "_rets", "_sum", "_sq", "_prev")
+
+    def __init__(self, window: int = 20):
+        self.window = window
+        self.value = None
+        self._rets = deque()
+        self._sum = 0.0
+        self._sq = 0.0
+        self._prev = None
+
+    def update(self, close: float):
+        prev, self._prev = self._prev, close
+        if prev is None or prev <= 0 or close <= 0:
+            return self.value
+        r = math.log(close / prev)
+        self._rets.append(r)
+        self._sum += r
+        self._sq += r * r
+        if len(self._rets) > self.window:
+            old = self._rets.popleft()
+            self._sum -= old
+            self._sq -= old * old
+        n = len(self._rets)
+        if n >= 2:
+            mean = self._sum / n
+            self.value = math.sqrt(max(0.0, (self._sq - n * mean * mean) / (n - 1)))
+        return self.value
+
+
+class Donchian:
+    """Canal de máximos/mínimos de `window` velas: (res, sup) antes y después de cada vela."""
+
+    __slots__ = ("hi", "lo", "last_time")
+
+    def __init__(self, window: int):
+        self.hi = RollingMax(window)
+        self.lo = RollingMin(window)
+        self.last_time = None  # close_time de la última vela consumida
+
+    def update(self, high: float, low: float, t: int | None = None):
+        prev = (self.hi.value, self.lo.value)
+        res = self.hi.update(high)
+        sup = self.lo.update(low)
+        self.last_time = t
+        return prev, (res, sup)
+
+
+# =========================================================
+# ZIGZAG (swings por % o por múltiplo de ATR)
+# =========================================================
+class ZigZag:
+    """
+    Filtra pivots candidatos dejando solo swings alternados cuyo recorrido
+    desde el pivot anterior supera el umbral: max(pct * precio, atr_mult * ATR).
+    Un pivot del mismo tipo y más extremo reemplaza al último (el swing se
+    extiende); uno opuesto que no llega al umbral se ignora.
+    """
+
+    __slots__ = ("pct", "atr_mult", "pivots")
+
+    def __init__(self, pct: float = 0.0, atr_mult: float = 0.0):
+        self.pct = pct
+        self.atr_mult = atr_mult
+        self.pivots = []
+
+    def copy(self) -> "ZigZag":
+        """Mismo estado, lista propia (los pivots en sí no se modifican)."""
+        zz = ZigZag(self.pct, self.atr_mult)
+        zz.pivots = list(self.pivots)
+        return zz
+
+    def threshold(self, price: float, atr: float | None) -> float:
+        return max(self.pct * price, self.atr_mult * (atr or 0.0))
+
+    def push(self, pivot: dict, atr: float | None = None) -> bool:
+        """Agrega un pivot candidato; devuelve True si cambió la lista."""
+        pts = self.pivots
+        if not pts:
+            pts.append(pivot)
+            return True
+        last = pts[-1]
+        if pivot["type"] == last["type"]:
+            more_extreme = pivot["price"] > last["price"] if pivot["type"] == "high" \
+                else pivot["price"] < last["price"]
+            if more_extreme:
+                pts[-1] = pivot
+                return True
+            return False
+        if abs(pivot["price"] - last["price"]) >= self.threshold(last["price"], atr):
+            pts.append(pivot)
+            return True
+        return False
+
+
+def atr_series(candles, period: int = 14) -> array:
+    """ATR vela a vela sobre un Candles (NaN hasta tener `period` velas)."""
+    atr = ATR(period)
+    out = array("d")
+    nan = float("nan")
+    for h, l, c in zip(candles.high, candles.low, candles.close):
+        v = atr.update(h, l, c)
+        out.append(nan if v is None else v)
+    return out
+
+
+def push_pivots(zz: ZigZag, pivots: list, atr: array | None = None) -> list:
+    """Pasa pivots por el ZigZag con el ATR de la vela de cada uno (atr_series)."""
+    # antes de tener `period` velas se usa el primer ATR disponible
+    first = next((v for v in atr if v == v), None) if atr is not None else None
+    for p in pivots:
+        v = atr[p["index"]] if atr is not None else None
+        zz.push(p, first if v is None or v != v else v)
+    return zz.pivots
+
+
+def significant_pivots(pivots: list, candles, atr_mult: float = 1.0,
+                       pct: float = 0.0, period: int = 14) -> list:
+    """Pivots de find_pivots reducidos a swings que superan el umbral de volatilidad."""
+    if not pivots or (atr_mult <= 0 and pct <= 0):
+        return pivots
+    atr = atr_series(candles, period) if atr_mult > 0 else None
+    return push_pivots(ZigZag(pct=pct, atr_mult=atr_mult), pivots, atr)
@@ -0,0 +1,124 @@
+# kline_cache.py
+import os
+import threading
+import time
+
+from candles import Candles, decode_klines, TF_MS
+from clock import CLOCK
+from ratelimit import governed_get, PRIORITY_DETECTOR
+
+# =========================================================
+# CONFIG
+# =========================================================
+BINANCE_BASE = os.getenv("BINANCE_BASE", "https://fapi.binance.com")
+# cuánto se reutiliza una respuesta; la vela en formación cambia, así que poco
+KLINES_CACHE_TTL_S = float(os.getenv("KLINES_CACHE_TTL_S", 1.0))
+
+
+class _Call:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+# =========================================================
+# SINGLE-FLIGHT + TTL
+# =========================================================
+class SingleFlight:
+    """
+    Llamadas idénticas concurrentes comparten una sola ejecución: la primera
+    hace el trabajo y las demás esperan su resultado (o su excepción). El
+    resultado queda en cache ttl_s segundos; los errores no se cachean.
+    """
+
+    def __init__(self, ttl_s: float = KLINES_CACHE_TTL_S):
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._flights = {}  # key -> _Call en curso
+        self._cache = {}    # key -> (expira, valor)
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def _purge(self, now):
+        for key in [k for k, (exp, _) in self._cache.items() if exp <= now]:
+            del self._cache[key]
+
+    def do(self, key, fn):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > now:
+                self.hits += 1
+                return cached[1]
+            call = self._flights.get(key)
+            leader = call is None
+            if leader:
+                call = self._flights[key] = _Call()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if call.error is None:
+                    now = time.monotonic()
+                    self._purge(now)
+                    self._cache[key] = (now + self.ttl_s, call.value)
+            call.event.set()
+        return call.value
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "cached": len(self._cache),
+                "in_flight": len(self._flights),
+            }
+
+
+# cache compartida por bot, detector y screener
+KLINES = SingleFlight()
+
+
+def last_closed_open_time(interval: str, now_ms: int | None = None) -> int:
+    """open_time de la última vela cerrada del TF según el reloj del servidor."""
+    tf_ms = TF_MS[interval]
+    now_ms = CLOCK.server_now_ms() if now_ms is None else now_ms
+    return (now_ms // tf_ms) * tf_ms - tf_ms
+
+
+def fetch_klines(symbol: str, interval: str, limit: int = 500,
+                 priority: int = PRIORITY_DETECTOR, timeout: float = 10,
+                 wait_s: float | None = None) -> Candles:
+    """
+    /fapi/v1/klines con single-flight. La clave incluye la última vela cerrada,
+    así que al cerrar una vela nadie recibe la respuesta del slot anterior.
+    Cada llamador recibe su propia copia (el bot extiende las suyas).
+    """
+    key = (symbol, interval, limit, last_closed_open_time(interval))
+
+    def fetch():
+        resp = governed_get(f"{BINANCE_BASE}/fapi/v1/klines",
+                            params={"symbol": symbol, "interval": interval, "limit": limit},
+                            priority=priority, timeout=timeout, wait_s=wait_s)
+        return decode_klines(resp.content)
+
+    return KLINES.do(key, fetch).copy()
@@ -0,0 +1,279 @@
+# kline_import.py
+"""
+Importador offline de históricos de velas de Binance (data.binance.vision):
+archivos mensuales/diarios SÍMBOLO-TF-AAAA-MM[-DD].zip (o .csv) de un
+directorio local, directo a la tabla candles, sin pasar por la API.
+
+    python kline_import.py ~/binance/futures/um/monthly/klines --workers 4
+    python kline_import.py ./data --symbol LTCUSDT --tf 1m --db harmonics.db
+
+Cada archivo se decodifica en un proceso aparte leyendo el CSV en bloques
+desde el zip (no se extrae a disco) y se valida (orden, duplicados, huecos);
+un solo escritor carga los resultados en transacciones grandes.
+"""
+import argparse
+import os
+import re
+import time
+import zipfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from operator import itemgetter
+
+import db
+from candles import Candles, COLUMNS, TF_MS
+
+# =========================================================
+# CONFIG
+# =========================================================
+IMPORT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+IMPORT_BATCH_ROWS = 500_000      # filas por transacción
+IMPORT_CHUNK_BYTES = 4 << 20     # bloque de lectura del CSV
+IMPORT_MAX_ISSUES = 20           # huecos/duplicados listados por archivo
+IMPORT_INFLIGHT_PER_WORKER = 2   # archivos decodificados esperando al escritor, por proceso
+
+_NAME_RE = re.compile(
+    r"^(?P<symbol>[A-Z0-9]+)-(?P<tf>\d+[mhdw])-(?P<date>\d{4}-\d{2}(?:-\d{2})?)\.(?:zip|csv)$")
+
+
+def parse_name(path: str):
+    """SÍMBOLO-TF-FECHA.zip -> (symbol, tf, fecha) o None."""
+    m = _NAME_RE.match(os.path.basename(path))
+    if not m or m.group("tf") not in TF_MS:
+        return None
+    return m.group("symbol"), m.group("tf"), m.group("date")
+
+
+def find_archives(root: str, symbol: str | None = None, tf: str | None = None) -> list:
+    """Archivos importables bajo root (recursivo), ordenados por símbolo, TF y fecha."""
+    found = []
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            meta = parse_name(name)
+            if meta is None:
+                continue
+            if (symbol and meta[0] != symbol) or (tf and meta[1] != tf):
+                continue
+            found.append((meta, os.path.join(dirpath, name)))
+    found.sort()
+    return [path for _, path in found]
+
+
+# =========================================================
+# DECODIFICACIÓN (en los procesos del pool)
+# =========================================================
+def _iter_lines(f):
+    """Líneas completas de un archivo binario, leyendo en bloques grandes."""
+    rest = b""
+    while True:
+        chunk = f.read(IMPORT_CHUNK_BYTES)
+        if not chunk:
+            break
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        yield lines
+    if rest.strip():
+        yield [rest]
+
+
+def _open_csv(path: str):
+    if path.endswith(".zip"):
+        zf = zipfile.ZipFile(path)
+        members = [n for n in zf.namelist() if n.endswith(".csv")]
+        if len(members) != 1:
+            zf.close()
+            raise ValueError(f"{path}: se espera un solo .csv adentro ({len(members)})")
+        return zf, zf.open(members[0])
+    return None, open(path, "rb")
+
+
+def decode_archive(path: str) -> Candles:
+    """
+    CSV de klines -> Candles (columnar, como decode_klines). Tolera la fila de
+    encabezado de los archivos nuevos y timestamps en microsegundos.
+    """
+    cols = {name: array(tc) for name, _, tc in COLUMNS}
+    getters = [(cols[name], itemgetter(pos), tc == "d") for name, pos, tc in COLUMNS]
+    zf, f = _open_csv(path)
+    try:
+        with f:
+            for lines in _iter_lines(f):
+                rows = [ln.split(b",", 8) for ln in lines if ln[:1].isdigit()]
+                if not rows:
+                    continue
+                for col, get, is_float in getters:
+                    col.extend(map(float if is_float else int, map(get, rows)))
+    finally:
+        if zf is not None:
+            zf.close()
+    for name in ("open_time", "close_time"):
+        col = cols[name]
+        if col and col[0] > 10 ** 14:  # microsegundos (spot desde 2025)
+            cols[name] = array("q", (v // 1000 for v in col))
+    return Candles(cols)
+
+
+def validate(candles: Candles, tf_ms: int):
+    """
+    Deja las velas en orden y sin open_time repetidos. Devuelve
+    (Candles, duplicados, huecos) con huecos = [(desde, hasta, velas faltantes)].
+    """
+    t = candles.open_time
+    n = len(t)
+    ordered = all(t[i] < t[i + 1] for i in range(n - 1))
+    if not ordered:
+        # raro en los archivos oficiales: ordenar y quedarse con la primera de cada open_time
+        idx, last = [], None
+        for i in sorted(range(n), key=t.__getitem__):
+            if t[i] != last:
+                idx.append(i)
+                last = t[i]
+        cols = {name: array(tc, (candles.column(name)[i] for i in idx)) for name, _, tc in COLUMNS}
+        candles = Candles(cols)
+        t = candles.open_time
+    dups = n - len(t)
+    gaps = []
+    for i in range(len(t) - 1):
+        step = t[i + 1] - t[i]
+        if step != tf_ms:
+            gaps.append((t[i], t[i + 1], step // tf_ms - 1))
+    return candles, dups, gaps
+
+
+def load_archive(path: str) -> dict:
+    """Trabajo de un proceso del pool: decodifica + valida un archivo."""
+    symbol, tf, date = parse_name(path)
+    t0 = time.perf_counter()
+    try:
+        candles, dups, gaps = validate(decode_archive(path), TF_MS[tf])
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        return {"path": path, "symbol": symbol, "tf": tf, "date": date, "error": str(e)}
+    return {
+        "path": path, "symbol": symbol, "tf": tf, "date": date,
+        "candles": candles, "duplicates": dups,
+        "missing": sum(g[2] for g in gaps), "gaps": gaps[:IMPORT_MAX_ISSUES],
+        "decode_s": time.perf_counter() - t0,
+    }
+
+
+# =========================================================
+# CARGA
+# =========================================================
+def _continuity(spans: dict) -> list:
+    """Huecos entre archivos consecutivos de una misma serie."""
+    out = []
+    for (symbol, tf), items in spans.items():
+        items.sort()
+        for (_, last, _), (first, _, path) in zip(items, items[1:]):
+            if first - last != TF_MS[tf]:
+                out.append({"symbol": symbol, "tf": tf, "from": last, "to": first,
+                            "missing": (first - last) // TF_MS[tf] - 1, "before": os.path.basename(path)})
+    return out
+
+
+def import_archives(paths: list, workers: int = IMPORT_WORKERS,
+                    batch_rows: int = IMPORT_BATCH_ROWS, log_fn=print) -> dict:
+    """
+    Decodifica en paralelo y carga con un solo escritor, commit cada
+    batch_rows filas. Las velas ya guardadas se ignoran (INSERT OR IGNORE),
+    así que reimportar un directorio es seguro. Hay a lo sumo
+    IMPORT_INFLIGHT_PER_WORKER archivos por proceso en vuelo: si el escritor
+    se atrasa, los procesos esperan en vez de acumular velas en memoria.
+    """
+    db.init_db()
+    conn = db.bulk_conn()
+    started = time.perf_counter()
+    report = {"files": 0, "rows": 0, "inserted": 0, "duplicates": 0, "missing": 0,
+              "errors": [], "gaps": []}
+    spans = {}
+    pending = 0
+    write_s = 0.0
+    conn.execute("BEGIN")
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            todo = iter(paths)
+            running = set()
+            max_running = max(1, workers) * IMPORT_INFLIGHT_PER_WORKER
+            while True:
+                while len(running) < max_running:
+                    path = next(todo, None)
+                    if path is None:
+                        break
+                    running.add(pool.submit(load_archive, path))
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    res = fut.result()
+                    if "error" in res:
+                        report["errors"].append({"path": res["path"], "error": res["error"]})
+                        log_fn(f"[import] {res['path']}: {res['error']}")
+                        continue
+                    candles = res["candles"]
+                    t0 = time.perf_counter()
+                    report["inserted"] += db.insert_candles(conn, res["symbol"], res["tf"], candles)
+                    pending += len(candles)
+                    if pending >= batch_rows:
+                        conn.execute("COMMIT")
+                        conn.execute("BEGIN")
+                        pending = 0
+                    write_s += time.perf_counter() - t0
+
+                    report["files"] += 1
+                    report["rows"] += len(candles)
+                    report["duplicates"] += res["duplicates"]
+                    report["missing"] += res["missing"]
+                    for a, b, k in res["gaps"]:
+                        report["gaps"].append({"symbol": res["symbol"], "tf": res["tf"],
+                                               "from": a, "to": b, "missing": k,
+                                               "file": os.path.basename(res["path"])})
+                    if len(candles):
+                        spans.setdefault((res["symbol"], res["tf"]), []).append(
+                            (candles.open_time[0], candles.open_time[-1], res["path"]))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    report["gaps"] += _continuity(spans)
+    elapsed = time.perf_counter() - started
+    report["seconds"] = round(elapsed, 2)
+    report["write_seconds"] = round(write_s, 2)
+    report["rows_per_min"] = int(report["rows"] / elapsed * 60) if elapsed > 0 else None
+    report["series"] = {f"{s}:{tf}": db.candle_range(s, tf) for s, tf in spans}
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("root", help="directorio con los .zip/.csv de data.binance.vision")
+    ap.add_argument("--symbol")
+    ap.add_argument("--tf", choices=sorted(TF_MS))
+    ap.add_argument("--workers", type=int, default=IMPORT_WORKERS)
+    ap.add_argument("--batch", type=int, default=IMPORT_BATCH_ROWS, help="filas por transacción")
+    ap.add_argument("--db", default=db.DB_PATH)
+    args = ap.parse_args()
+
+    db.DB_PATH = args.db
+    paths = find_archives(args.root, args.symbol.upper() if args.symbol else None, args.tf)
+    if not paths:
+        print("[import] no hay archivos SÍMBOLO-TF-FECHA.zip/.csv")
+        return
+    print(f"[import] {len(paths)} archivos, {args.workers} procesos -> {args.db}")
+    report = import_archives(paths, workers=args.workers, batch_rows=args.batch)
+    print(f"[import] {report['files']} archivos, {report['rows']} velas "
+          f"({report['inserted']} nuevas) en {report['seconds']}s "
+          f"= {report['rows_per_min']}/min (escritura {report['write_seconds']}s)")
+    print(f"[import] duplicados={report['duplicates']} faltantes={report['missing']} "
+          f"errores={len(report['errors'])}")
+    for g in report["gaps"][:IMPORT_MAX_ISSUES]:
+        print(f"  hueco {g['symbol']} {g['tf']}: {g['from']} -> {g['to']} ({g['missing']} velas)")
+    for key, rng in report["series"].items():
+        if rng:
+            print(f"  {key}: {rng[2]} velas [{rng[0]} .. {rng[1]}]")
+
+
+if __name__ == "__main__":
+    main()
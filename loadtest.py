@@ -0,0 +1,74 @@
+# loadtest.py
+"""
+Load test simple del panel: N clientes concurrentes (cada uno un "dashboard")
+pidiendo /status y /console como lo hace el JS, durante S segundos.
+
+    python loadtest.py http://127.0.0.1:10000 --clients 50 --seconds 20
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlparse
+
+PATHS = ("/status", "/console?limit=120")
+
+
+def client(host, port, deadline, latencies, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    i = 0
+    while time.perf_counter() < deadline:
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+            latencies.append(time.perf_counter() - t0)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.close()
+
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, int(round(p / 100.0 * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("url")
+    ap.add_argument("--clients", type=int, default=50)
+    ap.add_argument("--seconds", type=float, default=20)
+    args = ap.parse_args()
+
+    u = urlparse(args.url)
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=client, args=(u.hostname, u.port or 80, deadline, latencies, errors))
+        for _ in range(args.clients)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    lat = sorted(latencies)
+    print(f"clientes={args.clients} duración={elapsed:.1f}s requests={len(lat)} errores={len(errors)}")
+    print(f"req/s={len(lat) / elapsed:.1f}")
+    print(f"p50={percentile(lat, 50) * 1000:.1f}ms p99={percentile(lat, 99) * 1000:.1f}ms max={(lat[-1] if lat else 0) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,50 @@
 import os
+import csv
+import io
+import json
 import time
 import threading
+import re
+import uuid
+from collections import Counter
 from datetime import datetime, timedelta
 import requests
-from flask import Flask, jsonify, Response, request
-from db import list_patterns, stats  # para el frontend
-from detector import run_detector    # para arrancar el detector en un thread
+from flask import Flask, jsonify, Response, request, stream_with_context
+from db import list_patterns, iter_patterns, stats, outcome_stats, save_candles, init_db, list_rollups, PATTERN_COLUMNS  # para el frontend
+from db import list_signals, latest_signals, add_subscription, delete_subscription, list_subscriptions
+from detector import run_detector, STAGES    # para arrancar el detector en un thread
+from candles import Candles, TF_MS
+from assets import build_assets, IMMUTABLE_CACHE, SHELL_CACHE
+from clock import CLOCK
+from prz import PROJECTOR
+from zone_index import ZONES
+from confluence import CONFLUENCE
+from shared_state import StateStore, SnapshotReader, ControlFile, try_acquire_leader
+from ratelimit import GOVERNOR, PRIORITY_LIVE
+from kline_cache import fetch_klines, KLINES
+from chart import chart, ChartError, CHART_DEFAULT_BARS, CHART_MAX_BARS
+from screener import load_universe
+from indicators import ATR, Donchian, RollingVolatility
+from retention import run_retention, iter_archived
+from warmstart import WARM, candles_to_json, candles_from_json
+from templates import TEMPLATES
+from signals import SIGNALS
+from subscriptions import FANOUT, subscriptions_allowed, validate_subscription
+from profiler import SAMPLER, debug_allowed, thread_dump, PROFILE_DEFAULT_HZ, PROFILE_MAX_SECONDS
 
 
 # ======================================================
 # CONFIG
 # ======================================================
-SYMBOL = "LTCUSDT"
+SYMBOL = os.getenv("BOT_SYMBOL", "LTCUSDT")
 NO = 3  # número de velas para calcular soporte/resistencia
 
 # IFTTT opcional
 IFTTT_EVENT = os.getenv("IFTTT_EVENT", "")
 IFTTT_KEY = os.getenv("IFTTT_KEY", "")
+IFTTT_BASE = os.getenv("IFTTT_BASE", "https://maker.ifttt.com")
 IFTTT_URL = (
-    f"https://maker.ifttt.com/trigger/{IFTTT_EVENT}/with/key/{IFTTT_KEY}"
+    f"{IFTTT_BASE}/trigger/{IFTTT_EVENT}/with/key/{IFTTT_KEY}"
     if IFTTT_EVENT and IFTTT_KEY
     else None
 )
@@ -26,9 +52,10 @@ IFTTT_URL = (
 # Telegram
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
 
-# Estado global (para panel Flask)
-state = {
+# Estado global (para panel Flask); escrituras atómicas por snapshot
+state = StateStore({
     # consola de eventos (para el panel)
     "console": [],          # lista de strings
     "console_max": 200,     # cuántas líneas conservar
@@ -60,7 +87,11 @@ state = {
     # NUEVO: switches
     "alerts_1m_enabled": True,
     "alerts_15m_enabled": True,
-}
+})
+
+# modo multi-worker (ver start_worker): de dónde leen las rutas y adónde van los toggles
+status_reader = state
+control = None
 
 app = Flask(__name__)
 
@@ -71,34 +102,73 @@ def iso_utc(dt: datetime) -> str:
     return dt.replace(microsecond=0).isoformat() + "Z"
 
 
+_http = threading.local()
+
+
+def _session() -> requests.Session:
+    """Una sesión (keep-alive) por hilo: el fan-out manda muchas seguidas al mismo host."""
+    s = getattr(_http, "session", None)
+    if s is None:
+        s = _http.session = requests.Session()
+    return s
+
+
+def _post_ifttt(url: str, title, symbol, value):
+    return _session().post(url, json={"value1": title, "value2": symbol, "value3": str(value)}, timeout=5)
+
+
+def _post_telegram(chat_id, msg: str):
+    url = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_TOKEN}/sendMessage"
+    return _session().post(url, json={"chat_id": chat_id, "text": msg}, timeout=5)
+
+
+def deliver_to_subscriber(sub: dict, msg: str, event: dict):
+    """Envío de una alerta a un suscriptor (hilos del fan-out); error si no llegó."""
+    if sub["channel"] == "telegram":
+        if not TELEGRAM_TOKEN:
+            raise RuntimeError("TELEGRAM_TOKEN no configurado")
+        r = _post_telegram(sub["target"], msg)
+    else:
+        ev, key = sub["target"].split(":", 1)
+        r = _post_ifttt(f"{IFTTT_BASE}/trigger/{ev}/with/key/{key}", msg,
+                        event.get("symbol"), event.get("price", event.get("score", "")))
+    if r.status_code >= 400:
+        raise RuntimeError(f"HTTP {r.status_code}")
+
+
 def send_ifttt(title, price):
     if not IFTTT_URL:
         return
     try:
-        requests.post(IFTTT_URL, json={"value1": title, "value2": SYMBOL, "value3": str(price)}, timeout=5)
+        _post_ifttt(IFTTT_URL, title, SYMBOL, price)
     except Exception:
         pass
 
 
-def send_telegram(msg: str):
-    """Envía un mensaje a Telegram y lo registra en la consola del panel."""
+def send_telegram(msg: str, event: dict | None = None):
+    """
+    Envía un mensaje a Telegram y lo registra en la consola del panel. Con
+    event (kind, symbol, timeframe, pattern_type, score) además se reparte a
+    los suscriptores cuyos filtros lo aceptan.
+    """
     # Siempre lo registramos primero en la consola
     try:
         add_log(f"[Telegram] {msg}")
     except Exception:
         pass
 
+    if event is not None:
+        try:
+            FANOUT.dispatch(msg, event, deliver_to_subscriber)
+        except Exception as e:
+            print("Error repartiendo a suscriptores:", e)
+
     if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
         print("[TG NO CONFIGURADO]", msg)
         return
 
     try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        r = requests.post(
-            url,
-            json={"chat_id": TELEGRAM_CHAT_ID, "text": msg},
-            timeout=5
-        )
+        r = _post_telegram(TELEGRAM_CHAT_ID, msg)
         print("TG →", r.status_code, msg)
         # También registramos el estado de envío
         add_log(f"TG → {r.status_code} {msg}")
@@ -108,27 +178,10 @@ def send_telegram(msg: str):
 
 
 
-def get_klines(symbol: str, interval: str, limit: int = 500):
-    url = "https://fapi.binance.com/fapi/v1/klines"
-    r = requests.get(url, params={"symbol": symbol, "interval": interval, "limit": limit}, timeout=5)
-    r.raise_for_status()
-    data = r.json()
-    return [
-        {
-            "open_time": c[0],
-            "high": float(c[2]),
-            "low": float(c[3]),
-            "close": float(c[4]),
-            "close_time": c[6],
-        }
-        for c in data
-    ]
-
-
-def get_binance_time_ms():
-    r = requests.get("https://fapi.binance.com/fapi/v1/time", timeout=5)
-    r.raise_for_status()
-    return r.json()["serverTime"]
+def get_klines(symbol: str, interval: str, limit: int = 500) -> Candles:
+    # ticks del bot: primeros en la cola del governor; pedidos iguales del
+    # detector en el mismo instante comparten la misma llamada
+    return fetch_klines(symbol, interval, limit, priority=PRIORITY_LIVE, timeout=5)
 
 
 def seconds_until_next_minute_from_ms(server_ms: int) -> float:
@@ -141,11 +194,7 @@ def add_log(msg: str):
     try:
         ts = datetime.utcnow().isoformat(timespec="seconds") + "Z"
         line = f"[{ts}] {msg}"
-        state["console"].insert(0, line)  # arriba primero
-        # recorta para no crecer sin límite
-        maxlen = state.get("console_max", 200)
-        if len(state["console"]) > maxlen:
-            del state["console"][maxlen:]
+        state.add_console(line)  # arriba primero, recortado a console_max
     except Exception as e:
         # Evitar que un fallo de log tumbe el bot
         print("add_log error:", e)
@@ -155,34 +204,58 @@ def add_log(msg: str):
 # ======================================================
 # LÓGICA DE UNA TEMPORALIDAD
 # ======================================================
+class TFIndicators:
+    """Indicadores en streaming de una TF; consume solo las velas que no vio."""
+
+    def __init__(self):
+        self.levels = Donchian(NO)
+        self.atr = ATR(14)
+        self.vol = RollingVolatility(20)
+
+    def feed(self, candles: Candles):
+        """
+        Pone al día con las velas nuevas (la primera vez, todo el historial).
+        Devuelve (prev_res, prev_sup), (res, sup) de la última vela.
+        """
+        times = candles.close_time
+        last = self.levels.last_time
+        i = len(times)
+        while i > 0 and (last is None or times[i - 1] > last):
+            i -= 1
+        if i == len(times):
+            raise ValueError("sin velas nuevas para los indicadores")
+        highs, lows, closes = candles.high, candles.low, candles.close
+        for j in range(i, len(times)):
+            prev, cur = self.levels.update(highs[j], lows[j], times[j])
+            self.atr.update(highs[j], lows[j], closes[j])
+            self.vol.update(closes[j])
+        return prev, cur
+
+
+_tf_indicators = {}  # timeframe_label -> TFIndicators
+
 def process_new_candle(
     timeframe_label: str,
-    closes: list,
-    highs: list,
-    lows: list,
+    candles: Candles,
     last_close_time: int,
     avn_last: int,
     prev_close: float | None,
     prev_tsl: float | None,
     alerts_enabled: bool,  # 👈 NUEVO
+    late: bool = False,
 ):
     """
     timeframe_label: "1m" o "15m"
+    candles: velas cerradas de ese TF (la última es la recién cerrada)
+    late: vela vieja del replay tras un reinicio; la alerta sale igual, marcada
+    como tardía, y no dispara IFTTT (el precio ya no es el de ahora)
     """
-    i = len(closes) - 1
-    start = max(0, i - NO + 1)
-    res = max(highs[start : i + 1])
-    sup = min(lows[start : i + 1])
-
-    if i - 1 >= 0:
-        prev_start = max(0, i - 1 - NO + 1)
-        prev_res = max(highs[prev_start:i])
-        prev_sup = min(lows[prev_start:i])
-    else:
-        prev_res = None
-        prev_sup = None
+    ind = _tf_indicators.get(timeframe_label)
+    if ind is None:
+        ind = _tf_indicators[timeframe_label] = TFIndicators()
+    (prev_res, prev_sup), (res, sup) = ind.feed(candles)
 
-    c = closes[i]
+    c = candles.close[-1]
     avd = 0
     if prev_res is not None and c > prev_res:
         avd = 1
@@ -193,6 +266,16 @@ def process_new_candle(
         avn_last = avd
 
     tsl = sup if avn_last == 1 else res
+    state[f"indicators_{timeframe_label}"] = {
+        "res": res, "sup": sup, "tsl": tsl,
+        "atr": ind.atr.value, "volatility": ind.vol.value,
+    }
+
+    # niveles vigentes al libro de zonas (vencen si no se renuevan en 2 velas)
+    expires_at = candles.close_time[-1] + 2 * TF_MS.get(timeframe_label, 60_000)
+    for kind, level in (("res", res), ("sup", sup), ("tsl", tsl)):
+        ZONES.upsert(f"{SYMBOL}:{timeframe_label}:{kind}", SYMBOL, kind, level, level,
+                     tf=timeframe_label, expires_at=expires_at)
 
     if prev_tsl is not None and prev_close is not None:
         buy = (prev_close <= prev_tsl) and (c > tsl)
@@ -202,48 +285,66 @@ def process_new_candle(
         sell = False
 
     now_iso = iso_utc(datetime.utcnow())
+    late_note = f" (tarde: vela {iso_utc(datetime.utcfromtimestamp(candles.open_time[-1] / 1000))})" if late else ""
+
+    # join con patrones armónicos frescos del mismo símbolo (se registra aunque el TF esté silenciado)
+    confluences = []
+    for side, fired in (("buy", buy), ("sell", sell)):
+        if fired:
+            emitted_at = CLOCK.server_now_ms()
+            confluences += CONFLUENCE.on_signal(SYMBOL, timeframe_label, side, c, emitted_at)
+            # al diario (también las silenciadas); latencia desde la apertura de la vela = cierre de la anterior
+            SIGNALS.append({
+                "symbol": SYMBOL, "timeframe": timeframe_label, "side": side,
+                "price": c, "tsl": tsl, "candle_time": candles.open_time[-1],
+                "emitted_at": emitted_at, "latency_ms": emitted_at - candles.open_time[-1],
+                "alerted": alerts_enabled,
+            })
 
     # solo si las alarmas de este TF están activas
     if alerts_enabled:
         if buy:
-            add_log(f"Señal {timeframe_label}: BUY @ {c}")             # 👈 AQUI
+            add_log(f"Señal {timeframe_label}: BUY @ {c}{late_note}")  # 👈 AQUI
             print(f"🔥 BUY SIGNAL {timeframe_label}")
-            send_telegram(f"🟢 BUY {SYMBOL} {timeframe_label} @ {c}")
-            send_ifttt(f"Buy {timeframe_label}", c)
-
-            # general
-            state["last_signal_time"] = now_iso
-            state["last_signal_type"] = f"buy {timeframe_label}"
-            state["last_signal_price"] = c
-
-            # específico por timeframe
-            if timeframe_label == "1m":
-                state["last_signal_1m_time"] = now_iso
-                state["last_signal_1m_type"] = "buy"
-                state["last_signal_1m_price"] = c
-            else:
-                state["last_signal_15m_time"] = now_iso
-                state["last_signal_15m_type"] = "buy"
-                state["last_signal_15m_price"] = c
+            send_telegram(f"🟢 BUY {SYMBOL} {timeframe_label} @ {c}{late_note}",
+                          {"kind": "signal", "symbol": SYMBOL, "timeframe": timeframe_label,
+                           "side": "buy", "price": c, "late": late})
+            if not late:
+                send_ifttt(f"Buy {timeframe_label}", c)
+
+            # general + específico por timeframe, en una sola versión del estado
+            tf_key = "1m" if timeframe_label == "1m" else "15m"
+            state.update({
+                "last_signal_time": now_iso,
+                "last_signal_type": f"buy {timeframe_label}",
+                "last_signal_price": c,
+                f"last_signal_{tf_key}_time": now_iso,
+                f"last_signal_{tf_key}_type": "buy",
+                f"last_signal_{tf_key}_price": c,
+            })
 
         if sell:
-            add_log(f"Señal {timeframe_label}: SELL @ {c}")            # 👈 AQUI
+            add_log(f"Señal {timeframe_label}: SELL @ {c}{late_note}") # 👈 AQUI
             print(f"📉 SELL SIGNAL {timeframe_label}")
-            send_telegram(f"🔴 SELL {SYMBOL} {timeframe_label} @ {c}")
-            send_ifttt(f"Sell {timeframe_label}", c)
-
-            state["last_signal_time"] = now_iso
-            state["last_signal_type"] = f"sell {timeframe_label}"
-            state["last_signal_price"] = c
-
-            if timeframe_label == "1m":
-                state["last_signal_1m_time"] = now_iso
-                state["last_signal_1m_type"] = "sell"
-                state["last_signal_1m_price"] = c
-            else:
-                state["last_signal_15m_time"] = now_iso
-                state["last_signal_15m_type"] = "sell"
-                state["last_signal_15m_price"] = c
+            send_telegram(f"🔴 SELL {SYMBOL} {timeframe_label} @ {c}{late_note}",
+                          {"kind": "signal", "symbol": SYMBOL, "timeframe": timeframe_label,
+                           "side": "sell", "price": c, "late": late})
+            if not late:
+                send_ifttt(f"Sell {timeframe_label}", c)
+
+            tf_key = "1m" if timeframe_label == "1m" else "15m"
+            state.update({
+                "last_signal_time": now_iso,
+                "last_signal_type": f"sell {timeframe_label}",
+                "last_signal_price": c,
+                f"last_signal_{tf_key}_time": now_iso,
+                f"last_signal_{tf_key}_type": "sell",
+                f"last_signal_{tf_key}_price": c,
+            })
+        for alert in confluences:
+            send_telegram(f"🔗 Confluencia {SYMBOL} (rank {alert['rank']}): {alert['text']}",
+                          {"kind": "confluence", "symbol": SYMBOL, "timeframe": timeframe_label,
+                           "pattern_type": alert.get("template"), "score": alert.get("score")})
     else:
         # Si hay señal pero TF está silenciado, también lo dejamos constar en la consola
         if buy:
@@ -254,68 +355,202 @@ def process_new_candle(
     # aunque las alarmas estén apagadas, actualizamos prev_* para que la lógica no se rompa
     prev_close = c
     prev_tsl = tsl
-    last_close_time = int(datetime.utcnow().timestamp() * 1000)
+    # close_time de la vela procesada (no el reloj local): es lo que compara bot_loop
+    last_close_time = candles.close_time[-1]
 
     return last_close_time, avn_last, prev_close, prev_tsl
 
 
 
+LEVEL_KINDS = ("res", "sup", "tsl")
+
+
+def check_zones(symbol: str, candles: Candles):
+    """
+    Cruza el rango de las últimas velas con el libro de zonas: PRZ proyectadas
+    (alerta temprana, D todavía formándose) y niveles res/sup/tsl vigentes.
+    Las PRZ de otros símbolos las cruza el detector/screener al bajar sus
+    velas (PROJECTOR.observe) y se avisan acá.
+    """
+    ZONES.expire(CLOCK.server_now_ms())
+    if not len(candles):
+        return
+    low = min(candles.low)
+    high = max(candles.high)
+    price = candles.close[-1]
+
+    hits = [(z, price) for z in PROJECTOR.on_price(symbol, low, high)] + PROJECTOR.drain()
+    for z, at in hits:
+        # mismo switch que las señales del TF (los TF sin switch avisan siempre)
+        if not state.get(f"alerts_{z.tf}_enabled", True):
+            add_log(f"PRZ {z.meta['template']} {z.symbol} TF={z.tf} tocada (alertas {z.tf} apagadas)")
+            continue
+        send_telegram(
+            f"⏳ PRZ {z.meta['template']} {z.meta['direction']} {z.symbol} TF={z.tf}: "
+            f"precio {at} en zona D [{z.lo:.4f} – {z.hi:.4f}]",
+            {"kind": "prz", "symbol": z.symbol, "timeframe": z.tf, "pattern_type": z.meta.get("template"),
+             "score": z.meta.get("score"), "price": at},
+        )
+
+    crossed = ZONES.hits(symbol, low, high, kinds=LEVEL_KINDS)
+    state["levels_hit"] = [f"{z.kind} {z.tf} {z.lo}" for z in crossed]
+
+
 # ======================================================
 # LOOP PRINCIPAL
 # ======================================================
+# ======================================================
+# ARRANQUE EN CALIENTE (snapshot + replay de lo perdido)
+# ======================================================
+BOT_TAIL = {"1m": 500, "15m": 200}  # velas por TF que usa el bot
+BOT_START_RETRY_S = 10              # sin velas al arrancar (red caída): reintento
+# campos del panel que sobreviven a un reinicio
+PANEL_KEYS = (
+    "console", "alerts_1m_enabled", "alerts_15m_enabled",
+    "last_signal_time", "last_signal_type", "last_signal_price",
+    "last_signal_1m_time", "last_signal_1m_type", "last_signal_1m_price",
+    "last_signal_15m_time", "last_signal_15m_type", "last_signal_15m_price",
+)
+
+
+def restore_panel():
+    """Consola, switches y últimas señales del snapshot; desde acá el snapshot los sigue."""
+    panel = WARM.section("panel")
+    if panel:
+        try:
+            state.update({k: tuple(v) if k == "console" else v for k, v in panel.items() if k in PANEL_KEYS})
+        except Exception as e:
+            print("[warm] panel del snapshot inválido:", e)
+    WARM.provide("panel", lambda: {k: state.get(k) for k in PANEL_KEYS})
+
+
+def tf_checkpoint(candles: Candles, avn_last, prev_close, prev_tsl, tail: int) -> dict:
+    return {
+        "candles": candles_to_json(candles[-tail:]),
+        "avn_last": avn_last,
+        "prev_close": prev_close,
+        "prev_tsl": prev_tsl,
+    }
+
+
+def start_timeframe(tf: str, tail: int, snap: dict | None):
+    """
+    Arranque de una TF. Con snapshot: restaura velas y estado, baja solo las
+    velas que cerraron mientras estuvimos caídos y las reprocesa en orden
+    (solo la última puede alertar: las anteriores ya no son accionables).
+    Sin snapshot (o si faltan demasiadas velas, o el snapshot no sirve):
+    arranque en frío como antes, reintentando hasta tener velas: el hilo del
+    bot no puede morirse acá, antes de su loop.
+    Devuelve (candles, last_close_time, avn_last, prev_close, prev_tsl).
+    """
+    if snap:
+        try:
+            restored = _warm_timeframe(tf, tail, snap)
+        except Exception as e:
+            restored = None
+            _tf_indicators.pop(tf, None)  # pudo quedar a medio alimentar con el replay
+            add_log(f"[warm] {tf}: snapshot inválido, arranque en frío: {e!r}")
+        if restored is not None:
+            return restored
+
+    while True:
+        try:
+            candles = get_klines(SYMBOL, tf, tail)
+            if len(candles):
+                save_candles(SYMBOL, tf, candles[:-1])
+                return candles, candles.close_time[-1], 0, candles.close[-1], None
+            add_log(f"[{tf}] arranque en frío sin velas, reintento en {BOT_START_RETRY_S}s")
+        except Exception as e:
+            add_log(f"[{tf}] arranque en frío falló, reintento en {BOT_START_RETRY_S}s: {e}")
+        CLOCK.sleep(BOT_START_RETRY_S)
+
+
+def _warm_timeframe(tf: str, tail: int, snap: dict):
+    """Restauración desde el snapshot; None si no alcanza (vacío o demasiadas velas perdidas)."""
+    candles = candles_from_json(snap["candles"])
+    if not len(candles):
+        return None
+    last_ct = candles.close_time[-1]
+    missed = (CLOCK.server_now_ms() - last_ct) // TF_MS[tf] + 1
+    if missed >= tail:
+        return None
+    avn_last, prev_close, prev_tsl = snap["avn_last"], snap["prev_close"], snap["prev_tsl"]
+    latest = get_klines(SYMBOL, tf, max(2, missed + 1))
+    save_candles(SYMBOL, tf, latest[:-1])
+    new = [j for j in range(len(latest)) if latest.close_time[j] > last_ct]
+    add_log(f"[warm] {tf}: estado restaurado, replay de {len(new)} velas")
+    for j in new:
+        candles.extend(latest[j:j + 1])
+        # las señales de velas perdidas también se avisan, marcadas como tardías
+        _, avn_last, prev_close, prev_tsl = process_new_candle(
+            tf, candles, candles.close_time[-1], avn_last, prev_close, prev_tsl,
+            alerts_enabled=state[f"alerts_{tf}_enabled"], late=j != new[-1],
+        )
+    return candles, candles.close_time[-1], avn_last, prev_close, prev_tsl
+
+
 def bot_loop():
     print("Iniciando bot multi-timeframe...")
     state["bot_started_at"] = iso_utc(datetime.utcnow())
+    CLOCK.ensure_started()  # offset con Binance, sin pedir /time cada minuto
+    init_db()  # el bot guarda velas; no depender de que el detector arranque primero
+
+    restore_panel()
+    warm = WARM.section("bot") or {}
 
-    # --- 1m setup ---
-    candles_1m = get_klines(SYMBOL, "1m", 500)
-    closes_1m = [c["close"] for c in candles_1m]
-    highs_1m = [c["high"] for c in candles_1m]
-    lows_1m = [c["low"] for c in candles_1m]
-    last_close_time_1m = candles_1m[-1]["close_time"]
-    avn_last_1m = 0
-    prev_close_1m = closes_1m[-1]
-    prev_tsl_1m = None
-
-    # --- 15m setup ---
-    candles_15m = get_klines(SYMBOL, "15m", 200)
-    closes_15m = [c["close"] for c in candles_15m]
-    highs_15m = [c["high"] for c in candles_15m]
-    lows_15m = [c["low"] for c in candles_15m]
-    last_close_time_15m = candles_15m[-1]["close_time"]
-    avn_last_15m = 0
-    prev_close_15m = closes_15m[-1]
-    prev_tsl_15m = None
+    candles_1m, last_close_time_1m, avn_last_1m, prev_close_1m, prev_tsl_1m = \
+        start_timeframe("1m", BOT_TAIL["1m"], warm.get("1m"))
+    candles_15m, last_close_time_15m, avn_last_15m, prev_close_15m, prev_tsl_15m = \
+        start_timeframe("15m", BOT_TAIL["15m"], warm.get("15m"))
+
+    def checkpoint():
+        """Estado de estrategia + cola de velas al snapshot (después de cada vela procesada)."""
+        WARM.put("bot", {
+            "1m": tf_checkpoint(candles_1m, avn_last_1m, prev_close_1m, prev_tsl_1m, BOT_TAIL["1m"]),
+            "15m": tf_checkpoint(candles_15m, avn_last_15m, prev_close_15m, prev_tsl_15m, BOT_TAIL["15m"]),
+        }, flush=True)
+
+    checkpoint()
+    WARM.ensure_started()
 
     while True:
         try:
-            server_ms = get_binance_time_ms()
+            server_ms = CLOCK.server_now_ms()
             sleep_secs = seconds_until_next_minute_from_ms(server_ms)
-            state["next_poll_at"] = iso_utc(datetime.utcnow() + timedelta(seconds=sleep_secs))
+            state.update({
+                "next_poll_at": iso_utc(datetime.utcnow() + timedelta(seconds=sleep_secs)),
+                "clock": CLOCK.info(),
+                "rate_limit": GOVERNOR.info(),
+                "klines_cache": KLINES.info(),
+                "signals": SIGNALS.info(),
+                "detector_memo": STAGES.info(),
+                "fanout": FANOUT.info(),
+            })
 
             # ===== 1 MINUTO =====
             latest_1m = get_klines(SYMBOL, "1m", 2)
             last_1m = latest_1m[-1]
-            state["last_price"] = last_1m["close"]
-            state["last_price_time"] = iso_utc(datetime.utcnow())
+            check_zones(SYMBOL, latest_1m)
+            state.update({
+                "last_price": last_1m["close"],
+                "last_price_time": iso_utc(datetime.utcnow()),
+            })
 
             if last_1m["close_time"] != last_close_time_1m:
-                closes_1m.append(last_1m["close"])
-                highs_1m.append(last_1m["high"])
-                lows_1m.append(last_1m["low"])
+                save_candles(SYMBOL, "1m", latest_1m[:-1])  # la anterior ya cerró
+                candles_1m.extend(latest_1m[-1:])
                 last_close_time_1m = last_1m["close_time"]
 
                 last_close_time_1m, avn_last_1m, prev_close_1m, prev_tsl_1m = process_new_candle(
                     "1m",
-                    closes_1m,
-                    highs_1m,
-                    lows_1m,
+                    candles_1m,
                     last_close_time_1m,
                     avn_last_1m,
                     prev_close_1m,
                     prev_tsl_1m,
                     alerts_enabled=state["alerts_1m_enabled"],
                 )
+                checkpoint()
 
             # ===== 15 MINUTOS =====
             server_minute = int((server_ms / 1000.0) / 60)
@@ -324,473 +559,101 @@ def bot_loop():
                 latest_15m = get_klines(SYMBOL, "15m", 2)
                 last_15m = latest_15m[-1]
                 if last_15m["close_time"] != last_close_time_15m:
-                    closes_15m.append(last_15m["close"])
-                    highs_15m.append(last_15m["high"])
-                    lows_15m.append(last_15m["low"])
+                    save_candles(SYMBOL, "15m", latest_15m[:-1])
+                    candles_15m.extend(latest_15m[-1:])
                     last_close_time_15m = last_15m["close_time"]
 
                     last_close_time_15m, avn_last_15m, prev_close_15m, prev_tsl_15m = process_new_candle(
                         "15m",
-                        closes_15m,
-                        highs_15m,
-                        lows_15m,
+                        candles_15m,
                         last_close_time_15m,
                         avn_last_15m,
                         prev_close_15m,
                         prev_tsl_15m,
                         alerts_enabled=state["alerts_15m_enabled"],
                     )
+                    checkpoint()
 
-            time.sleep(sleep_secs)
+            CLOCK.sleep(sleep_secs)
 
         except Exception as e:
             print("Error en loop:", e)
             state["last_error"] = str(e)
-            time.sleep(5)
+            CLOCK.sleep(5)
 
 
 # ======================================================
 # FLASK PANEL
 # ======================================================
-@app.route("/")
-def dashboard():
-    html = """
-<!doctype html>
-<html>
-<head>
-  <meta charset="utf-8" />
-  <title>Binance LTCUSDT Bot</title>
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <style>
-    :root {
-      --bg: #0f172a;
-      --card: rgba(15,23,42,0.35);
-      --border: rgba(148,163,184,0.25);
-      --text: #f1f5f9;
-      --muted: #cbd5e1;
-      --radius: 16px;
-      --gap: 1rem;
-    }
-    * { box-sizing: border-box; }
-    body {
-      font-family: system-ui, -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
-      background: var(--bg);
-      color: var(--text);
-      margin: 0;
-      padding: 0;
-      font-size: 16px;
-    }
-    .page {
-      max-width: 1200px;
-      margin: 0 auto;
-      padding: 1rem;
-      display: flex;
-      flex-direction: column;
-      gap: 1rem;
-    }
-    header h1 { font-size: 1.4rem; margin: 0; }
-    header p { margin: .25rem 0 0; color: var(--muted); font-size: .85rem; }
-
-    .grid { display: grid; gap: var(--gap); }
-    .card {
-      background: var(--card);
-      border: 1px solid var(--border);
-      border-radius: var(--radius);
-      padding: 1rem;
-      min-height: 80px;
-    }
-    .label {
-      font-size: .8rem;
-      color: var(--muted);
-      margin-bottom: .25rem;
-    }
-    .value { font-size: 1.35rem; font-weight: 600; }
-    .controls { display: flex; flex-wrap: wrap; gap: .5rem; margin-top: .5rem; }
-    button {
-      font-size: .9rem;
-      padding: .5rem .9rem;
-      border: none;
-      border-radius: 9999px;
-      cursor: pointer;
-      font-weight: 600;
-    }
-    .on { background: #22c55e; color: #0f172a; }
-    .off { background: #ef4444; color: #fff; }
-
-    /* móvil: mejora legibilidad */
-    @media (max-width: 599px) {
-      body { font-size: 28px; }
-      .card { padding: 1.1rem 1.1rem 1rem; }
-      .label { font-size: 1rem; }
-      header h1 { font-size: 1.35rem; }
-    }
-
-    /* tablet */
-    @media (min-width: 600px) {
-      .grid { grid-template-columns: repeat(2, minmax(0, 1fr)); }
-      .span-2 { grid-column: span 2; }
-    }
-    /* escritorio grande */
-    @media (min-width: 980px) {
-      .grid { grid-template-columns: repeat(3, minmax(0, 1fr)); }
-      .span-3 { grid-column: span 3; }
-    }
-  </style>
-</head>
-<body>
-  <div class="page">
-    <header class="card span-3">
-      <h1>Binance LTCUSDT Bot</h1>
-      <p>Panel en vivo desde Render (1m + 15m)</p>
-    </header>
-
-    <div class="grid">
-      <div class="card">
-        <div class="label">Estado</div>
-        <div class="value" id="status">Cargando…</div>
-        <div class="label" style="margin-top:.5rem;">Iniciado en</div>
-        <div id="started_at">-</div>
-      </div>
-
-      <div class="card">
-        <div class="label">Controles</div>
-        <div class="controls">
-          <button id="btn_1m" onclick="toggleAlert('1m')">.</button>
-          <button id="btn_15m" onclick="toggleAlert('15m')">.</button>
-        </div>
-      </div>
-
-      <div class="card">
-        <div class="label">Último precio</div>
-        <div class="value" id="last_price">-</div>
-        <div class="label" style="margin-top:.5rem;">Hora precio</div>
-        <div id="last_price_time">-</div>
-      </div>
-
-      <div class="card">
-        <div class="label">Última señal (cualquiera)</div>
-        <div class="value" id="last_signal_type">-</div>
-        <div class="label" style="margin-top:.5rem;">Precio señal</div>
-        <div id="last_signal_price">-</div>
-        <div class="label" style="margin-top:.5rem;">Hora señal</div>
-        <div id="last_signal_time">-</div>
-      </div>
-
-      <div class="card">
-        <div class="label">Última señal 1m</div>
-        <div class="value" id="last_signal_1m_type">-</div>
-        <div class="label" style="margin-top:.5rem;">Precio 1m</div>
-        <div id="last_signal_1m_price">-</div>
-        <div class="label" style="margin-top:.5rem;">Hora 1m</div>
-        <div id="last_signal_1m_time">-</div>
-      </div>
-
-      <div class="card">
-        <div class="label">Última señal 15m</div>
-        <div class="value" id="last_signal_15m_type">-</div>
-        <div class="label" style="margin-top:.5rem;">Precio 15m</div>
-        <div id="last_signal_15m_price">-</div>
-        <div class="label" style="margin-top:.5rem;">Hora 15m</div>
-        <div id="last_signal_15m_time">-</div>
-      </div>
-
-      <div class="card">
-        <div class="label">Próxima actualización estimada</div>
-        <div id="next_poll_at">-</div>
-        <div class="label" style="margin-top:.5rem;">Cuenta regresiva</div>
-        <div id="countdown">-</div>
-      </div>
-
-      <div class="card span-2">
-        <div class="label">Último error</div>
-        <div id="last_error">-</div>
-      </div>
-
-      <div class="card span-3">
-  <div style="display:flex;justify-content:space-between;align-items:center;gap:.5rem;">
-    <div class="label">Consola (eventos recientes)</div>
-    <button class="off" onclick="clearConsole()" style="font-size:.8rem;">Limpiar</button>
-  </div>
-  <pre id="console_box" style="white-space:pre-wrap;margin-top:.5rem;max-height:280px;overflow:auto;font-size:.9rem;line-height:1.25;">
-Cargando…
-  </pre>
-</div>
-<!-- ===== Últimos patrones (lista) ===== -->
-<div class="card" style="grid-column: span 3;">
-  <h2 style="margin:0 0 .5rem 0;">Últimos patrones</h2>
-  <div style="display:flex; gap:.5rem; align-items:center; margin-bottom:.5rem;">
-    <label>TF:</label>
-    <select id="pat_tf">
-      <option value="">Todos</option>
-      <option value="1m">1m</option>
-      <option value="15m">15m</option>
-      <option value="1h">1h</option>
-    </select>
-    <label>Símbolo:</label>
-    <input id="pat_symbol" placeholder="LTCUSDT" style="width:10rem;">
-    <button onclick="loadPatterns()">Actualizar</button>
-  </div>
-
-  <div style="overflow:auto; max-height:320px; border:1px solid #333; border-radius:6px;">
-    <table id="pat_table" style="width:100%; border-collapse:collapse; font-size:.92rem;">
-      <thead style="position:sticky; top:0; background:#111;">
-        <tr>
-          <th style="text-align:left; padding:.5rem; border-bottom:1px solid #333;">Fecha</th>
-          <th style="text-align:left; padding:.5rem; border-bottom:1px solid #333;">Símbolo</th>
-          <th style="text-align:left; padding:.5rem; border-bottom:1px solid #333;">TF</th>
-          <th style="text-align:left; padding:.5rem; border-bottom:1px solid #333;">Patrón</th>
-          <th style="text-align:left; padding:.5rem; border-bottom:1px solid #333;">Dir</th>
-          <th style="text-align:right; padding:.5rem; border-bottom:1px solid #333;">Score</th>
-        </tr>
-      </thead>
-      <tbody></tbody>
-    </table>
-  </div>
-</div>
-
-<!-- ===== Stats (resumen) ===== -->
-<div class="card" style="grid-column: span 1;">
-  <h2 style="margin:0 0 .5rem 0;">Stats</h2>
-  <div id="pat_stats" style="font-size:.95rem; line-height:1.4;">
-    <div>Total: —</div>
-    <div>Por símbolo:</div>
-    <ul id="pat_stats_symbol" style="margin:.25rem 0 .5rem 1rem;"></ul>
-    <div>Por TF:</div>
-    <ul id="pat_stats_tf" style="margin:.25rem 0 0 1rem;"></ul>
-  </div>
-</div>
-
-    </div>
-  </div>
-
-  <script>
-    let alerts1m = true;
-    let alerts15m = true;
-    let nextPollIso = null;
-    const TZ_OFFSET_MIN = -4 * 60; // ya lo tenías así
-
-    function formatToTZ(iso) {
-      if (!iso) return "-";
-      const d = new Date(iso);
-      d.setMinutes(d.getMinutes() + TZ_OFFSET_MIN);
-      const base = d.toISOString().replace("T", " ").substring(0, 19);
-      const offHr = TZ_OFFSET_MIN / 60;
-      return base + " (UTC" + (offHr >= 0 ? "+" + offHr : offHr) + ")";
-    }
+# shell + css/js con hash, precomprimidos una vez al arrancar
+DASHBOARD_SHELL, DASHBOARD_ASSETS = build_assets()
 
-    async function loadStatus() {
-      try {
-        const resp = await fetch('/status');
-        const data = await resp.json();
 
-        document.getElementById('status').innerText = data.last_error ? 'ERROR' : 'OK';
-        document.getElementById('started_at').innerText = formatToTZ(data.bot_started_at);
-        document.getElementById('last_price').innerText = data.last_price !== null ? data.last_price : '-';
-        document.getElementById('last_price_time').innerText = formatToTZ(data.last_price_time);
-
-        document.getElementById('last_signal_type').innerText = data.last_signal_type || '-';
-        document.getElementById('last_signal_price').innerText = data.last_signal_price !== null ? data.last_signal_price : '-';
-        document.getElementById('last_signal_time').innerText = formatToTZ(data.last_signal_time);
-
-        document.getElementById('last_signal_1m_type').innerText = data.last_signal_1m_type || '-';
-        document.getElementById('last_signal_1m_price').innerText = data.last_signal_1m_price !== null ? data.last_signal_1m_price : '-';
-        document.getElementById('last_signal_1m_time').innerText = formatToTZ(data.last_signal_1m_time);
-
-        document.getElementById('last_signal_15m_type').innerText = data.last_signal_15m_type || '-';
-        document.getElementById('last_signal_15m_price').innerText = data.last_signal_15m_price !== null ? data.last_signal_15m_price : '-';
-        document.getElementById('last_signal_15m_time').innerText = formatToTZ(data.last_signal_15m_time);
-
-        document.getElementById('next_poll_at').innerText = formatToTZ(data.next_poll_at);
-        document.getElementById('last_error').innerText = data.last_error || '-';
-
-        alerts1m = data.alerts_1m_enabled;
-        alerts15m = data.alerts_15m_enabled;
-        paintButtons();
-
-        nextPollIso = data.next_poll_at;
-      } catch (e) {
-        document.getElementById('status').innerText = 'ERROR';
-      }
-    }
-
-    function paintButtons() {
-      const b1 = document.getElementById('btn_1m');
-      const b15 = document.getElementById('btn_15m');
-      if (alerts1m) {
-        b1.textContent = 'Alarmas 1m: ON';
-        b1.className = 'on';
-      } else {
-        b1.textContent = 'Alarmas 1m: OFF';
-        b1.className = 'off';
-      }
-      if (alerts15m) {
-        b15.textContent = 'Alarmas 15m: ON';
-        b15.className = 'on';
-      } else {
-        b15.textContent = 'Alarmas 15m: OFF';
-        b15.className = 'off';
-      }
-    }
-
-    async function toggleAlert(tf) {
-      await fetch('/toggle', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ timeframe: tf })
-      });
-      loadStatus();
-    }
-
-    function tickCountdown() {
-      if (!nextPollIso) return;
-      const target = new Date(nextPollIso).getTime();
-      const now = Date.now();
-      const diff = Math.floor((target - now) / 1000);
-      document.getElementById('countdown').innerText = diff >= 0 ? diff + ' s' : 'actualizando…';
+def send_asset(asset, cache_control: str):
+    """Responde un Asset con la mejor compresión aceptada y revalidación por ETag."""
+    headers = {
+        "ETag": asset.etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
     }
+    inm = request.headers.get("If-None-Match", "")
+    if asset.etag in inm or inm.strip() == "*":
+        return Response(status=304, headers=headers)
 
-    loadStatus();
-    setInterval(loadStatus, 10000);
-    setInterval(tickCountdown, 1000);
-
-    async function loadConsole() {
-  try {
-    const resp = await fetch('/console?limit=120');
-    const js = await resp.json();
-    if (js.ok) {
-      const lines = js.data || [];
-      document.getElementById('console_box').textContent = lines.join('\n');
-    }
-  } catch (e) {
-    // opcional
-  }
-}
-
-async function clearConsole() {
-  try {
-    await fetch('/console/clear', { method: 'POST' });
-    loadConsole();
-  } catch (e) {}
-}
-
-// refresca la consola cada 5 segundos
-loadConsole();
-setInterval(loadConsole, 5000);
-<script>
-// ===== Util: safe get array =====
-function asArr(x) { return Array.isArray(x) ? x : (x ? [x] : []); }
-
-// ===== Cargar Últimos patrones =====
-async function loadPatterns() {
-  try {
-    const tf = (document.getElementById('pat_tf')?.value || '').trim();
-    const sym = (document.getElementById('pat_symbol')?.value || '').trim();
-    const qs = new URLSearchParams({ limit: '20' });
-    if (tf) qs.set('timeframe', tf);
-    if (sym) qs.set('symbol', sym);
-
-    const resp = await fetch('/patterns?' + qs.toString());
-    const js = await resp.json();
-    const rows = (js && js.ok) ? (js.data || []) : [];
-
-    const tbody = document.querySelector('#pat_table tbody');
-    if (!tbody) return;
-
-    if (!rows.length) {
-      tbody.innerHTML = `<tr><td colspan="6" style="padding:.6rem; opacity:.8;">Sin datos</td></tr>`;
-      return;
-    }
-
-    tbody.innerHTML = rows.map(r => {
-      const dt = r.d_time || r.created_at;      // preferimos D si existe, sino created
-      const when = typeof formatToTZ === 'function' ? formatToTZ(dt) : (dt || '-');
-      const score = (r.score != null) ? Number(r.score).toFixed(1) : '-';
-      const dir = (r.direction || '').toUpperCase();
-      return `
-        <tr>
-          <td style="padding:.45rem; border-bottom:1px solid #222;">${when}</td>
-          <td style="padding:.45rem; border-bottom:1px solid #222;">${r.symbol || '-'}</td>
-          <td style="padding:.45rem; border-bottom:1px solid #222;">${r.timeframe || '-'}</td>
-          <td style="padding:.45rem; border-bottom:1px solid #222;">${r.pattern_type || '-'}</td>
-          <td style="padding:.45rem; border-bottom:1px solid #222;">${dir}</td>
-          <td style="padding:.45rem; border-bottom:1px solid #222; text-align:right;">${score}</td>
-        </tr>
-      `;
-    }).join('');
-  } catch (e) {
-    const tbody = document.querySelector('#pat_table tbody');
-    if (tbody) tbody.innerHTML = `<tr><td colspan="6" style="padding:.6rem; color:#f55;">Error cargando patrones</td></tr>`;
-  }
-}
-
-// ===== Cargar Stats =====
-async function loadPatternStats() {
-  try {
-    const resp = await fetch('/patterns/stats');
-    const js = await resp.json();
-    const d = (js && js.ok) ? (js.data || {}) : {};
-
-    // total
-    const wrap = document.getElementById('pat_stats');
-    if (wrap) {
-      const total = (d.total != null) ? d.total : '—';
-      wrap.querySelector(':scope > div')?.replaceWith((() => {
-        const el = document.createElement('div');
-        el.textContent = `Total: ${total}`;
-        return el;
-      })());
-    }
-
-    // por símbolo
-    const ulSym = document.getElementById('pat_stats_symbol');
-    if (ulSym) {
-      const arr = asArr(d.by_symbol);
-      ulSym.innerHTML = arr.map(([sym, cnt]) => `<li>${sym}: ${cnt}</li>`).join('');
-    }
+    encoding, body = asset.pick(request.headers.get("Accept-Encoding", ""))
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(body, mimetype=asset.mimetype, headers=headers)
 
-    // por timeframe
-    const ulTf = document.getElementById('pat_stats_tf');
-    if (ulTf) {
-      const arr = asArr(d.by_timeframe);
-      ulTf.innerHTML = arr.map(([tf, cnt]) => `<li>${tf}: ${cnt}</li>`).join('');
-    }
-  } catch (e) {
-    // opcional: mostrar error
-  }
-}
-
-// ===== Auto-refresh =====
-loadPatterns();
-loadPatternStats();
-setInterval(loadPatterns, 15000);     // 15s
-setInterval(loadPatternStats, 30000); // 30s
-</script>
 
+@app.route("/")
+def dashboard():
+    return send_asset(DASHBOARD_SHELL, SHELL_CACHE)
 
 
-  </script>
-</body>
-</html>
-    """
-    return Response(html, mimetype="text/html")
+@app.route("/assets/<name>")
+def asset_route(name):
+    asset = DASHBOARD_ASSETS.get(name)
+    if asset is None:
+        return jsonify({"ok": False, "error": "not found"}), 404
+    return send_asset(asset, IMMUTABLE_CACHE)
 
 
 @app.route("/status")
 def status_route():
-    return jsonify(state)
+    return jsonify(status_reader.snapshot())
+
+
+def apply_control(cmd: dict):
+    """Aplica un toggle/limpieza en el proceso dueño del estado."""
+    op = cmd.get("op")
+    if op == "toggle" and cmd.get("timeframe") in ("1m", "15m"):
+        state.toggle(f"alerts_{cmd['timeframe']}_enabled")
+    elif op == "clear_console":
+        state.clear_console()
+    elif op == "profile":
+        # pedido por otro worker: se mide acá, donde corren bot + detector
+        threading.Thread(target=_profile_to_file, args=(cmd,), name="profile-request", daemon=True).start()
 
 
 @app.route("/toggle", methods=["POST"])
 def toggle_route():
     data = request.get_json(silent=True) or {}
     tf = data.get("timeframe")
-    if tf == "1m":
-        state["alerts_1m_enabled"] = not state["alerts_1m_enabled"]
-    elif tf == "15m":
-        state["alerts_15m_enabled"] = not state["alerts_15m_enabled"]
+    cmd = {"op": "toggle", "timeframe": tf}
+    if control is not None:
+        # worker no líder: lo aplica el líder; devolvemos el valor esperado
+        control.push(cmd)
+        snap = dict(status_reader.snapshot())
+        if tf in ("1m", "15m"):
+            key = f"alerts_{tf}_enabled"
+            snap[key] = not snap.get(key, True)
+    else:
+        apply_control(cmd)
+        snap = state.snapshot()
     return jsonify({
-        "alerts_1m_enabled": state["alerts_1m_enabled"],
-        "alerts_15m_enabled": state["alerts_15m_enabled"],
+        "alerts_1m_enabled": snap.get("alerts_1m_enabled"),
+        "alerts_15m_enabled": snap.get("alerts_15m_enabled"),
     })
 
 @app.route("/console", methods=["GET"])
@@ -798,20 +661,262 @@ def console_route():
     limit = int(request.args.get("limit", 100))
     return jsonify({
         "ok": True,
-        "data": state["console"][:limit]
+        "data": list(status_reader.snapshot().get("console", ())[:limit])
     })
 
 @app.route("/console/clear", methods=["POST"])
 def console_clear_route():
-    state["console"].clear()
+    cmd = {"op": "clear_console"}
+    if control is not None:
+        control.push(cmd)
+    else:
+        apply_control(cmd)
     return jsonify({"ok": True})
 
+PATTERNS_MAX_LIMIT = 1000
+
+
+def _pattern_filter_args() -> dict:
+    """Filtros comunes de /patterns y /patterns/export (d_from/d_to en epoch ms)."""
+    return {
+        "symbol": request.args.get("symbol"),
+        "timeframe": request.args.get("timeframe"),
+        "pattern_type": request.args.get("pattern_type"),
+        "direction": request.args.get("direction"),
+        "d_from": request.args.get("d_from", type=int),
+        "d_to": request.args.get("d_to", type=int),
+    }
+
+
 @app.route("/patterns", methods=["GET"])
 def patterns_route():
+    limit = max(1, min(int(request.args.get("limit", 50)), PATTERNS_MAX_LIMIT))
+    filters = _pattern_filter_args()
+    before_id = request.args.get("before_id", type=int)
+    after_id = request.args.get("after_id", type=int)
+    data = list_patterns(limit=limit, before_id=before_id, after_id=after_id, **filters)
+    return jsonify({
+        "ok": True,
+        "data": data,
+        # cursores para la página siguiente (más viejos) y anterior (más nuevos)
+        "next_before_id": data[-1]["id"] if len(data) == limit else None,
+        "prev_after_id": data[0]["id"] if data else None,
+    })
+
+
+@app.route("/patterns/export", methods=["GET"])
+def patterns_export_route():
+    """Export completo en NDJSON (default) o CSV, en streaming y con memoria constante."""
+    fmt = request.args.get("format", "ndjson").lower()
+    filters = _pattern_filter_args()
+    rows = iter_patterns(after_id=request.args.get("after_id", type=int), **filters)
+
+    if fmt == "csv":
+        def gen():
+            buf = io.StringIO()
+            w = csv.writer(buf)
+            w.writerow(PATTERN_COLUMNS)
+            for r in rows:
+                w.writerow(r)
+                if buf.tell() > 64 * 1024:
+                    yield buf.getvalue()
+                    buf.seek(0)
+                    buf.truncate()
+            yield buf.getvalue()
+        mimetype = "text/csv"
+    else:
+        def gen():
+            for r in rows:
+                yield json.dumps(dict(zip(PATTERN_COLUMNS, r))) + "\n"
+        mimetype = "application/x-ndjson"
+
+    return Response(
+        stream_with_context(gen()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=patterns.{fmt if fmt == 'csv' else 'ndjson'}"},
+    )
+
+
+@app.route("/patterns/archive", methods=["GET"])
+def patterns_archive_route():
+    """Patrones ya compactados (archivos .ndjson.gz), mismos filtros que /patterns, en NDJSON."""
+    rows = iter_archived(**_pattern_filter_args())
+
+    def gen():
+        for r in rows:
+            yield json.dumps(r) + "\n"
+
+    return Response(stream_with_context(gen()), mimetype="application/x-ndjson")
+
+
+@app.route("/patterns/rollups", methods=["GET"])
+def patterns_rollups_route():
+    """Agregados diarios por símbolo/TF/plantilla de los patrones que salieron de la base."""
+    data = list_rollups(
+        symbol=request.args.get("symbol"),
+        timeframe=request.args.get("timeframe"),
+        day_from=request.args.get("day_from"),
+        day_to=request.args.get("day_to"),
+    )
+    return jsonify({"ok": True, "data": data})
+
+
+@app.route("/templates", methods=["GET"])
+def templates_route():
+    """Plantillas armónicas vigentes (archivo, recargas, último error de validación)."""
+    return jsonify({"ok": True, "data": TEMPLATES.info()})
+
+
+def _zones(symbol=None, kind=None) -> list:
+    """Libro de zonas: en memoria en el líder, la vista publicada en los demás workers."""
+    if status_reader is state:
+        return ZONES.zones(symbol=symbol, kind=kind)
+    return [z for z in status_reader.view("zones", [])
+            if (symbol is None or z["symbol"] == symbol) and (kind is None or z["kind"] == kind)]
+
+
+def _confluences() -> list:
+    if status_reader is state:
+        return CONFLUENCE.alerts()
+    return status_reader.view("confluence", [])
+
+
+@app.route("/prz", methods=["GET"])
+def prz_route():
+    """Zonas PRZ activas (D proyectado, todavía sin tocar)."""
+    return jsonify({"ok": True, "data": _zones(symbol=request.args.get("symbol"), kind="prz")})
+
+
+@app.route("/zones", methods=["GET"])
+def zones_route():
+    """Todas las zonas activas del libro (PRZ + niveles), filtrables por símbolo y tipo."""
+    data = _zones(symbol=request.args.get("symbol"), kind=request.args.get("kind"))
+    return jsonify({"ok": True, "data": data})
+
+
+@app.route("/confluence", methods=["GET"])
+def confluence_route():
+    """Últimas alertas de confluencia (más nueva primero)."""
+    return jsonify({"ok": True, "data": list(reversed(_confluences()))})
+
+
+CANDLES_MAX_WIDTH = 5000
+_SYMBOL_RE = re.compile(r"^[A-Z0-9]{2,30}$")
+
+
+def _chartable(symbol: str) -> bool:
+    """Símbolos de los que /candles puede bajar historia: el del bot o un perpetuo USDT-M."""
+    if symbol == SYMBOL:
+        return True
+    try:
+        return symbol in load_universe()
+    except Exception as e:
+        print("candles: no se pudo leer el universo:", e)
+        return False
+
+
+@app.route("/candles", methods=["GET"])
+def candles_route():
+    """
+    OHLC de las velas guardadas, reducido a ~width puntos (mode=ohlc: buckets
+    min/max; mode=lttb: línea de cierres) + puntos XABCD de los patrones del rango.
+    """
+    tf = request.args.get("tf", "15m")
+    mode = request.args.get("mode", "ohlc")
+    if tf not in TF_MS or mode not in ("ohlc", "lttb"):
+        return jsonify({"ok": False, "error": "tf o mode inválido"}), 400
+    symbol = request.args.get("symbol", SYMBOL).upper()
+    if not _SYMBOL_RE.match(symbol):
+        return jsonify({"ok": False, "error": "symbol inválido"}), 400
+    width = max(10, min(request.args.get("width", 800, type=int), CANDLES_MAX_WIDTH))
+    try:
+        data = chart(
+            symbol,
+            tf,
+            start=request.args.get("start", type=int),
+            end=request.args.get("end", type=int),
+            width=width,
+            mode=mode,
+            bars=max(1, min(request.args.get("bars", CHART_DEFAULT_BARS, type=int), CHART_MAX_BARS)),
+            symbol_ok=_chartable,
+        )
+    except ChartError as e:
+        return jsonify({"ok": False, "error": str(e)}), e.status
+    return jsonify({"ok": True, "data": data})
+
+
+@app.route("/subscriptions", methods=["GET"])
+def subscriptions_route():
+    """Suscripciones de alertas (requiere SUBSCRIPTIONS_TOKEN)."""
+    denied = _token_guard(subscriptions_allowed, "X-Subscriptions-Token")
+    if denied:
+        return denied
+    return jsonify({"ok": True, "data": list_subscriptions(), "fanout": FANOUT.info()})
+
+
+@app.route("/subscriptions", methods=["POST"])
+def subscriptions_add_route():
+    """
+    Alta: {"channel": "telegram"|"ifttt", "target": chat_id | "evento:key",
+    "symbols": [...], "timeframes": [...], "pattern_types": [...],
+    "kinds": [signal|pattern|confluence|prz], "min_score": 70}. Filtro vacío = todos.
+    """
+    denied = _token_guard(subscriptions_allowed, "X-Subscriptions-Token")
+    if denied:
+        return denied
+    try:
+        sub = validate_subscription(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    sub_id = add_subscription(**sub)
+    FANOUT.invalidate()  # en otros workers/líder se ve en el próximo chequeo de versión
+    return jsonify({"ok": True, "id": sub_id}), 201
+
+
+@app.route("/subscriptions/<int:sub_id>", methods=["DELETE"])
+def subscriptions_delete_route(sub_id):
+    denied = _token_guard(subscriptions_allowed, "X-Subscriptions-Token")
+    if denied:
+        return denied
+    if not delete_subscription(sub_id):
+        return jsonify({"ok": False, "error": "not found"}), 404
+    FANOUT.invalidate()
+    return jsonify({"ok": True})
+
+
+SIGNALS_MAX_LIMIT = 5000
+
+
+@app.route("/signals", methods=["GET"])
+def signals_route():
+    """
+    Diario de señales BUY/SELL: rango por candle_time (start/end en ms) con
+    filtros symbol/timeframe/side, o latest=1 para la última por símbolo/TF.
+    """
+    symbol = request.args.get("symbol")
+    symbol = symbol.upper() if symbol else None
+    timeframe = request.args.get("timeframe")
+    if request.args.get("latest") in ("1", "true"):
+        return jsonify({"ok": True, "data": latest_signals(symbol, timeframe)})
+    side = request.args.get("side")
+    if side and side.lower() not in ("buy", "sell"):
+        return jsonify({"ok": False, "error": "side inválido"}), 400
+    data = list_signals(
+        symbol=symbol,
+        timeframe=timeframe,
+        side=side.lower() if side else None,
+        start=request.args.get("start", type=int),
+        end=request.args.get("end", type=int),
+        limit=max(1, min(request.args.get("limit", 200, type=int), SIGNALS_MAX_LIMIT)),
+    )
+    return jsonify({"ok": True, "data": data})
+
+
+@app.route("/patterns/outcomes", methods=["GET"])
+def patterns_outcomes_route():
     symbol = request.args.get("symbol")
     tf = request.args.get("timeframe")
-    limit = int(request.args.get("limit", 50))
-    data = list_patterns(limit=limit, symbol=symbol, timeframe=tf)
+    data = outcome_stats(symbol=symbol, timeframe=tf)
     return jsonify({"ok": True, "data": data})
 
 
@@ -820,14 +925,121 @@ def patterns_stats_route():
     data = stats()
     return jsonify({"ok": True, "data": data})
 
+# ======================================================
+# DEBUG (perfil por muestreo y volcado de hilos)
+# ======================================================
+def _token_guard(check, header: str):
+    """404 si la API no tiene token configurado, 403 si el token no coincide."""
+    allowed = check(request.headers.get(header) or request.args.get("token"))
+    if allowed is None:
+        return jsonify({"ok": False, "error": "not found"}), 404
+    if not allowed:
+        return jsonify({"ok": False, "error": "forbidden"}), 403
+    return None
+
+
+PROFILE_WAIT_EXTRA_S = 5.0   # margen para que el líder tome el pedido del archivo de controles
+
+
+def _profile_here(seconds, hz, threads) -> dict | None:
+    """Perfil de este proceso en forma JSON, o None si ya hay uno en curso."""
+    result = SAMPLER.profile(seconds, hz=hz, threads=threads)
+    if result is None:
+        return None
+    return dict(result, stacks=dict(result["stacks"].most_common()), pid=os.getpid(),
+                leader=_leader_lock is not None or __name__ == "__main__")
+
+
+def _profile_path(req_id: str) -> str:
+    return os.path.join(RUNTIME_DIR, f"profile-{req_id}.json")
+
+
+def _profile_to_file(cmd: dict):
+    """Líder: corre el perfil pedido por otro worker y deja el resultado en un archivo."""
+    result = _profile_here(cmd["seconds"], cmd["hz"], cmd.get("threads"))
+    path = _profile_path(cmd["id"])
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(result if result is not None else {"busy": True}, f)
+    os.replace(tmp, path)
+
+
+def _profile_on_leader(seconds, hz, threads) -> dict | None:
+    """Worker no líder: pide el perfil al líder y espera el archivo con el resultado."""
+    req_id = uuid.uuid4().hex
+    control.push({"op": "profile", "id": req_id, "seconds": seconds, "hz": hz, "threads": threads})
+    path = _profile_path(req_id)
+    deadline = time.time() + min(seconds, PROFILE_MAX_SECONDS) + PROFILE_WAIT_EXTRA_S
+    while time.time() < deadline:
+        time.sleep(0.2)
+        try:
+            with open(path, encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            continue
+        os.remove(path)
+        return None if result.get("busy") else result
+    raise TimeoutError("el líder no respondió el perfil")
+
+
+@app.route("/debug/profile", methods=["GET"])
+def debug_profile_route():
+    """
+    Perfil por muestreo de todos los hilos del proceso líder (el que corre bot
+    + detector) durante ?seconds=N (a ?hz=, opcional ?threads=bot_loop,run_detector).
+    Desde otro worker el pedido se le pasa al líder. Devuelve pilas
+    colapsadas (flamegraph.pl / speedscope) o JSON con format=json.
+    """
+    denied = _token_guard(debug_allowed, "X-Debug-Token")
+    if denied:
+        return denied
+    threads = [t for t in request.args.get("threads", "").split(",") if t] or None
+    seconds = request.args.get("seconds", 10, type=float)
+    hz = request.args.get("hz", PROFILE_DEFAULT_HZ, type=float)
+    try:
+        if control is not None:
+            result = _profile_on_leader(seconds, hz, threads)
+        else:
+            result = _profile_here(seconds, hz, threads)
+    except TimeoutError as e:
+        return jsonify({"ok": False, "error": str(e)}), 504
+    if result is None:
+        return jsonify({"ok": False, "error": "ya hay un perfil en curso"}), 409
+    # pid/leader dicen a qué proceso se midió
+    headers = {
+        "X-Profile-Pid": str(result["pid"]),
+        "X-Profile-Leader": "1" if result["leader"] else "0",
+        "X-Profile-Samples": str(result["samples"]),
+    }
+    if request.args.get("format") == "json":
+        return jsonify({"ok": True, "data": result}), 200, headers
+    return Response(SAMPLER.collapsed(Counter(result["stacks"])), mimetype="text/plain", headers=headers)
+
+
+@app.route("/debug/threads", methods=["GET"])
+def debug_threads_route():
+    """Pila actual de cada hilo del proceso."""
+    denied = _token_guard(debug_allowed, "X-Debug-Token")
+    if denied:
+        return denied
+    return jsonify({"ok": True, "pid": os.getpid(), "data": thread_dump()})
+
+
 def start_bot_thread():
-    t = threading.Thread(target=bot_loop, daemon=True)
+    t = threading.Thread(target=bot_loop, name="bot_loop", daemon=True)
     t.start()
 
+def start_retention_thread():
+    """Rollup + archivo de patrones viejos, en batches chicos y en segundo plano."""
+    threading.Thread(target=run_retention, kwargs={"log_fn": add_log},
+                     name="retention", daemon=True).start()
+
+
 def start_detector_thread():
     """Inicia el detector armónico en un hilo separado."""
     t = threading.Thread(
         target=run_detector,
+        name="run_detector",
         kwargs={
             "send_fn": send_telegram,  # para enviar mensajes a Telegram
             "log_fn": add_log,         # 👈 nuevo: para registrar eventos en la consola del panel
@@ -837,9 +1049,56 @@ def start_detector_thread():
     t.start()
 
 
+# ======================================================
+# MODO PRODUCCIÓN (servidor WSGI multi-worker, ver wsgi.py)
+# ======================================================
+RUNTIME_DIR = os.getenv("RUNTIME_DIR", ".")
+LEADER_LOCK_PATH = os.path.join(RUNTIME_DIR, "leader.lock")
+STATE_SNAPSHOT_PATH = os.path.join(RUNTIME_DIR, "state_snapshot.json")
+CONTROL_PATH = os.path.join(RUNTIME_DIR, "controls.json")
+_leader_lock = None
+
+
+def watch_controls(control_file: ControlFile, interval: float = 0.5):
+    """Solo en el líder: aplica los toggles que dejan los otros workers."""
+    while True:
+        try:
+            for cmd in control_file.drain():
+                apply_control(cmd)
+        except Exception as e:
+            print("watch_controls error:", e)
+        time.sleep(interval)
+
+
+def start_worker():
+    """
+    Se llama una vez por worker. Un solo worker (el que toma el flock) corre
+    bot + detector y publica snapshots del estado; el resto solo sirve HTTP
+    leyendo esos snapshots y manda los toggles por archivo al líder.
+    """
+    global _leader_lock, status_reader, control
+    _leader_lock = try_acquire_leader(LEADER_LOCK_PATH)
+    if _leader_lock is not None:
+        print(f"[worker {os.getpid()}] líder: bot + detector")
+        state.update({"leader_pid": os.getpid()})
+        # lo que los otros workers no tienen en memoria viaja con el snapshot
+        state.add_view("zones", ZONES.zones)
+        state.add_view("confluence", CONFLUENCE.alerts)
+        state.start_publishing(STATE_SNAPSHOT_PATH)
+        threading.Thread(target=watch_controls, args=(ControlFile(CONTROL_PATH),),
+                         name="watch_controls", daemon=True).start()
+        start_bot_thread()
+        start_detector_thread()
+        start_retention_thread()
+    else:
+        print(f"[worker {os.getpid()}] solo HTTP (lee snapshots del líder)")
+        status_reader = SnapshotReader(STATE_SNAPSHOT_PATH, default=state.snapshot())
+        control = ControlFile(CONTROL_PATH)
+
 
 if __name__ == "__main__":
     start_bot_thread()        # tu bot de 1m y 15m
     start_detector_thread()   # nuestro detector armónico
+    start_retention_thread()
     port = int(os.environ.get("PORT", 10000))
     app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,118 @@
+# outcomes.py
+from bisect import bisect_right
+
+from candles import Candles, TF_MS
+from db import open_outcome, list_open_outcomes, update_outcomes
+
+# =========================================================
+# CONFIG
+# =========================================================
+# cuántas velas después de D seguimos evaluando el patrón
+OUTCOME_HORIZON_BARS = 50
+
+# targets clásicos: retroceso 0.382 y 0.618 del tramo AD
+TARGET1_AD = 0.382
+TARGET2_AD = 0.618
+# stop: más allá de X, o al menos este % de XA más allá de D
+STOP_MIN_XA = 0.13
+
+
+# =========================================================
+# NIVELES DEL PATRÓN
+# =========================================================
+def compute_levels(cand) -> dict:
+    """Entrada en D, targets sobre AD y stop detrás de X (o de D en extensiones)."""
+    x = cand["x"]["price"]
+    a = cand["a"]["price"]
+    d = cand["d"]["price"]
+    sign = 1 if cand["direction"] == "BULLISH" else -1
+
+    ad = abs(a - d)
+    xa = abs(a - x)
+    stop_dist = max(sign * (d - x), STOP_MIN_XA * xa)
+
+    return {
+        "entry": d,
+        "stop": d - sign * stop_dist,
+        "target1": d + sign * TARGET1_AD * ad,
+        "target2": d + sign * TARGET2_AD * ad,
+    }
+
+
+def track_pattern(pattern_id: int, symbol: str, tf: str, cand):
+    """Abre el seguimiento de un patrón recién guardado."""
+    d_time = cand["d"]["time"]
+    horizon_end = d_time + OUTCOME_HORIZON_BARS * TF_MS[tf]
+    open_outcome(pattern_id, symbol, tf, cand["direction"],
+                 compute_levels(cand), d_time, horizon_end)
+
+
+# =========================================================
+# ACTUALIZACIÓN INCREMENTAL
+# =========================================================
+def _advance(o: dict, candles: Candles, start: int) -> bool:
+    """Aplica las velas [start:] al outcome; True si cambió algo."""
+    times = candles.open_time
+    highs = candles.high
+    lows = candles.low
+    sign = 1 if o["direction"] == "BULLISH" else -1
+    entry = o["entry_price"]
+    changed = False
+
+    for i in range(start, len(times)):
+        t = times[i]
+        if t > o["horizon_end"]:
+            o["status"] = "expired"
+            o["closed_at"] = o["horizon_end"]
+            return True
+
+        hi = highs[i]
+        lo = lows[i]
+        fav = (hi - entry) if sign == 1 else (entry - lo)
+        adv = (entry - lo) if sign == 1 else (hi - entry)
+        o["max_favorable"] = max(o["max_favorable"], fav)
+        o["max_adverse"] = max(o["max_adverse"], adv)
+        o["last_checked"] = t
+        changed = True
+
+        reached = hi if sign == 1 else lo
+        against = lo if sign == 1 else hi
+        # vela ambigua (toca stop y target): asumimos stop primero
+        if sign * (o["stop_price"] - against) >= 0:
+            o["hit_stop"] = 1
+            o["status"] = "stop"
+            o["closed_at"] = t
+            return True
+        if sign * (reached - o["target1_price"]) >= 0:
+            o["hit_target1"] = 1
+        if sign * (reached - o["target2_price"]) >= 0:
+            o["hit_target2"] = 1
+            o["status"] = "target"
+            o["closed_at"] = t
+            return True
+
+    return changed
+
+
+def update_open_outcomes(symbol: str, tf: str, candles: Candles) -> int:
+    """
+    Avanza los patrones abiertos de (symbol, tf) con las velas cerradas que
+    todavía no vieron. Solo toca los que siguen dentro de su horizonte (índice
+    parcial sobre status='open'). Devuelve cuántos se actualizaron.
+    """
+    if not len(candles):
+        return 0
+    opened = list_open_outcomes(symbol, tf)
+    if not opened:
+        return 0
+
+    times = candles.open_time
+    dirty = []
+    for o in opened:
+        # primera vela posterior a la última revisada (los tiempos están ordenados)
+        start = bisect_right(times, o["last_checked"])
+        if start < len(times) and _advance(o, candles, start):
+            dirty.append(o)
+
+    update_outcomes(dirty)
+    return len(dirty)
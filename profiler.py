@@ -0,0 +1,143 @@
+# profiler.py
+import hmac
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+# =========================================================
+# CONFIG
+# =========================================================
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")  # vacío = /debug/* deshabilitado (404)
+PROFILE_MAX_SECONDS = 30.0   # un request de perfil ocupa un hilo del worker
+PROFILE_DEFAULT_HZ = 100
+PROFILE_MAX_HZ = 1000
+PROFILE_MAX_DEPTH = 128
+
+
+def debug_allowed(token: str | None) -> bool | None:
+    """None si /debug está apagado; si no, si el token coincide."""
+    if not DEBUG_TOKEN:
+        return None
+    return hmac.compare_digest((token or "").encode(), DEBUG_TOKEN.encode())
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _names() -> dict:
+    return {t.ident: t.name for t in threading.enumerate()}
+
+
+# =========================================================
+# PERFIL POR MUESTREO
+# =========================================================
+class StackSampler:
+    """
+    Perfilador por muestreo de pila, solo a pedido: no hay hilo ni hooks
+    (sys.setprofile/settrace) instalados entre perfiles, así que en reposo
+    no cuesta nada. Durante un perfil, el hilo que lo pide lee
+    sys._current_frames() `hz` veces por segundo y cuenta pilas colapsadas
+    ("hilo;raíz;...;hoja N"), el formato de flamegraph.pl / speedscope.
+    Un perfil a la vez por proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last = None  # resumen del último perfil
+
+    def profile(self, seconds: float, hz: float = PROFILE_DEFAULT_HZ,
+                threads: list | None = None) -> dict | None:
+        """
+        Muestrea durante `seconds` y devuelve {"stacks": Counter, ...}, o None
+        si ya hay un perfil en curso. `threads` filtra por prefijo del nombre.
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            seconds = max(0.1, min(float(seconds), PROFILE_MAX_SECONDS))
+            hz = max(1.0, min(float(hz), PROFILE_MAX_HZ))
+            interval = 1.0 / hz
+            me = threading.get_ident()
+            stacks = Counter()
+            names = _names()
+            samples = 0
+            overhead = 0.0
+            started = time.perf_counter()
+            deadline = started + seconds
+            next_at = started
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if now < next_at:
+                    time.sleep(next_at - now)
+                    continue
+                next_at += interval
+                t0 = time.perf_counter()
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    name = names.get(ident)
+                    if name is None:  # hilo nuevo desde la última vuelta
+                        names = _names()
+                        name = names.get(ident, f"thread-{ident}")
+                    if threads and not name.startswith(tuple(threads)):
+                        continue
+                    parts = []
+                    while frame is not None and len(parts) < PROFILE_MAX_DEPTH:
+                        parts.append(_label(frame))
+                        frame = frame.f_back
+                    parts.append(name)
+                    stacks[";".join(reversed(parts))] += 1
+                samples += 1
+                overhead += time.perf_counter() - t0
+                # si el muestreo se atrasó, no recuperar de golpe
+                if next_at < t0:
+                    next_at = t0 + interval
+            elapsed = time.perf_counter() - started
+            result = {
+                "seconds": round(elapsed, 3),
+                "hz": hz,
+                "samples": samples,
+                "sample_cost_ms": round(overhead / samples * 1000.0, 3) if samples else None,
+                "stacks": stacks,
+            }
+            self.last = {k: v for k, v in result.items() if k != "stacks"}
+            self.last["at"] = time.time()
+            return result
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def collapsed(stacks: Counter) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in stacks.most_common())
+
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+
+# =========================================================
+# VOLCADO DE HILOS
+# =========================================================
+def thread_dump() -> list:
+    """Pila actual de cada hilo del proceso (la hoja al final)."""
+    frames = sys._current_frames()
+    out = []
+    for t in threading.enumerate():
+        frame = frames.get(t.ident)
+        out.append({
+            "name": t.name,
+            "ident": t.ident,
+            "daemon": t.daemon,
+            "stack": traceback.format_stack(frame) if frame is not None else [],
+        })
+    return out
+
+
+# perfilador del proceso (cada worker de gunicorn tiene el suyo)
+SAMPLER = StackSampler()
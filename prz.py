@@ -0,0 +1,186 @@
+# prz.py
+import threading
+from collections import deque
+
+from candles import TF_MS
+from zone_index import IntervalIndex, ZoneBook, ZONES
+
+# una PRZ sin tocar se retira después de estas velas desde C
+PRZ_HORIZON_BARS = 30
+# toques vistos por el detector/screener que el bot todavía no avisó
+PRZ_PENDING_MAX = 1000
+
+# =========================================================
+# PROYECCIÓN DE PRZ (D todavía formándose)
+# =========================================================
+# Con X, A, B, C confirmados, cada plantilla implica una banda de precio para
+# D (por AD/XA y por CD/BC). Guardamos esas bandas en un índice de intervalos
+# por símbolo (ZoneBook) y cada precio nuevo se consulta en O(log n + k), así la alerta
+# sale cuando el precio entra a la zona y no dos velas después de D.
+
+
+def _band(ref, leg, rng, sign, tolerance):
+    """Precios de D = ref - sign * r * leg para r en el rango (expandido por tolerancia)."""
+    r_min = rng[0] * (1 - tolerance)
+    r_max = rng[1] * (1 + tolerance)
+    p1 = ref - sign * r_min * leg
+    p2 = ref - sign * r_max * leg
+    return min(p1, p2), max(p1, p2)
+
+
+def project_d_bands(x, a, b, c, direction, templates, tolerance, score_fn):
+    """
+    Para una cadena XABC devuelve [(template, lo, hi)] con la banda de D que
+    cumple a la vez AD/XA y CD/BC de cada plantilla. Se saltan plantillas cuyo
+    AB/XA o BC/AB ya no encajan.
+    """
+    xa = abs(a - x)
+    ab = abs(b - a)
+    bc = abs(c - b)
+    if xa == 0 or ab == 0 or bc == 0:
+        return []
+
+    # bullish: D cae desde A/C; bearish: sube
+    sign = 1 if direction == "BULLISH" else -1
+    out = []
+    for tpl in templates:
+        # una plantilla puede no usar algún ratio (p. ej. AB=CD no mira XA)
+        if "ab_xa" in tpl and score_fn(ab / xa, *tpl["ab_xa"]) <= 0:
+            continue
+        if "bc_ab" in tpl and score_fn(bc / ab, *tpl["bc_ab"]) <= 0:
+            continue
+        ad_rng = tpl.get("ad_xa") or tpl.get("ad_xa_ext")
+        if "cd_bc" in tpl:
+            lo, hi = _band(c, bc, tpl["cd_bc"], sign, tolerance)
+            if ad_rng is not None:
+                ad_lo, ad_hi = _band(a, xa, ad_rng, sign, tolerance)
+                lo, hi = max(lo, ad_lo), min(hi, ad_hi)
+        elif ad_rng is not None:
+            lo, hi = _band(a, xa, ad_rng, sign, tolerance)
+        else:
+            continue
+        if lo <= hi:
+            out.append((tpl["name"], lo, hi))
+    return out
+
+
+class PRZProjector:
+    """
+    Zonas PRZ vivas (kind="prz" en el ZoneBook), alimentadas por el detector y
+    consultadas con cada precio. Aparte guarda por símbolo los niveles "más
+    allá de C" que invalidan cada cadena, también indexados por precio.
+    """
+
+    def __init__(self, book: ZoneBook):
+        self.book = book
+        self._lock = threading.Lock()
+        self._invalid = {}  # symbol -> IntervalIndex de niveles que invalidan (más allá de C)
+        self._by_tf = {}    # (symbol, tf) -> set(keys)
+        self._pending = deque(maxlen=PRZ_PENDING_MAX)  # (zona, precio) para el bot
+
+    def _drop(self, symbol, key):
+        self.book.remove(key)
+        inv = self._invalid.get(symbol)
+        if inv is not None:
+            inv.remove(key)
+
+    def project(self, symbol, tf, pivots, candles, templates, tolerance, score_fn):
+        """
+        Reemplaza las zonas de (symbol, tf) con las de la última cadena XABC
+        (C = último pivot confirmado). Las velas posteriores a C sirven para
+        descartar zonas ya tocadas o cadenas invalidadas (precio pasó C).
+        """
+        with self._lock:
+            keys = self._by_tf.setdefault((symbol, tf), set())
+            for key in keys:
+                self._drop(symbol, key)
+            keys.clear()
+
+            if len(pivots) < 4:
+                return []
+            x, a, b, c = pivots[-4:]
+            seq = [p["type"] for p in (x, a, b, c)]
+            if seq == ["low", "high", "low", "high"]:
+                direction = "BULLISH"
+            elif seq == ["high", "low", "high", "low"]:
+                direction = "BEARISH"
+            else:
+                return []
+
+            after = candles[c["index"] + 1:]
+            if len(after):
+                ext_hi = max(after.high)
+                ext_lo = min(after.low)
+                # si el precio superó C, C no era el extremo: la cadena no vale
+                if (direction == "BULLISH" and ext_hi > c["price"]) or \
+                   (direction == "BEARISH" and ext_lo < c["price"]):
+                    return []
+            else:
+                ext_hi = ext_lo = None
+
+            invalid = self._invalid.setdefault(symbol, IntervalIndex())
+            expires_at = c["time"] + PRZ_HORIZON_BARS * TF_MS.get(tf, 0)
+            created = []
+            for name, lo, hi in project_d_bands(x["price"], a["price"], b["price"], c["price"],
+                                                direction, templates, tolerance, score_fn):
+                # ya tocada por velas posteriores a C: eso lo reporta el detector normal
+                if ext_lo is not None and ext_lo <= hi and ext_hi >= lo:
+                    continue
+                key = f"{symbol}:{tf}:{c['time']}:{name}:{direction}"
+                z = self.book.upsert(key, symbol, "prz", lo, hi, tf=tf, expires_at=expires_at,
+                                     template=name, direction=direction,
+                                     x_price=x["price"], c_price=c["price"], c_time=c["time"])
+                # bullish se invalida si el precio sube por encima de C; bearish si baja
+                if direction == "BULLISH":
+                    invalid.insert(key, c["price"], float("inf"))
+                else:
+                    invalid.insert(key, float("-inf"), c["price"])
+                keys.add(key)
+                created.append(z)
+            return created
+
+    def on_price(self, symbol, low: float, high: float) -> list:
+        """
+        Zonas en las que entró el rango [low, high] (tick: low == high). Cada
+        zona alerta una sola vez y se retira; las invalidadas (precio más allá
+        de C) también se retiran.
+        """
+        with self._lock:
+            hit = self.book.hits(symbol, low, high, kinds=("prz",))
+            for z in hit:
+                self._drop(symbol, z.key)
+            # invalidación por C, también por índice (sin recorrer todas las zonas)
+            inv = self._invalid.get(symbol)
+            if inv is not None:
+                for key in inv.overlap(low, high):
+                    self._drop(symbol, key)
+            return hit
+
+    def observe(self, symbol, candles) -> int:
+        """
+        Cruza las velas recién bajadas de un símbolo cualquiera (screener,
+        detector) con sus zonas antes de re-proyectarlas; si no, una PRZ de un
+        símbolo que el bot no mira se tocaría y se descartaría sin avisar.
+        Los toques quedan pendientes hasta que el bot los saque con drain().
+        """
+        if not len(candles):
+            return 0
+        hit = self.on_price(symbol, min(candles.low), max(candles.high))
+        price = candles.close[-1]
+        with self._lock:
+            self._pending.extend((z, price) for z in hit)
+        return len(hit)
+
+    def drain(self) -> list:
+        """Toques pendientes de observe() -> [(zona, precio)], y se vacían."""
+        with self._lock:
+            out = list(self._pending)
+            self._pending.clear()
+        return out
+
+    def zones(self, symbol: str | None = None) -> list:
+        return self.book.zones(symbol=symbol, kind="prz")
+
+
+# proyector compartido (detector escribe, bot_loop consulta)
+PROJECTOR = PRZProjector(ZONES)
@@ -0,0 +1,183 @@
+# ratelimit.py
+import heapq
+import itertools
+import os
+import threading
+import time
+
+import requests
+
+# =========================================================
+# CONFIG
+# =========================================================
+# límite de Binance USDT-M: 2400 de peso por minuto por IP; dejamos margen
+WEIGHT_LIMIT_1M = int(os.getenv("BINANCE_WEIGHT_LIMIT_1M", 2400))
+WEIGHT_BUDGET_RATIO = 0.8
+USED_WEIGHT_HEADER = "X-MBX-USED-WEIGHT-1M"
+
+# prioridades (menor = primero)
+PRIORITY_LIVE = 0       # ticks del bot
+PRIORITY_DETECTOR = 1   # detector en su ventana
+PRIORITY_BACKFILL = 2   # screener / históricos
+
+# si no hay Retry-After en un 429/418
+DEFAULT_BACKOFF_S = 30
+
+
+def klines_weight(limit: int) -> int:
+    """Peso de /fapi/v1/klines según limit (tabla de Binance)."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+ENDPOINT_WEIGHTS = {
+    "/fapi/v1/time": 1,
+    "/fapi/v1/exchangeInfo": 1,
+    "/fapi/v1/ticker/24hr": 40,  # sin symbol (todo el mercado)
+}
+
+
+def request_weight(path: str, params: dict | None = None) -> int:
+    if path.endswith("/fapi/v1/klines"):
+        return klines_weight(int((params or {}).get("limit", 500)))
+    for p, w in ENDPOINT_WEIGHTS.items():
+        if path.endswith(p):
+            return w
+    return 1
+
+
+class RateLimited(Exception):
+    """Binance devolvió 429/418; el governor ya quedó en backoff."""
+
+
+# =========================================================
+# GOVERNOR
+# =========================================================
+class WeightGovernor:
+    """
+    Presupuesto de peso por ventana de 1 minuto (como cuenta Binance),
+    sincronizado con X-MBX-USED-WEIGHT-1M de cada respuesta. Las peticiones
+    esperan en una cola por prioridad; ante 429/418 todos esperan Retry-After.
+    """
+
+    def __init__(self, limit_1m: int = WEIGHT_LIMIT_1M, budget_ratio: float = WEIGHT_BUDGET_RATIO,
+                 clock=time.time):
+        self.budget = int(limit_1m * budget_ratio)
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._window = None
+        self._used = 0
+        self._blocked_until = 0.0
+        self._waiters = []  # heap (priority, seq)
+        self._seq = itertools.count()
+        self.by_endpoint = {}
+        self.throttled = 0
+        self.backoffs = 0
+
+    def _roll(self, now):
+        window = int(now // 60)
+        if window != self._window:
+            self._window = window
+            self._used = 0
+
+    def _wait_time(self, weight, now):
+        """Segundos hasta poder gastar `weight` (0 si ya se puede)."""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._used + weight <= self.budget:
+            return 0.0
+        return 60.0 - (now % 60.0) + 0.05  # hasta la ventana siguiente
+
+    def acquire(self, weight: int, priority: int = PRIORITY_DETECTOR, timeout: float | None = None):
+        """Bloquea hasta tener presupuesto y ser el primero en la cola de su prioridad."""
+        me = (priority, next(self._seq))
+        deadline = None if timeout is None else self._clock() + timeout
+        throttled = False
+        with self._cond:
+            heapq.heappush(self._waiters, me)
+            try:
+                while True:
+                    now = self._clock()
+                    self._roll(now)
+                    wait_s = self._wait_time(weight, now)
+                    if self._waiters[0] == me and wait_s == 0:
+                        self._used += weight
+                        return
+                    if wait_s > 0 and not throttled:
+                        throttled = True
+                        self.throttled += 1
+                    if deadline is not None:
+                        if now >= deadline:
+                            raise RateLimited("timeout esperando presupuesto de peso")
+                        wait_s = min(wait_s or 1.0, deadline - now)
+                    self._cond.wait(timeout=wait_s or 1.0)
+            finally:
+                self._waiters.remove(me)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def observe(self, path: str, weight: int, resp):
+        """Ajusta el estado con la respuesta (peso usado real, 429/418)."""
+        with self._cond:
+            now = self._clock()
+            self._roll(now)
+            self.by_endpoint[path] = self.by_endpoint.get(path, 0) + weight
+            used = resp.headers.get(USED_WEIGHT_HEADER)
+            if used is not None:
+                try:
+                    # el servidor manda: también cuenta lo que gastaron otros procesos
+                    self._used = max(self._used, int(used))
+                except ValueError:
+                    pass
+            if resp.status_code in (418, 429):
+                retry = resp.headers.get("Retry-After")
+                try:
+                    backoff = float(retry) if retry is not None else DEFAULT_BACKOFF_S
+                except ValueError:
+                    backoff = DEFAULT_BACKOFF_S
+                self._blocked_until = max(self._blocked_until, now + backoff)
+                self.backoffs += 1
+            self._cond.notify_all()
+
+    def info(self) -> dict:
+        with self._cond:
+            now = self._clock()
+            self._roll(now)
+            return {
+                "budget": self.budget,
+                "used_1m": self._used,
+                "blocked_for_s": round(max(0.0, self._blocked_until - now), 1),
+                "queued": len(self._waiters),
+                "throttled": self.throttled,
+                "backoffs": self.backoffs,
+                "by_endpoint": dict(self.by_endpoint),
+            }
+
+
+# governor compartido por todos los hilos del proceso
+GOVERNOR = WeightGovernor()
+
+
+def governed_get(url: str, params: dict | None = None, priority: int = PRIORITY_DETECTOR,
+                 timeout: float = 10, governor: WeightGovernor | None = None,
+                 wait_s: float | None = None):
+    """
+    requests.get con presupuesto de peso; levanta RateLimited en 429/418 o si
+    la cola del governor no da paso en wait_s segundos (None = espera lo que haga falta).
+    """
+    gov = governor or GOVERNOR
+    path = url.split("://", 1)[-1]
+    path = path[path.find("/"):] if "/" in path else "/"
+    weight = request_weight(path, params)
+    gov.acquire(weight, priority, timeout=wait_s)
+    resp = requests.get(url, params=params, timeout=timeout)
+    gov.observe(path, weight, resp)
+    if resp.status_code in (418, 429):
+        raise RateLimited(f"{resp.status_code} en {path}, Retry-After={resp.headers.get('Retry-After')}")
+    resp.raise_for_status()
+    return resp
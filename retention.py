@@ -0,0 +1,135 @@
+# retention.py
+import argparse
+import gzip
+import json
+import os
+import time
+
+from db import (
+    init_db, patterns_older_than, compact_patterns, list_archives,
+    auto_vacuum_mode, enable_incremental_vacuum, incremental_vacuum, AUTO_VACUUM_INCREMENTAL,
+)
+
+# =========================================================
+# CONFIG
+# =========================================================
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", 90))    # detalle completo en la base
+RETENTION_BATCH = int(os.getenv("RETENTION_BATCH", 500))   # filas por transacción
+RETENTION_MAX_BATCHES = 200                                # por pasada (el resto, en la próxima)
+RETENTION_PAUSE_S = 0.05          # entre batches: deja pasar las escrituras del detector
+RETENTION_INTERVAL_S = 3600
+RETENTION_VACUUM_PAGES = 2000
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+
+# =========================================================
+# ARCHIVO (NDJSON comprimido, un archivo por batch)
+# =========================================================
+def write_archive(rows: list, archive_dir: str = ARCHIVE_DIR) -> str:
+    """Escribe el batch completo a disco (tmp + fsync + rename) y devuelve el path."""
+    os.makedirs(archive_dir, exist_ok=True)
+    day = time.strftime("%Y-%m-%d", time.gmtime((rows[0]["d_time"] or 0) / 1000.0))
+    name = f"patterns_{day}_{rows[0]['id']}-{rows[-1]['id']}.ndjson.gz"
+    path = os.path.join(archive_dir, name)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as gz:
+            for r in rows:
+                gz.write(json.dumps(r, separators=(",", ":")).encode() + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def iter_archived(symbol: str | None = None, timeframe: str | None = None,
+                  pattern_type: str | None = None, direction: str | None = None,
+                  d_from: int | None = None, d_to: int | None = None):
+    """
+    Patrones archivados (dicts con ARCHIVE_COLUMNS) que cumplen los filtros.
+    Solo se abren los archivos cuyo rango de d_time se cruza con el pedido.
+    """
+    direction = direction.upper() if direction else None
+    for arch in list_archives(d_from, d_to):
+        try:
+            f = gzip.open(arch["path"], "rt", encoding="utf-8")
+        except OSError as e:
+            print(f"[retention] archivo no disponible {arch['path']}: {e}")
+            continue
+        with f:
+            for line in f:
+                r = json.loads(line)
+                if symbol and r["symbol"] != symbol:
+                    continue
+                if timeframe and r["timeframe"] != timeframe:
+                    continue
+                if pattern_type and r["pattern_type"] != pattern_type:
+                    continue
+                if direction and r["direction"] != direction:
+                    continue
+                if d_from is not None and (r["d_time"] is None or r["d_time"] < d_from):
+                    continue
+                if d_to is not None and (r["d_time"] is None or r["d_time"] >= d_to):
+                    continue
+                yield r
+
+
+# =========================================================
+# PASADA DE RETENCIÓN
+# =========================================================
+def run_retention_pass(now_ms: int | None = None, days: float = RETENTION_DAYS,
+                       batch_size: int = RETENTION_BATCH,
+                       max_batches: int = RETENTION_MAX_BATCHES) -> dict:
+    """
+    Mueve patrones con D más viejo que `days` a rollups + archivo, de a
+    batch_size filas por transacción. Cada transacción es corta y entre una y
+    otra se suelta la base, así el detector nunca espera más de un batch.
+    """
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    cutoff = now_ms - int(days * 86_400_000)
+    moved = batches = 0
+    while batches < max_batches:
+        rows = patterns_older_than(cutoff, batch_size)
+        if not rows:
+            break
+        path = write_archive(rows)
+        moved += compact_patterns(rows, path)
+        batches += 1
+        time.sleep(RETENTION_PAUSE_S)
+    # sin auto_vacuum=INCREMENTAL las páginas libres se reusan pero no vuelven al disco
+    free_pages = None
+    if moved and auto_vacuum_mode() == AUTO_VACUUM_INCREMENTAL:
+        free_pages = incremental_vacuum(RETENTION_VACUUM_PAGES)
+    return {"moved": moved, "batches": batches, "cutoff": cutoff, "free_pages": free_pages}
+
+
+def run_retention(interval_s: float = RETENTION_INTERVAL_S, log_fn=None):
+    """Loop de fondo (solo en el líder)."""
+    init_db()
+    # la conversión (VACUUM completo) bloquearía al bot y al detector: se hace offline
+    if auto_vacuum_mode() != AUTO_VACUUM_INCREMENTAL:
+        print("[retention] la base no tiene auto_vacuum=INCREMENTAL; para devolver espacio "
+              "al disco correr `python retention.py --incremental-vacuum` con el bot parado")
+    while True:
+        try:
+            report = run_retention_pass()
+            if report["moved"]:
+                msg = (f"[retention] {report['moved']} patrones archivados en "
+                       f"{report['batches']} batches")
+                print(msg)
+                if log_fn:
+                    log_fn(msg)
+        except Exception as e:
+            print(f"[retention] error: {e}")
+        time.sleep(interval_s)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--incremental-vacuum", action="store_true",
+                    help="convertir la base a auto_vacuum=INCREMENTAL (VACUUM completo; con el bot parado)")
+    args = ap.parse_args()
+    init_db()
+    if args.incremental_vacuum:
+        print("[retention] convertida" if enable_incremental_vacuum() else "[retention] ya era INCREMENTAL")
+    print(run_retention_pass())
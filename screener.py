@@ -0,0 +1,190 @@
+# screener.py
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from detector import BINANCE_BASE, scan_symbol, emit_pattern, pattern_key
+from ratelimit import governed_get, PRIORITY_BACKFILL
+
+# =========================================================
+# CONFIG
+# =========================================================
+SCREENER_ENABLED = os.getenv("SCREENER_ENABLED", "") == "1"
+SCREENER_TOP_N = int(os.getenv("SCREENER_TOP_N", 10))          # patrones a emitir por slot
+SCREENER_BUDGET_S = float(os.getenv("SCREENER_BUDGET_S", 25))   # tiempo máximo por slot
+SCREENER_WORKERS = int(os.getenv("SCREENER_WORKERS", 8))
+SCREENER_PRIORITY = os.getenv("SCREENER_PRIORITY", "liquidity")  # o "volatility"
+SCREENER_MAX_SYMBOLS = int(os.getenv("SCREENER_MAX_SYMBOLS", 0))  # 0 = todos
+
+UNIVERSE_CACHE_PATH = os.getenv("UNIVERSE_CACHE_PATH", "universe_cache.json")
+UNIVERSE_TTL_S = 6 * 3600   # exchangeInfo cambia poco
+TICKER_TTL_S = 10 * 60      # volumen / volatilidad 24h
+
+_ticker_cache = {"at": 0.0, "data": {}}
+
+
+# =========================================================
+# UNIVERSO DE SÍMBOLOS
+# =========================================================
+def _fetch_perpetuals():
+    r = governed_get(f"{BINANCE_BASE}/fapi/v1/exchangeInfo", priority=PRIORITY_BACKFILL)
+    return sorted(
+        s["symbol"] for s in r.json().get("symbols", [])
+        if s.get("contractType") == "PERPETUAL"
+        and s.get("quoteAsset") == "USDT"
+        and s.get("status") == "TRADING"
+    )
+
+
+def load_universe(force: bool = False) -> list:
+    """Perpetuos USDT-M en TRADING, con cache en disco (sobrevive reinicios)."""
+    cached = None
+    try:
+        with open(UNIVERSE_CACHE_PATH, encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    if cached and not force and time.time() - cached.get("at", 0) < UNIVERSE_TTL_S:
+        return cached["symbols"]
+
+    try:
+        symbols = _fetch_perpetuals()
+    except Exception as e:
+        # sin red: mejor un universo viejo que ninguno
+        if cached:
+            print(f"[screener] exchangeInfo falló, uso cache: {e}")
+            return cached["symbols"]
+        raise
+
+    tmp = UNIVERSE_CACHE_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"at": time.time(), "symbols": symbols}, f)
+    os.replace(tmp, UNIVERSE_CACHE_PATH)
+    return symbols
+
+
+def _ticker_24h() -> dict:
+    """symbol -> (quoteVolume, rango % 24h). Una sola llamada para todo el mercado."""
+    now = time.time()
+    if now - _ticker_cache["at"] < TICKER_TTL_S and _ticker_cache["data"]:
+        return _ticker_cache["data"]
+    r = governed_get(f"{BINANCE_BASE}/fapi/v1/ticker/24hr", priority=PRIORITY_BACKFILL)
+    data = {}
+    for t in r.json():
+        try:
+            last = float(t["lastPrice"]) or 1.0
+            rng = (float(t["highPrice"]) - float(t["lowPrice"])) / last
+            data[t["symbol"]] = (float(t["quoteVolume"]), rng)
+        except (KeyError, ValueError):
+            continue
+    _ticker_cache["at"] = now
+    _ticker_cache["data"] = data
+    return data
+
+
+def prioritize(symbols: list, by: str = SCREENER_PRIORITY) -> list:
+    """Ordena por liquidez (quoteVolume) o volatilidad (rango 24h); sin ticker, deja el orden."""
+    try:
+        ticker = _ticker_24h()
+    except Exception as e:
+        print(f"[screener] ticker 24h falló, sin priorizar: {e}")
+        return list(symbols)
+    pos = 0 if by == "liquidity" else 1
+    return sorted(symbols, key=lambda s: ticker.get(s, (0.0, 0.0))[pos], reverse=True)
+
+
+# =========================================================
+# SLOT DEL SCREENER (con presupuesto de tiempo)
+# =========================================================
+def screen_slot(tf: str, send_fn=None, log_fn=None, seen: set | None = None,
+                budget_s: float = SCREENER_BUDGET_S, top_n: int = SCREENER_TOP_N,
+                workers: int = SCREENER_WORKERS) -> dict:
+    """
+    Escanea el universo por prioridad hasta agotar el presupuesto. Lo que no
+    entra se saltea (y se reporta); al final solo se emiten los top_n
+    patrones nuevos por score de todo el mercado. scan_symbol devuelve todos
+    los buckets de su ventana, así que lo ya emitido (en `seen`) se descarta
+    antes del top: si no, los mismos patrones viejos ocuparían el top cada slot.
+    """
+    seen = set() if seen is None else seen
+    started = time.monotonic()
+    deadline = started + budget_s
+
+    symbols = prioritize(load_universe())
+    if SCREENER_MAX_SYMBOLS:
+        symbols = symbols[:SCREENER_MAX_SYMBOLS]
+
+    found = []
+    errors = 0
+    last_error = None
+    scanned = 0
+    pending = iter(symbols)
+    running = set()
+    exhausted = False
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            # solo lanzamos trabajo nuevo si queda presupuesto
+            while not exhausted and len(running) < workers and time.monotonic() < deadline:
+                sym = next(pending, None)
+                if sym is None:
+                    exhausted = True
+                    break
+                running.add(pool.submit(scan_symbol, sym, tf, PRIORITY_BACKFILL, deadline))
+            if not running:
+                break
+            remaining = deadline - time.monotonic()
+            done, running = wait(running, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            for fut in done:
+                scanned += 1
+                try:
+                    found.extend(fut.result())
+                except Exception as e:
+                    errors += 1
+                    last_error = str(e)
+            if time.monotonic() >= deadline:
+                # se acabó el tiempo: lo que sigue corriendo se descarta
+                break
+    finally:
+        # los scans en curso ven el mismo deadline y cortan en el próximo paso
+        # (ScanCancelled); los esperamos para no dejar hilos tocando la base
+        # y el libro de PRZ cuando el slot ya terminó
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    fresh = [it for it in found if pattern_key(it) not in seen]
+    fresh.sort(key=lambda it: it["score"], reverse=True)
+    emitted = 0
+    for item in fresh[:top_n]:
+        if emit_pattern(item, send_fn, log_fn, seen):
+            emitted += 1
+
+    report = {
+        "tf": tf,
+        "universe": len(symbols),
+        "scanned": scanned,
+        "errors": errors,
+        "last_error": last_error,
+        "skipped": len(symbols) - scanned,
+        "coverage": round(scanned / len(symbols), 3) if symbols else 0.0,
+        "patterns": len(found),
+        "new": len(fresh),
+        "emitted": emitted,
+        "elapsed_s": round(time.monotonic() - started, 2),
+    }
+    msg = (f"[screener] {tf}: {scanned}/{len(symbols)} símbolos "
+           f"({report['coverage'] * 100:.0f}%), {len(found)} patrones, {emitted} emitidos, "
+           f"{report['elapsed_s']}s")
+    print(msg)
+    if log_fn:
+        log_fn(msg)
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+    from db import init_db
+    init_db()
+    print(screen_slot(sys.argv[1] if len(sys.argv) > 1 else "15m"))
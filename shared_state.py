@@ -0,0 +1,236 @@
+# shared_state.py
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo modo de un proceso
+    fcntl = None
+
+# =========================================================
+# ESTADO COMPARTIDO CON SNAPSHOTS
+# =========================================================
+# Los hilos del bot/detector escriben y Flask lee. Cada escritura arma un
+# dict nuevo (copy-on-write) bajo lock y reemplaza la referencia, así que un
+# lector siempre ve un snapshot completo: nunca una señal a medio escribir.
+
+PUBLISH_INTERVAL_S = 0.5     # como mucho un volcado a disco cada tanto (ráfagas de logs)
+VIEWS_REFRESH_S = 2.0        # las vistas (zonas, confluencias) se refrescan aunque el estado no cambie
+
+
+class StateStore:
+    """
+    Estado versionado. Lecturas sin lock (la referencia al snapshot se cambia
+    de una vez); escrituras serializadas con lock. Con start_publishing() un
+    hilo vuelca el último snapshot a JSON con rename atómico para que otros
+    procesos (workers del servidor) lo lean: a lo sumo uno cada
+    publish_interval, no uno por escritura. Las vistas (add_view) son datos
+    que viven fuera del estado (libro de zonas, confluencias) y solo viajan
+    en el JSON publicado, bajo "views".
+    """
+
+    def __init__(self, initial: dict, publish_interval: float = PUBLISH_INTERVAL_S):
+        self._lock = threading.Lock()
+        snap = dict(initial)
+        snap["console"] = tuple(snap.get("console", ()))
+        self._snap = snap
+        self._version = 0
+        self.publish_path = None
+        self.publish_interval = publish_interval
+        self._views = {}
+        self._dirty = threading.Event()
+
+    # ---------- lectura ----------
+    def snapshot(self) -> dict:
+        """Snapshot inmutable por convención: no modificarlo."""
+        return self._snap
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def __getitem__(self, key):
+        return self._snap[key]
+
+    def get(self, key, default=None):
+        return self._snap.get(key, default)
+
+    # ---------- escritura ----------
+    def update(self, fields: dict):
+        """Aplica varios campos en una sola versión."""
+        with self._lock:
+            snap = dict(self._snap)
+            snap.update(fields)
+            self._commit(snap)
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def toggle(self, key) -> bool:
+        with self._lock:
+            snap = dict(self._snap)
+            snap[key] = not snap[key]
+            self._commit(snap)
+            return snap[key]
+
+    def add_console(self, line: str):
+        with self._lock:
+            snap = dict(self._snap)
+            maxlen = snap.get("console_max", 200)
+            snap["console"] = ((line,) + snap["console"])[:maxlen]
+            self._commit(snap)
+
+    def clear_console(self):
+        self.update({"console": ()})
+
+    def _commit(self, snap: dict):
+        # se llama con el lock tomado; el volcado a disco lo hace el publicador
+        self._version += 1
+        snap["state_version"] = self._version
+        self._snap = snap
+        self._dirty.set()
+
+    # ---------- publicación entre procesos ----------
+    def add_view(self, key: str, fn):
+        """fn() -> datos JSON que se publican en views[key] con cada volcado."""
+        self._views[key] = fn
+
+    def start_publishing(self, path: str):
+        self.publish_path = path
+        self._dirty.set()
+        threading.Thread(target=self._publish_loop, name="state-publish", daemon=True).start()
+
+    def _publish_loop(self):
+        while True:
+            # cambios en el estado, o refresco periódico de las vistas
+            self._dirty.wait(VIEWS_REFRESH_S if self._views else None)
+            self._dirty.clear()
+            self.publish()
+            time.sleep(self.publish_interval)
+
+    def publish(self):
+        """Vuelca el snapshot actual + vistas a publish_path."""
+        snap = dict(self._snap)
+        views = {}
+        for key, fn in self._views.items():
+            try:
+                views[key] = fn()
+            except Exception as e:
+                print(f"StateStore view {key} error:", e)
+        snap["views"] = views
+        tmp = f"{self.publish_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snap, f)
+            os.replace(tmp, self.publish_path)
+        except OSError as e:
+            print("StateStore publish error:", e)
+
+
+class SnapshotReader:
+    """Lado lector (otros procesos): recarga el JSON publicado solo si cambió."""
+
+    def __init__(self, path: str, default: dict | None = None):
+        self.path = path
+        self._mtime = None
+        self._snap = dict(default or {})
+        self._views = {}
+
+    def snapshot(self) -> dict:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self._snap
+        if mtime != self._mtime:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    snap = json.load(f)
+                self._views = snap.pop("views", {})
+                self._snap = snap
+                self._mtime = mtime
+            except (OSError, ValueError):
+                pass  # el escritor lo está reemplazando; se reintenta en la próxima lectura
+        return self._snap
+
+    def __getitem__(self, key):
+        return self.snapshot()[key]
+
+    def view(self, key: str, default=None):
+        """Vista publicada por el líder (ver StateStore.add_view)."""
+        self.snapshot()
+        return self._views.get(key, default)
+
+
+# =========================================================
+# CONTROLES (toggles del panel) ENTRE PROCESOS
+# =========================================================
+@contextmanager
+def _flock(path: str):
+    """Lock exclusivo entre procesos (no-op sin fcntl)."""
+    with open(path, "a+") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def try_acquire_leader(lock_path: str):
+    """
+    Elección de líder entre workers: el primero que toma el flock se queda con
+    el bot y el detector. Devuelve el file handle (mantenerlo abierto = seguir
+    siendo líder; el SO lo libera si el proceso muere) o None.
+    """
+    if fcntl is None:
+        return open(lock_path, "a+")
+    fh = open(lock_path, "a+")
+    try:
+        fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fh.close()
+        return None
+    return fh
+
+
+class ControlFile:
+    """
+    Los workers que no son líder no pueden tocar el estado del bot; escriben
+    los cambios pedidos acá y el líder los aplica (ver main.watch_controls).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock_path = path + ".lock"
+
+    def push(self, command: dict):
+        with _flock(self._lock_path):
+            pending = self._read()
+            pending.append(command)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(pending, f)
+            os.replace(tmp, self.path)
+
+    def drain(self) -> list:
+        if not os.path.exists(self.path):
+            return []
+        with _flock(self._lock_path):
+            pending = self._read()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            return pending
+
+    def _read(self) -> list:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
@@ -0,0 +1,107 @@
+# signals.py
+import threading
+import time
+
+from db import get_conn, init_db, insert_signals
+
+# =========================================================
+# CONFIG
+# =========================================================
+GROUP_COMMIT_WINDOW_S = 0.010   # cuánto espera el escritor a que lleguen más señales
+GROUP_COMMIT_MAX = 500          # señales por transacción
+RETRY_PAUSE_S = 1.0
+
+
+# =========================================================
+# DIARIO DE SEÑALES (group commit)
+# =========================================================
+class SignalJournal:
+    """
+    Diario append-only de señales BUY/SELL en SQLite. append() solo encola y
+    vuelve enseguida; un hilo escritor junta lo que llegue en una ventana
+    corta y lo escribe en una sola transacción, así una ráfaga de señales
+    (muchos símbolos cerrando vela a la vez) cuesta un solo fsync.
+    Quien necesite la señal en disco espera con wait(seq) o flush().
+    """
+
+    def __init__(self, window_s: float = GROUP_COMMIT_WINDOW_S, max_batch: int = GROUP_COMMIT_MAX):
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = 0        # última señal encolada
+        self._durable = 0    # última señal ya commiteada (FIFO)
+        self._thread = None
+        self.commits = 0
+        self.written = 0
+        self.last_error = None
+
+    def append(self, signal: dict) -> int:
+        """Encola una señal; devuelve su número de secuencia."""
+        self.ensure_started()
+        with self._cond:
+            self._queue.append(signal)
+            self._seq += 1
+            self._cond.notify_all()
+            return self._seq
+
+    def wait(self, seq: int, timeout: float | None = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._durable >= seq, timeout)
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        with self._cond:
+            seq = self._seq
+        return self.wait(seq, timeout)
+
+    def _take(self) -> list:
+        with self._cond:
+            self._cond.wait_for(lambda: self._queue)
+            # ventana de group commit: lo que llegue mientras tanto va en el mismo lote
+            deadline = time.monotonic() + self.window_s
+            while len(self._queue) < self.max_batch:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._cond.wait(left)
+            batch = self._queue[:self.max_batch]
+            del self._queue[:self.max_batch]
+            return batch
+
+    def _run(self):
+        init_db()
+        conn = get_conn()
+        while True:
+            batch = self._take()
+            while True:
+                try:
+                    self.written += insert_signals(conn, batch)
+                    conn.commit()
+                    self.last_error = None
+                    break
+                except Exception as e:
+                    conn.rollback()
+                    self.last_error = str(e)
+                    print(f"[signals] error escribiendo {len(batch)} señales, reintento: {e}")
+                    time.sleep(RETRY_PAUSE_S)
+            self.commits += 1
+            with self._cond:
+                self._durable += len(batch)
+                self._cond.notify_all()
+
+    def ensure_started(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="signal-journal", daemon=True)
+            self._thread.start()
+
+    def info(self) -> dict:
+        with self._cond:
+            pending = len(self._queue)
+        return {"written": self.written, "commits": self.commits,
+                "pending": pending, "last_error": self.last_error}
+
+
+# diario compartido (lo escribe process_new_candle en el líder)
+SIGNALS = SignalJournal()
@@ -0,0 +1,509 @@
+# simulate.py
+"""
+Simulador de mercado acelerado para pruebas de carga y latencia de punta a
+punta: bot_loop + run_detector + panel + notificadores contra un Binance y un
+Telegram/IFTTT locales, con un reloj virtual (un día en un minuto a 1440x).
+
+    # solo el servidor (apuntar la app a mano con BINANCE_BASE=... SIM_CLOCK=1)
+    python simulate.py serve --speed 1440 --symbols 20
+
+    # levanta main.py contra el simulador y mide
+    python simulate.py run --speed 1440 --days 1 --symbols 1
+    python simulate.py run --speed 60 --days 0.25 --symbols 100   # screener
+    python simulate.py run --recorded harmonics.db --speed 720 --days 2
+
+Datos: sintéticos (senoidales + ruido determinístico por símbolo, mismo
+precio para el mismo instante en cualquier TF) o grabados en la tabla
+candles (--recorded; lo que falte se completa con sintéticos).
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from urllib.request import urlopen
+
+import db
+from candles import TF_MS
+
+# =========================================================
+# CONFIG
+# =========================================================
+SIM_SPEED = 1440.0            # 1 día virtual por minuto real
+SIM_SUBSAMPLES = 16           # puntos de precio por vela para high/low
+SIM_MAX_LIMIT = 1500          # como Binance
+SIM_START_DAYS_AGO = 7        # el reloj virtual arranca una semana atrás
+SIM_BOT_SYMBOL = "LTCUSDT"    # el bot de 1m/15m sigue a este símbolo
+SAMPLE_EVERY_S = 1.0          # muestreo de RSS y del panel (segundos reales)
+
+_TF_RE = re.compile(r"\b(?:TF=)?(" + "|".join(sorted(TF_MS, key=len, reverse=True)) + r")\b")
+
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, int(round(p / 100.0 * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+# =========================================================
+# RELOJ VIRTUAL
+# =========================================================
+class VirtualClock:
+    """virtual_ms = start_ms + (time.time() - real0) * 1000 * speed."""
+
+    def __init__(self, speed: float = SIM_SPEED, start_ms: int | None = None):
+        self.speed = float(speed)
+        self.real0 = time.time()
+        if start_ms is None:
+            start_ms = int((self.real0 - SIM_START_DAYS_AGO * 86400) * 1000)
+        self.start_ms = int(start_ms)
+
+    def now_ms(self) -> int:
+        return int(self.start_ms + (time.time() - self.real0) * 1000.0 * self.speed)
+
+    def anchor(self) -> dict:
+        return {"real": self.real0, "virtual_ms": self.start_ms, "speed": self.speed}
+
+
+# =========================================================
+# MERCADO
+# =========================================================
+class SyntheticMarket:
+    """
+    Precio determinístico p(símbolo, t): la misma vela sale igual en cada
+    pedido y los TF son consistentes entre sí. Hay swings de varias escalas
+    para que el detector encuentre pivots y patrones.
+    """
+
+    def __init__(self, symbols: list):
+        self.symbols = list(symbols)
+
+    @staticmethod
+    def _seed(symbol: str) -> int:
+        return zlib.crc32(symbol.encode())
+
+    @lru_cache(maxsize=64)
+    def _params(self, symbol: str):
+        seed = self._seed(symbol)
+        base = 20.0 + (seed % 9973) / 9973.0 * 180.0
+        phases = tuple(((seed >> (4 * i)) & 0xFF) / 255.0 * 2 * math.pi for i in range(4))
+        return seed, base, phases
+
+    def price(self, symbol: str, t_ms: int) -> float:
+        seed, base, (p1, p2, p3, p4) = self._params(symbol)
+        x = t_ms / 60_000.0  # minutos
+        m = int(x)
+        noise = (((seed * 1103515245 + m * 2654435761) & 0xFFFFFFFF) / 4294967296.0 - 0.5) * 2
+        wave = (0.05 * math.sin(x / 1440.0 + p1) + 0.025 * math.sin(x / 233.0 + p2)
+                + 0.01 * math.sin(x / 47.0 + p3) + 0.004 * math.sin(x / 9.1 + p4))
+        return base * (1.0 + wave + 0.0006 * noise)
+
+    @lru_cache(maxsize=200_000)
+    def _closed_bar(self, symbol: str, tf_ms: int, open_time: int) -> tuple:
+        return self._bar(symbol, tf_ms, open_time, open_time + tf_ms - 1)
+
+    def _bar(self, symbol, tf_ms, open_time, upto):
+        step = tf_ms / (SIM_SUBSAMPLES - 1)
+        pts = [self.price(symbol, int(open_time + j * step))
+               for j in range(SIM_SUBSAMPLES) if open_time + j * step <= upto]
+        close = self.price(symbol, upto)
+        pts.append(close)
+        vol = 1000.0 + (zlib.crc32(f"{symbol}{open_time}".encode()) % 1000)
+        return pts[0], max(pts), min(pts), close, vol
+
+    def bar(self, symbol: str, tf: str, open_time: int, now_ms: int) -> tuple:
+        """(open, high, low, close, volume); la vela en formación llega hasta now_ms."""
+        tf_ms = TF_MS[tf]
+        if open_time + tf_ms <= now_ms:
+            return self._closed_bar(symbol, tf_ms, open_time)
+        return self._bar(symbol, tf_ms, open_time, now_ms)
+
+    def klines(self, symbol: str, tf: str, limit: int, now_ms: int, end_ms: int | None = None) -> list:
+        tf_ms = TF_MS[tf]
+        last_open = ((min(now_ms, end_ms) if end_ms is not None else now_ms) // tf_ms) * tf_ms
+        rows = []
+        for open_time in range(last_open - (limit - 1) * tf_ms, last_open + 1, tf_ms):
+            o, h, l, c, v = self.bar(symbol, tf, open_time, now_ms)
+            rows.append(_kline_row(open_time, tf_ms, o, h, l, c, v))
+        return rows
+
+
+class RecordedMarket(SyntheticMarket):
+    """Velas de la tabla candles (db.load_candles); lo que no está, sintético."""
+
+    def __init__(self, symbols: list, db_path: str):
+        super().__init__(symbols)
+        db.DB_PATH = db_path
+
+    def first_open_time(self, symbol: str, tf: str = "1m") -> int | None:
+        c = db.load_candles(symbol, tf, start=0, limit=1)
+        return c.open_time[0] if len(c) else None
+
+    def klines(self, symbol, tf, limit, now_ms, end_ms=None):
+        end = min(now_ms, end_ms) if end_ms is not None else now_ms
+        c = db.load_candles(symbol, tf, end=end, limit=limit)
+        if len(c) < limit:
+            return super().klines(symbol, tf, limit, now_ms, end_ms)
+        tf_ms = TF_MS[tf]
+        return [_kline_row(c.open_time[i], tf_ms, c.open[i], c.high[i], c.low[i], c.close[i], 0.0)
+                for i in range(len(c))]
+
+
+def _kline_row(open_time, tf_ms, o, h, l, c, v):
+    # mismo formato que /fapi/v1/klines (precios como string)
+    return [open_time, f"{o:.6f}", f"{h:.6f}", f"{l:.6f}", f"{c:.6f}", f"{v:.3f}",
+            open_time + tf_ms - 1, f"{v * c:.3f}", 100, "0", "0", "0"]
+
+
+# =========================================================
+# SERVIDOR (Binance + Telegram + IFTTT)
+# =========================================================
+class SimState:
+    """Lo que mide el servidor: pedidos por ruta y alertas recibidas."""
+
+    def __init__(self, clock: VirtualClock, market: SyntheticMarket):
+        self.clock = clock
+        self.market = market
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.kline_symbols = {}   # hora virtual -> símbolos pedidos
+        self.alerts = []          # (virtual_ms, canal, tf, latencia virtual ms, texto, destino)
+
+    def count(self, route: str):
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def klines_for(self, symbol: str, now_ms: int):
+        with self._lock:
+            self.kline_symbols.setdefault(now_ms // 3_600_000, set()).add(symbol)
+
+    def alert(self, channel: str, text: str, target: str = "sim"):
+        now_ms = self.clock.now_ms()
+        m = _TF_RE.search(text)
+        tf = m.group(1) if m else None
+        # latencia: desde el cierre de la última vela del TF del mensaje
+        latency = now_ms - (now_ms // TF_MS[tf]) * TF_MS[tf] if tf else None
+        with self._lock:
+            self.alerts.append((now_ms, channel, tf, latency, text, target))
+
+    def report(self) -> dict:
+        with self._lock:
+            alerts = list(self.alerts)
+            requests = dict(self.requests)
+            hours = {h: len(s) for h, s in self.kline_symbols.items()}
+        speed = self.clock.speed
+        by_tf = {}
+        for _, channel, tf, lat, _, target in alerts:
+            # latencia solo del chat principal (los suscriptores reciben copias)
+            if tf is not None and channel == "telegram" and target == "sim":
+                by_tf.setdefault(tf, []).append(lat)
+        latency = {}
+        for tf, vals in sorted(by_tf.items()):
+            vals.sort()
+            latency[tf] = {
+                "n": len(vals),
+                # en segundos de hora del servidor y su equivalente real
+                "p50_s": percentile(vals, 50) / 1000.0,
+                "p95_s": percentile(vals, 95) / 1000.0,
+                "p99_s": percentile(vals, 99) / 1000.0,
+                "p99_real_ms": percentile(vals, 99) / speed,
+            }
+        full_hours = sorted(hours.items())[1:-1] or sorted(hours.items())
+        return {
+            "speed": speed,
+            "virtual_elapsed_h": (self.clock.now_ms() - self.clock.start_ms) / 3_600_000,
+            "requests": requests,
+            "alerts": {"total": len(alerts),
+                       "telegram": sum(1 for a in alerts if a[1] == "telegram"),
+                       "ifttt": sum(1 for a in alerts if a[1] == "ifttt")},
+            "latency": latency,
+            "symbols_per_hour": (sum(n for _, n in full_hours) / len(full_hours)) if full_hours else 0,
+            "last_alerts": [a[4] for a in alerts if a[5] == "sim"][-5:],
+            "subscribers": {"deliveries": sum(1 for a in alerts if a[5] != "sim"),
+                            "reached": len({a[5] for a in alerts if a[5] != "sim"})},
+        }
+
+
+class SimHandler(BaseHTTPRequestHandler):
+    sim: SimState = None  # se asigna en make_server
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, obj, status: int = 200, headers: dict | None = None):
+        body = json.dumps(obj, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        sim = self.sim
+        u = urlparse(self.path)
+        q = {k: v[-1] for k, v in parse_qs(u.query).items()}
+        sim.count(u.path)
+        now_ms = sim.clock.now_ms()
+
+        if u.path == "/fapi/v1/time":
+            return self._json({"serverTime": now_ms})
+        if u.path == "/sim/clock":
+            return self._json(sim.clock.anchor())
+        if u.path == "/sim/report":
+            return self._json(sim.report())
+        if u.path == "/fapi/v1/klines":
+            symbol, tf = q.get("symbol"), q.get("interval")
+            if tf not in TF_MS or not symbol:
+                return self._json({"code": -1120, "msg": "Invalid interval."}, 400)
+            limit = max(1, min(int(q.get("limit", 500)), SIM_MAX_LIMIT))
+            end_ms = int(q["endTime"]) if "endTime" in q else None
+            sim.klines_for(symbol, now_ms)
+            rows = sim.market.klines(symbol, tf, limit, now_ms, end_ms)
+            return self._json(rows, headers={"X-MBX-USED-WEIGHT-1M": "1"})
+        if u.path == "/fapi/v1/exchangeInfo":
+            return self._json({"symbols": [
+                {"symbol": s, "contractType": "PERPETUAL", "quoteAsset": "USDT", "status": "TRADING"}
+                for s in sim.market.symbols]})
+        if u.path == "/fapi/v1/ticker/24hr":
+            out = []
+            for s in sim.market.symbols:
+                day = sim.market.klines(s, "1h", 24, now_ms)
+                hi = max(float(r[2]) for r in day)
+                lo = min(float(r[3]) for r in day)
+                last = float(day[-1][4])
+                out.append({"symbol": s, "lastPrice": str(last), "highPrice": str(hi),
+                            "lowPrice": str(lo), "quoteVolume": str(sum(float(r[7]) for r in day))})
+            return self._json(out)
+        return self._json({"msg": "not found"}, 404)
+
+    def do_POST(self):
+        sim = self.sim
+        u = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            payload = {}
+        if u.path.startswith("/bot") and u.path.endswith("/sendMessage"):
+            sim.count("telegram")
+            sim.alert("telegram", str(payload.get("text", "")), str(payload.get("chat_id", "sim")))
+            return self._json({"ok": True, "result": {}})
+        if u.path.startswith("/trigger/"):
+            sim.count("ifttt")
+            # /trigger/<evento>/with/key/<key>
+            sim.alert("ifttt", str(payload.get("value1", "")), u.path.split("/")[2])
+            return self._json({"ok": True})
+        return self._json({"msg": "not found"}, 404)
+
+
+def make_server(sim: SimState, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    handler = type("BoundSimHandler", (SimHandler,), {"sim": sim})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def sim_symbols(n: int) -> list:
+    return [SIM_BOT_SYMBOL] + [f"SIM{i:03d}USDT" for i in range(1, max(1, n))]
+
+
+def build_sim(args) -> SimState:
+    symbols = sim_symbols(args.symbols)
+    if args.recorded:
+        market = RecordedMarket(symbols, args.recorded)
+        first = market.first_open_time(SIM_BOT_SYMBOL)
+        # arranca con dos días de historia grabada detrás
+        start_ms = first + 2 * 86_400_000 if first is not None else None
+    else:
+        market = SyntheticMarket(symbols)
+        start_ms = None
+    return SimState(VirtualClock(args.speed, start_ms), market)
+
+
+# =========================================================
+# CORRIDA COMPLETA (main.py contra el simulador)
+# =========================================================
+def seed_subscriptions(db_path: str, n: int, symbols: list) -> int:
+    """
+    n suscripciones con filtros variados (la mayoría con símbolos que no
+    existen en la simulación) apuntando al sink: telegram chat subN o ifttt subN.
+    """
+    from templates import TEMPLATES
+    rnd = random.Random(45)
+    universe = symbols + [f"OTHER{i:04d}USDT" for i in range(max(100, n // 5))]
+    ptypes = list(TEMPLATES.current().names)
+
+    def pick(pool, k):
+        return rnd.sample(pool, min(k, len(pool))) if rnd.random() < 0.7 else None
+
+    subs = []
+    for i in range(n):
+        channel = "telegram" if rnd.random() < 0.8 else "ifttt"
+        subs.append({
+            "name": f"sim-{i}", "channel": channel,
+            "target": f"sub{i}" if channel == "telegram" else f"sub{i}:k",
+            "symbols": pick(universe, 3), "timeframes": pick(list(TF_MS), 2),
+            "pattern_types": pick(ptypes, 2),
+            "kinds": pick(["signal", "pattern", "confluence", "prz"], 2),
+            "min_score": rnd.choice([0, 0, 60, 70, 80]),
+        })
+    # la base de la app (--recorded sigue leyendo la suya)
+    recorded, db.DB_PATH = db.DB_PATH, db_path
+    try:
+        db.init_db()
+        return len(db.add_subscriptions(subs))
+    finally:
+        db.DB_PATH = recorded
+
+
+def _rss_kb(pid: int) -> int | None:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _slope(xs, ys):
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mx, my = sum(xs) / n, sum(ys) / n
+    den = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / den if den else 0.0
+
+
+def run(args):
+    sim = build_sim(args)
+    server = make_server(sim)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    workdir = tempfile.mkdtemp(prefix="sim_")
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ)
+    env.update({
+        "BINANCE_BASE": base,
+        "SIM_CLOCK": "1",
+        "BOT_SYMBOL": SIM_BOT_SYMBOL,
+        "TELEGRAM_TOKEN": "sim", "TELEGRAM_CHAT_ID": "sim", "TELEGRAM_API_BASE": base,
+        "IFTTT_EVENT": "sim", "IFTTT_KEY": "sim", "IFTTT_BASE": base,
+        "PORT": str(args.port),
+        "RUNTIME_DIR": workdir,
+        "ARCHIVE_DIR": os.path.join(workdir, "archive"),
+        "UNIVERSE_CACHE_PATH": os.path.join(workdir, "universe_cache.json"),
+        "BINANCE_WEIGHT_LIMIT_1M": "100000000",
+        # un TTL de 1s real serían minutos virtuales de vela en formación vieja
+        "KLINES_CACHE_TTL_S": str(min(1.0, 1.0 / sim.clock.speed)),
+        "SCREENER_ENABLED": "1" if args.symbols > 1 else "",
+        "SCREENER_BUDGET_S": str(max(1.0, 25.0 / sim.clock.speed)),
+        "PYTHONUNBUFFERED": "1",
+    })
+    if args.subscriptions:
+        seed_subscriptions(os.path.join(workdir, "harmonics.db"), args.subscriptions, sim.market.symbols)
+    log_path = os.path.join(workdir, "app.log")
+    log = open(log_path, "wb")
+    proc = subprocess.Popen([sys.executable, os.path.join(here, "main.py")],
+                            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    print(f"[sim] {base} speed={sim.clock.speed:g}x symbols={args.symbols} "
+          f"app pid={proc.pid} cwd={workdir}")
+
+    real_s = args.days * 86400.0 / sim.clock.speed
+    panel = f"http://127.0.0.1:{args.port}/status"
+    rss, panel_lat, panel_err = [], [], 0
+    status = {}
+    t_end = time.time() + real_s
+    try:
+        while time.time() < t_end and proc.poll() is None:
+            time.sleep(SAMPLE_EVERY_S)
+            kb = _rss_kb(proc.pid)
+            if kb is not None:
+                rss.append(((sim.clock.now_ms() - sim.clock.start_ms) / 86_400_000, kb))
+            t0 = time.perf_counter()
+            try:
+                with urlopen(panel, timeout=5) as r:
+                    body = r.read()
+                panel_lat.append(time.perf_counter() - t0)
+                status = json.loads(body)
+            except (OSError, ValueError):
+                panel_err += 1
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+        server.shutdown()
+
+    report = sim.report()
+    # los primeros segundos son el arranque (historia, imports): fuera del ajuste
+    steady = rss[len(rss) // 5:]
+    report["memory"] = {
+        "rss_start_mb": rss[0][1] / 1024 if rss else None,
+        "rss_end_mb": rss[-1][1] / 1024 if rss else None,
+        "rss_max_mb": max(kb for _, kb in rss) / 1024 if rss else None,
+        "growth_mb_per_virtual_day": _slope([d for d, _ in steady], [kb for _, kb in steady]) / 1024,
+    }
+    lat = sorted(panel_lat)
+    report["panel"] = {"n": len(lat), "errors": panel_err,
+                       "p50_ms": percentile(lat, 50) * 1000, "p99_ms": percentile(lat, 99) * 1000}
+    report["fanout"] = status.get("fanout")
+    report["app_exit"] = proc.returncode
+    report["app_log"] = log_path
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def serve(args):
+    sim = build_sim(args)
+    server = make_server(sim, args.host, args.port)
+    print(f"[sim] http://{args.host}:{server.server_address[1]} speed={sim.clock.speed:g}x "
+          f"symbols={args.symbols} (reporte en /sim/report)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(sim.report(), indent=2, ensure_ascii=False))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name in ("serve", "run"):
+        p = sub.add_parser(name)
+        p.add_argument("--speed", type=float, default=SIM_SPEED)
+        p.add_argument("--symbols", type=int, default=1)
+        p.add_argument("--recorded", help="base SQLite con la tabla candles para reproducir")
+    sub.choices["serve"].add_argument("--host", default="127.0.0.1")
+    sub.choices["serve"].add_argument("--port", type=int, default=18080)
+    sub.choices["run"].add_argument("--days", type=float, default=1.0, help="días virtuales")
+    sub.choices["run"].add_argument("--port", type=int, default=10099, help="puerto del panel")
+    sub.choices["run"].add_argument("--keep", action="store_true", help="no borrar el directorio de la corrida")
+    sub.choices["run"].add_argument("--subscriptions", type=int, default=0,
+                                    help="suscripciones de alertas sembradas (apuntan al sink)")
+    args = ap.parse_args()
+    (run if args.cmd == "run" else serve)(args)
+
+
+if __name__ == "__main__":
+    main()
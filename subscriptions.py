@@ -0,0 +1,192 @@
+# subscriptions.py
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+
+from db import init_db, list_subscriptions, subscriptions_version
+
+# =========================================================
+# CONFIG
+# =========================================================
+SUBSCRIPTIONS_TOKEN = os.getenv("SUBSCRIPTIONS_TOKEN", "")  # vacío = API de suscripciones apagada
+FANOUT_WORKERS = int(os.getenv("FANOUT_WORKERS", 8))         # envíos en paralelo
+FANOUT_RELOAD_S = 5.0     # cada cuánto se mira si cambió la tabla (altas/bajas desde otro worker)
+
+CHANNELS = ("telegram", "ifttt")
+KINDS = ("signal", "pattern", "confluence", "prz")
+ANY = "*"
+
+
+def subscriptions_allowed(token: str | None) -> bool | None:
+    """None si la API está apagada; si no, si el token coincide."""
+    if not SUBSCRIPTIONS_TOKEN:
+        return None
+    return hmac.compare_digest((token or "").encode(), SUBSCRIPTIONS_TOKEN.encode())
+
+
+def validate_subscription(data: dict) -> dict:
+    """Normaliza un alta de la API; ValueError con el campo si algo no cuadra."""
+    channel = data.get("channel")
+    if channel not in CHANNELS:
+        raise ValueError(f"channel: {' o '.join(CHANNELS)}")
+    target = str(data.get("target") or "").strip()
+    if not target or (channel == "ifttt" and ":" not in target):
+        raise ValueError("target: chat_id (telegram) o evento:key (ifttt)")
+    out = {"channel": channel, "target": target, "name": data.get("name")}
+    for key in ("symbols", "timeframes", "pattern_types", "kinds"):
+        values = data.get(key)
+        if isinstance(values, str):
+            values = values.split(",")
+        if values is not None and not isinstance(values, list):
+            raise ValueError(f"{key}: lista o CSV")
+        out[key] = values
+    if out["symbols"]:
+        out["symbols"] = [s.strip().upper() for s in out["symbols"]]
+    if out["kinds"] and set(k.strip() for k in out["kinds"]) - set(KINDS):
+        raise ValueError(f"kinds: {', '.join(KINDS)}")
+    try:
+        out["min_score"] = float(data.get("min_score") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("min_score: número") from None
+    return out
+
+
+# =========================================================
+# ÍNDICE DE SUSCRIPCIONES
+# =========================================================
+class SubscriptionIndex:
+    """
+    Suscripciones indexadas por (kind, symbol, timeframe, pattern_type), con
+    "*" para los filtros vacíos. Una suscripción con listas se registra en
+    cada combinación de sus valores. Un evento prueba como mucho 16 claves
+    (su valor o "*" en cada dimensión) y en cada una las suscripciones están
+    ordenadas por min_score, así que el costo es O(suscriptores que matchean),
+    no O(total). Cada suscripción aparece una sola vez por evento.
+    """
+
+    def __init__(self, subs: list):
+        buckets = {}
+        for sub in subs:
+            dims = [sub.get(k) or [ANY] for k in ("kinds", "symbols", "timeframes", "pattern_types")]
+            for key in product(*(dict.fromkeys(d) for d in dims)):
+                buckets.setdefault(key, []).append((sub.get("min_score") or 0.0, sub["id"], sub))
+        self._buckets = {}
+        for key, items in buckets.items():
+            items.sort(key=lambda it: (it[0], it[1]))
+            self._buckets[key] = ([it[0] for it in items], [it[2] for it in items])
+        self.size = len(subs)
+
+    def match(self, event: dict) -> list:
+        """
+        Suscripciones que aceptan el evento (kind, symbol, timeframe,
+        pattern_type, score). Un evento sin score solo llega a las que no
+        piden min_score.
+        """
+        score = event.get("score")
+        score = 0.0 if score is None else score
+        dims = []
+        for k in ("kind", "symbol", "timeframe", "pattern_type"):
+            v = event.get(k)
+            dims.append((v, ANY) if v is not None else (ANY,))
+        out = []
+        for key in product(*dims):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            scores, subs = bucket
+            n = bisect_right(scores, score)
+            if n:
+                out.extend(subs[:n])
+        return out
+
+
+# =========================================================
+# FAN-OUT
+# =========================================================
+class AlertFanout:
+    """
+    Reparte cada alerta a los suscriptores que la aceptan. El índice se
+    rearma cuando cambia la tabla (se mira cada FANOUT_RELOAD_S); los envíos
+    van a un pool de hilos, así el bot/detector no esperan a la red.
+    """
+
+    def __init__(self, workers: int = FANOUT_WORKERS, reload_s: float = FANOUT_RELOAD_S):
+        self.workers = workers
+        self.reload_s = reload_s
+        self._lock = threading.Lock()
+        self._index = SubscriptionIndex([])
+        self._version = None
+        self._next_check = 0.0
+        self._pool = None
+        self.events = 0
+        self.matched = 0
+        self.delivered = 0
+        self.failed = 0
+        self.last_error = None
+
+    def current(self) -> SubscriptionIndex:
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._index
+        with self._lock:
+            if now >= self._next_check:
+                self._next_check = now + self.reload_s
+                try:
+                    self._maybe_reload()
+                except Exception as e:
+                    self.last_error = str(e)
+                    print(f"[fanout] no se pudo recargar suscripciones: {e}")
+        return self._index
+
+    def _maybe_reload(self):
+        if self._version is None:
+            init_db()
+        version = subscriptions_version()
+        if version == self._version:
+            return
+        self._index = SubscriptionIndex(list_subscriptions(enabled_only=True))
+        self._version = version
+
+    def invalidate(self):
+        """Alta/baja en este proceso: recargar en el próximo evento."""
+        self._next_check = 0.0
+
+    def dispatch(self, msg: str, event: dict, deliver) -> int:
+        """Encola deliver(sub, msg, event) por cada suscriptor que matchea; devuelve cuántos."""
+        subs = self.current().match(event)
+        with self._lock:
+            # bot y detector despachan desde hilos distintos
+            self.events += 1
+            if not subs:
+                return 0
+            self.matched += len(subs)
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fanout")
+        for sub in subs:
+            self._pool.submit(self._deliver, deliver, sub, msg, event)
+        return len(subs)
+
+    def _deliver(self, deliver, sub, msg, event):
+        try:
+            deliver(sub, msg, event)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+                self.last_error = f"sub {sub['id']}: {e}"
+            return
+        with self._lock:
+            self.delivered += 1
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"subscriptions": self._index.size, "events": self.events,
+                    "matched": self.matched, "delivered": self.delivered,
+                    "failed": self.failed, "last_error": self.last_error}
+
+
+# fan-out compartido (bot y detector en el líder)
+FANOUT = AlertFanout()
@@ -0,0 +1,204 @@
+# templates.py
+import json
+import os
+import threading
+import time
+
+# =========================================================
+# CONFIG
+# =========================================================
+TEMPLATES_PATH = os.getenv(
+    "HARMONIC_TEMPLATES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "harmonic_templates.json"),
+)
+RELOAD_CHECK_S = 2.0  # cada cuánto se mira el mtime del archivo (stat, sin leerlo)
+
+RATIO_KEYS = ("ab_xa", "bc_ab", "cd_bc", "ad_xa")
+DEFAULT_WEIGHTS = {"ab_xa": 0.28, "bc_ab": 0.24, "cd_bc": 0.28, "ad_xa": 0.20}
+
+
+class TemplateError(ValueError):
+    """Archivo de plantillas inválido (se indica plantilla y campo)."""
+
+
+# =========================================================
+# VALIDACIÓN + COMPILACIÓN
+# =========================================================
+def _pair(tpl_name, key, value):
+    if not (isinstance(value, (list, tuple)) and len(value) == 2
+            and all(isinstance(v, (int, float)) and v > 0 for v in value)):
+        raise TemplateError(f"{tpl_name}.{key}: se espera [min, max] positivos")
+    lo, hi = float(value[0]), float(value[1])
+    if lo > hi:
+        raise TemplateError(f"{tpl_name}.{key}: min > max")
+    return lo, hi
+
+
+class CompiledTemplates:
+    """
+    Plantillas ya validadas y pasadas a tablas planas. Por plantilla y ratio:
+    (min, max, min expandido, max expandido, peso), o None si la plantilla no
+    usa ese ratio. El scoring solo compara contra estos números.
+    """
+
+    __slots__ = ("tolerance", "names", "rows", "templates", "loaded_at", "source")
+
+    def __init__(self, config: dict, source: str = "<dict>"):
+        tol = config.get("tolerance", 0.08)
+        if not isinstance(tol, (int, float)) or not 0 <= tol < 1:
+            raise TemplateError("tolerance: se espera un número en [0, 1)")
+        base_w = dict(DEFAULT_WEIGHTS)
+        base_w.update(config.get("weights") or {})
+
+        names, rows, templates = [], [], []
+        for i, tpl in enumerate(config.get("templates") or []):
+            name = tpl.get("name") if isinstance(tpl, dict) else None
+            if not name or not isinstance(name, str):
+                raise TemplateError(f"templates[{i}]: falta name")
+            if name in names:
+                raise TemplateError(f"{name}: nombre repetido")
+            if not tpl.get("enabled", True):
+                continue
+            if "ad_xa" in tpl and "ad_xa_ext" in tpl:
+                raise TemplateError(f"{name}: usar ad_xa o ad_xa_ext, no ambos")
+
+            weights = dict(base_w)
+            weights.update(tpl.get("weights") or {})
+            if set(weights) - set(RATIO_KEYS) or any(
+                    not isinstance(w, (int, float)) or w < 0 for w in weights.values()):
+                raise TemplateError(f"{name}.weights: claves {RATIO_KEYS} con pesos >= 0")
+
+            bounds = []
+            clean = {"name": name}
+            for key in RATIO_KEYS:
+                src = key if key in tpl else ("ad_xa_ext" if key == "ad_xa" and "ad_xa_ext" in tpl else None)
+                if src is None:
+                    bounds.append(None)
+                    continue
+                lo, hi = _pair(name, src, tpl[src])
+                clean[src] = (lo, hi)
+                bounds.append((lo, hi, lo * (1 - tol), hi * (1 + tol), float(weights[key])))
+            if not any(b is not None and b[4] > 0 for b in bounds):
+                raise TemplateError(f"{name}: ningún ratio con peso > 0")
+
+            names.append(name)
+            rows.append((name, tuple(bounds)))
+            templates.append(clean)
+
+        if not rows:
+            raise TemplateError("no hay plantillas habilitadas")
+        self.tolerance = float(tol)
+        self.names = tuple(names)
+        self.rows = tuple(rows)
+        # formato de siempre (tuplas min/max), para la proyección de PRZ
+        self.templates = tuple(templates)
+        self.loaded_at = time.time()
+        self.source = source
+
+    def best(self, ratios):
+        """
+        ratios = (ab_xa, bc_ab, cd_bc, ad_xa) -> (score %, nombre, subscores)
+        de la mejor plantilla (nombre None si ninguna suma).
+        """
+        best_score, best_name, best_subs = 0.0, None, None
+        for name, bounds in self.rows:
+            score = 0.0
+            subs = []
+            for actual, b in zip(ratios, bounds):
+                if b is None or actual is None:
+                    s = 0.0
+                else:
+                    mn, mx, lo, hi, w = b
+                    if mn <= actual <= mx:
+                        s = 1.0
+                    elif lo <= actual < mn:
+                        s = 1 - (mn - actual) / (mn - lo)
+                    elif mx < actual <= hi:
+                        s = 1 - (actual - mx) / (hi - mx)
+                    else:
+                        s = 0.0
+                    score += s * w
+                subs.append(s)
+            score *= 100.0
+            if score > best_score:
+                best_score, best_name, best_subs = score, name, subs
+        if best_subs is not None:
+            best_subs = dict(zip(RATIO_KEYS, best_subs))
+        return best_score, best_name, best_subs
+
+    def by_name(self, name: str) -> list:
+        return [t for t in self.templates if t["name"] == name]
+
+    def info(self) -> dict:
+        return {"source": self.source, "loaded_at": self.loaded_at,
+                "tolerance": self.tolerance, "templates": list(self.names)}
+
+
+def load_templates(path: str) -> CompiledTemplates:
+    with open(path, encoding="utf-8") as f:
+        try:
+            config = json.load(f)
+        except ValueError as e:
+            raise TemplateError(f"{path}: JSON inválido ({e})") from e
+    return CompiledTemplates(config, source=path)
+
+
+# =========================================================
+# REGISTRO CON RECARGA EN CALIENTE
+# =========================================================
+class TemplateRegistry:
+    """
+    Devuelve las plantillas compiladas vigentes. Si el archivo cambia (mtime),
+    se recompila y se reemplaza la referencia de una vez: los hilos que ya
+    tomaron la versión anterior terminan con ella. Un archivo inválido no
+    reemplaza nada; queda el error en last_error.
+    """
+
+    def __init__(self, path: str = TEMPLATES_PATH, check_s: float = RELOAD_CHECK_S):
+        self.path = path
+        self.check_s = check_s
+        self._lock = threading.Lock()
+        self._compiled = load_templates(path)  # al arrancar, un archivo malo sí es fatal
+        self._mtime = os.stat(path).st_mtime_ns
+        self._next_check = time.monotonic() + check_s
+        self.last_error = None
+        self.reloads = 0
+
+    def current(self) -> CompiledTemplates:
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._compiled
+        with self._lock:
+            if now >= self._next_check:
+                self._next_check = now + self.check_s
+                self._maybe_reload()
+        return self._compiled
+
+    def _maybe_reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            self.last_error = str(e)
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            compiled = load_templates(self.path)
+        except (OSError, TemplateError) as e:
+            self.last_error = str(e)
+            print(f"[templates] recarga rechazada, sigo con las anteriores: {e}")
+            return
+        self._compiled = compiled
+        self.last_error = None
+        self.reloads += 1
+        print(f"[templates] recargadas: {', '.join(compiled.names)}")
+
+    def info(self) -> dict:
+        out = self._compiled.info()
+        out.update({"reloads": self.reloads, "last_error": self.last_error})
+        return out
+
+
+# registro compartido (detector, PRZ)
+TEMPLATES = TemplateRegistry()
@@ -0,0 +1,18 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# los módulos viven en la raíz del repo (sin paquete)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    """Base SQLite vacía en un directorio temporal."""
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "harmonics.db"))
+    db.init_db()
+    return db.DB_PATH
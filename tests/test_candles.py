@@ -0,0 +1,104 @@
+# tests/test_candles.py
+import json
+
+import pytest
+
+import candles
+from candles import Candles, FIELDS, decode_klines, _decode_flat
+
+T0 = 1_700_000_000_000
+
+
+def _rows(n, prices_as=str):
+    rows = []
+    for i in range(n):
+        t = T0 + i * 60_000
+        o, h, l, c = 100 + i, 102 + i, 99 + i, 101 + i
+        rows.append([t, prices_as(o), prices_as(h), prices_as(l), prices_as(c), "12.5",
+                     t + 59_999, "1250.0", 10, "6.0", "600.0", "0"])
+    return rows
+
+
+def _payload(rows):
+    return json.dumps(rows, separators=(",", ":")).encode()
+
+
+def _columns(c: Candles):
+    return {name: c.column(name).tolist() for name in FIELDS}
+
+
+# ---------- contenedor ----------
+def test_slice_is_a_view_over_the_same_arrays():
+    c = Candles.from_klines(_rows(10))
+    view = c[2:5]
+    assert len(view) == 3
+    assert view.open_time.tolist() == c.open_time[2:5].tolist()
+    assert view.row(0) == c.row(2) and view[-1] == c[4]
+    assert view._cols is c._cols                # sin copia
+    assert len(c[8:3]) == 0 and len(c[-3:]) == 3
+    with pytest.raises(ValueError):
+        c[::2]
+    with pytest.raises(IndexError):
+        view.row(3)
+
+
+def test_copy_is_independent_and_extendable():
+    c = Candles.from_klines(_rows(10))
+    head = c[:4].copy()
+    assert _columns(head) == _columns(c[:4])
+    head.append(1, 2.0, 3.0, 1.0, 2.5, 2)
+    assert len(head) == 5 and len(c) == 10
+    assert c.open_time[4] != 1
+
+
+def test_extend_only_at_the_tail():
+    c = Candles.from_klines(_rows(3))
+    more = Candles.from_klines(_rows(5))[3:]
+    c.extend(more)
+    assert len(c) == 5
+    assert c.close.tolist() == [101.0, 102.0, 103.0, 104.0, 105.0]
+    with pytest.raises(ValueError):
+        c[:2].extend(more)                      # la vista no llega al final
+    with pytest.raises(ValueError):
+        c[:2].append(0, 0.0, 0.0, 0.0, 0.0, 0)
+
+
+def test_empty():
+    c = Candles.from_klines([])
+    assert len(c) == 0 and c.nbytes() == 0
+    assert len(Candles()) == 0
+
+
+# ---------- decodificación ----------
+@pytest.mark.parametrize("prices_as", [str, int, float])
+def test_decoders_agree(prices_as, monkeypatch):
+    raw = _payload(_rows(50, prices_as))
+    expected = _columns(Candles.from_klines(json.loads(raw)))
+    assert _columns(_decode_flat(raw)) == expected
+    monkeypatch.setattr(candles, "orjson", None)
+    assert _columns(decode_klines(raw)) == expected
+
+
+def test_orjson_decoder_agrees_with_pure_python():
+    orjson = pytest.importorskip("orjson")
+    raw = _payload(_rows(50))
+    assert _columns(Candles.from_klines(orjson.loads(raw))) == _columns(_decode_flat(raw))
+
+
+@pytest.mark.parametrize("raw", [b"[]", b" [ ] \n"])
+def test_empty_array(raw, monkeypatch):
+    monkeypatch.setattr(candles, "orjson", None)
+    assert len(decode_klines(raw)) == 0
+
+
+@pytest.mark.parametrize("raw", [
+    b'{"code":-1121,"msg":"Invalid symbol."}',   # error de Binance
+    _payload(_rows(3))[:-40],                    # cuerpo cortado
+    b'[[1,"abc","2","3","4","5",6,"7",8,"9","10","11"]]',
+    b'[[1,2,3]]',                                # filas cortas
+    b"",
+])
+def test_malformed_payload_raises_value_error(raw, monkeypatch):
+    monkeypatch.setattr(candles, "orjson", None)
+    with pytest.raises(ValueError, match="klines"):
+        decode_klines(raw)
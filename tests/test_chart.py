@@ -0,0 +1,110 @@
+# tests/test_chart.py
+import threading
+import time
+
+import pytest
+import requests
+
+import chart
+import db
+from candles import Candles
+from chart import ChartError, build_chart
+
+END = 1_700_000_000_000 // 900_000 * 900_000
+
+
+def _fail_fetch(*args, **kwargs):
+    raise AssertionError("no debería llamar a Binance")
+
+
+def test_unknown_symbol_is_404_without_fetching(tmp_db, monkeypatch):
+    monkeypatch.setattr(chart, "fetch_klines", _fail_fetch)
+    with pytest.raises(ChartError) as err:
+        build_chart("NOPEUSDT", "15m", None, END, 100, symbol_ok=lambda s: False)
+    assert err.value.status == 404
+
+
+@pytest.mark.parametrize("exc, status", [
+    (requests.HTTPError("400", response=type("R", (), {"status_code": 400})()), 404),
+    (requests.ConnectionError("sin red"), 503),
+])
+def test_backfill_errors_map_to_http_status(tmp_db, monkeypatch, exc, status):
+    def fetch(*args, **kwargs):
+        raise exc
+
+    monkeypatch.setattr(chart, "fetch_klines", fetch)
+    with pytest.raises(ChartError) as err:
+        build_chart("LTCUSDT", "15m", None, END, 100, symbol_ok=lambda s: True)
+    assert err.value.status == status
+
+
+def _store(symbol, tf, n, start):
+    step = chart.TF_MS[tf]
+    # diente de sierra con picos conocidos: el máximo en la vela 777, el mínimo en la 12345
+    rows = []
+    for i in range(n):
+        c = 100 + (i % 50) / 10
+        if i == 777:
+            c = 500.0
+        if i == 12345:
+            c = 1.0
+        t = start + i * step
+        rows.append([t, str(c), str(c + 1), str(c - 1), str(c), "1", t + step - 1])
+    chart.save_candles(symbol, tf, Candles.from_klines(rows))
+
+
+def test_lttb_range_is_reduced_in_sql(tmp_db, monkeypatch):
+    n = 20_000
+    start = END - (n - 1) * 60_000
+    _store("LTCUSDT", "1m", n, start)
+    monkeypatch.setattr(chart, "load_candles", _fail_fetch)    # nada de traer las 20k velas
+
+    data = build_chart("LTCUSDT", "1m", start, END, 200, mode="lttb")
+    assert data["bars"] == n
+    assert data["points"] <= 200
+    t, c = data["series"]["t"], data["series"]["c"]
+    assert t == sorted(t) and t[0] == start
+    # los extremos sobreviven a la pre-reducción min/max y a LTTB
+    assert 500.0 in c and 1.0 in c
+
+    agg = db.load_close_extremes("LTCUSDT", "1m", start, END, 60_000 * 100)
+    assert agg["bars"] == n
+    assert len(agg["series"]["t"]) <= 2 * 200
+    assert start + 777 * 60_000 in agg["series"]["t"]
+
+
+def test_bars_is_clamped(tmp_db, monkeypatch):
+    seen = []
+
+    def load(symbol, tf, start=None, end=None, limit=None):
+        seen.append(limit)
+        return Candles()
+
+    monkeypatch.setattr(chart, "load_candles", load)
+    monkeypatch.setattr(chart, "_backfill", lambda *a, **kw: None)
+    chart.chart("LTCUSDT", "15m", end=END, bars=10 ** 9)
+    assert seen and all(limit == chart.CHART_MAX_BARS for limit in seen)
+
+
+def test_concurrent_identical_requests_build_once():
+    cache = chart.ChartCache(size=4, ttl_s=30)
+    calls = []
+    gate = threading.Event()
+
+    def build():
+        calls.append(1)
+        gate.wait(2)
+        return {"points": 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", build))) for _ in range(8)]
+    for th in threads:
+        th.start()
+    time.sleep(0.1)
+    gate.set()
+    for th in threads:
+        th.join()
+    assert len(calls) == 1
+    assert len(results) == 8 and all(r is results[0] for r in results)
+    # ya en la LRU: no se vuelve a armar
+    assert cache.get("k", build) is results[0] and len(calls) == 1
@@ -0,0 +1,93 @@
+# tests/test_clock.py
+from datetime import timedelta
+
+import pytest
+
+import clock
+from clock import ServerClock
+
+
+class StubProbe:
+    """Devuelve (offset_ms, rtt_ms) de una lista, como lo haría _probe."""
+
+    def __init__(self, samples):
+        self.samples = list(samples)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        sample = self.samples.pop(0)
+        if isinstance(sample, Exception):
+            raise sample
+        return sample
+
+
+def test_rtt_outlier_is_dropped_before_the_median():
+    # 4 muestras buenas (RTT ~20 ms) y una con RTT 400 ms y offset muy corrido
+    probe = StubProbe([(100.0, 20.0), (104.0, 22.0), (5000.0, 400.0), (98.0, 21.0), (102.0, 24.0)])
+    clk = ServerClock(probe=probe, samples=5, sim=False)
+    assert clk.sync()
+    assert probe.calls == 5
+    # kept = [98, 100, 102, 104] -> mediana superior
+    assert clk.offset_ms == 102.0
+    assert clk.rtt_ms == 20.0
+    assert clk.last_error is None
+
+
+def test_outlier_threshold_includes_slack():
+    # best 2 ms: límite 2*1.5+5 = 8 ms, así que 7.9 se queda y 8.1 no
+    probe = StubProbe([(10.0, 2.0), (30.0, 7.9), (900.0, 8.1)])
+    clk = ServerClock(probe=probe, samples=3, sim=False)
+    clk.sync()
+    assert clk.offset_ms == 30.0
+
+
+def test_failed_probes_keep_previous_offset():
+    probe = StubProbe([(50.0, 10.0)] + [OSError("timeout")] * 3)
+    clk = ServerClock(probe=probe, samples=1, sim=False)
+    assert clk.sync() and clk.offset_ms == 50.0
+    clk.samples = 3
+    assert not clk.sync()
+    assert clk.offset_ms == 50.0 and clk.last_error == "timeout"
+
+
+def test_server_now_applies_offset(monkeypatch):
+    clk = ServerClock(probe=StubProbe([(1500.0, 10.0)]), samples=1, sim=False)
+    clk.sync()
+    monkeypatch.setattr(clock.time, "time", lambda: 1_700_000_000.0)
+    assert clk.server_now_ms() == 1_700_000_001_500
+
+
+def test_resync_loop_sleeps_resync_seconds(monkeypatch):
+    probe = StubProbe([(10.0, 5.0), (20.0, 5.0), (30.0, 5.0)])
+    clk = ServerClock(probe=probe, samples=1, resync_seconds=600, sim=False)
+    sleeps = []
+
+    class Stop(Exception):
+        pass
+
+    def fake_sleep(s):
+        sleeps.append(s)
+        if len(sleeps) == 3:
+            raise Stop
+
+    monkeypatch.setattr(clock.time, "sleep", fake_sleep)
+    with pytest.raises(Stop):
+        clk._run()
+    assert sleeps == [600, 600, 600]
+    assert probe.calls == 2 and clk.offset_ms == 20.0
+
+
+def test_probe_measures_rtt_from_response_elapsed(monkeypatch):
+    class Resp:
+        elapsed = timedelta(milliseconds=40)
+
+        def json(self):
+            return {"serverTime": 1_700_000_000_120}
+
+    monkeypatch.setattr(clock, "governed_get", lambda *a, **kw: Resp())
+    monkeypatch.setattr(clock.time, "time", lambda: 1_700_000_000.1)
+    offset, rtt = clock._probe()
+    assert rtt == pytest.approx(40.0)
+    # mitad del RTT: 1_700_000_000_080 local -> +40 ms
+    assert offset == pytest.approx(40.0)
@@ -0,0 +1,84 @@
+# tests/test_confluence.py
+from candles import TF_MS
+from confluence import ConfluenceEngine, MAX_EVENTS_PER_KEY, PATTERN_WINDOW_BARS, SIGNAL_WINDOW_MS
+
+T0 = 1_700_000_000_000
+H = TF_MS["1h"]
+
+
+def _queue(engine, symbol, kind, tf):
+    return engine._state[symbol][(kind, tf)]
+
+
+def test_per_key_cap_drops_oldest():
+    engine = ConfluenceEngine()
+    for i in range(MAX_EVENTS_PER_KEY + 10):
+        engine.on_signal("BTCUSDT", "1m", "buy", 100.0 + i, T0 + i * 60_000)
+    q = _queue(engine, "BTCUSDT", "signal", "1m")
+    assert len(q) == MAX_EVENTS_PER_KEY == 64
+    assert q[0]["price"] == 110.0                      # las 10 primeras se fueron
+    # otra clave (TF u otro símbolo) tiene su propio tope
+    engine.on_signal("BTCUSDT", "15m", "buy", 1.0, T0)
+    engine.on_signal("ETHUSDT", "1m", "buy", 1.0, T0)
+    assert len(_queue(engine, "BTCUSDT", "signal", "15m")) == 1
+    assert len(_queue(engine, "ETHUSDT", "signal", "1m")) == 1
+
+
+def test_expired_events_are_evicted_and_do_not_match():
+    engine = ConfluenceEngine()
+    engine.on_signal("BTCUSDT", "15m", "buy", 100.0, T0)
+    engine.on_signal("BTCUSDT", "15m", "buy", 101.0, T0 + SIGNAL_WINDOW_MS // 2)
+    late = T0 + SIGNAL_WINDOW_MS + 1
+    # el patrón llega cuando la primera señal ya venció: solo matchea la segunda
+    found = engine.on_pattern("BTCUSDT", "1h", "BULLISH", "Gartley", 80.0, 99.0, 102.0, T0, late)
+    assert [a["type"] for a in found] == ["signal_in_prz"]
+    assert "101.0" in found[0]["text"]
+    assert [e["price"] for e in _queue(engine, "BTCUSDT", "signal", "15m")] == [101.0]
+
+    # el patrón vence a las PATTERN_WINDOW_BARS velas de su TF después de D
+    after = T0 + PATTERN_WINDOW_BARS * H
+    assert engine.on_signal("BTCUSDT", "15m", "buy", 100.0, after) == []
+    assert len(_queue(engine, "BTCUSDT", "pattern", "1h")) == 0
+
+
+def test_no_match_on_wrong_side_price_or_time():
+    engine = ConfluenceEngine()
+    engine.on_pattern("BTCUSDT", "1h", "BULLISH", "Bat", 80.0, 99.0, 102.0, T0, T0)
+    assert engine.on_signal("BTCUSDT", "15m", "sell", 100.0, T0 + H) == []     # lado
+    assert engine.on_signal("BTCUSDT", "15m", "buy", 105.0, T0 + H) == []      # fuera de zona
+    assert engine.on_signal("ETHUSDT", "15m", "buy", 100.0, T0 + H) == []      # otro símbolo
+    # señal anterior a D: no es confluencia aunque el patrón llegue después
+    engine2 = ConfluenceEngine()
+    engine2.on_signal("BTCUSDT", "15m", "buy", 100.0, T0 - 60_000)
+    assert engine2.on_pattern("BTCUSDT", "1h", "BULLISH", "Bat", 80.0, 99.0, 102.0, T0, T0) == []
+
+
+def test_ranking_prefers_score_tf_and_freshness():
+    engine = ConfluenceEngine()
+    now = T0 + H
+    engine.on_pattern("BTCUSDT", "15m", "BULLISH", "Bat", 90.0, 99.0, 102.0, T0, T0)
+    engine.on_pattern("BTCUSDT", "4h", "BULLISH", "Gartley", 75.0, 100.0, 103.0, T0, T0)
+    # el 4h se superpone con el 15m -> multi_tf_prz ya emitido
+    assert [a["type"] for a in engine.alerts()] == ["multi_tf_prz"]
+
+    found = engine.on_signal("BTCUSDT", "15m", "buy", 101.0, now)
+    assert [a["template"] for a in found] == ["Gartley", "Bat"]   # 4h pesa más que score 90 en 15m
+    assert found[0]["rank"] > found[1]["rank"]
+    assert found == sorted(found, key=lambda a: a["rank"], reverse=True)
+
+    # misma plantilla y TF: la señal más cerca de D rankea más alto
+    fresh = ConfluenceEngine()
+    fresh.on_pattern("BTCUSDT", "1h", "BULLISH", "Bat", 80.0, 99.0, 102.0, T0, T0)
+    early = fresh.on_signal("BTCUSDT", "15m", "buy", 100.0, T0 + H)[0]["rank"]
+    late = fresh.on_signal("BTCUSDT", "15m", "buy", 100.0, T0 + 6 * H)[0]["rank"]
+    assert early > late
+
+
+def test_recent_alerts_are_bounded():
+    engine = ConfluenceEngine(max_alerts=3)
+    engine.on_pattern("BTCUSDT", "1h", "BULLISH", "Bat", 80.0, 99.0, 102.0, T0, T0)
+    for i in range(5):
+        engine.on_signal("BTCUSDT", "15m", "buy", 100.0, T0 + (i + 1) * 60_000)
+    alerts = engine.alerts()
+    assert len(alerts) == 3
+    assert [a["time"] for a in alerts] == [T0 + k * 60_000 for k in (3, 4, 5)]
@@ -0,0 +1,119 @@
+# tests/test_db_migrate.py
+import sqlite3
+from datetime import datetime, timezone
+
+import db
+
+# esquema v0 tal cual lo creaba el init_db original (tiempos ISO en TEXT)
+V0_DDL = """
+    CREATE TABLE patterns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT,
+        timeframe TEXT,
+        pattern_type TEXT,
+        direction TEXT,
+        score REAL,
+        x_time TEXT,
+        a_time TEXT,
+        b_time TEXT,
+        c_time TEXT,
+        d_time TEXT,
+        created_at TEXT
+    )
+"""
+
+ISO_TIMES = (
+    "2024-01-01T00:00:00+00:00",
+    "2024-01-01T04:00:00+00:00",
+    "2024-01-01 08:00:00",          # sin 'T' ni zona: también vale para strftime
+    "2024-01-02T12:00:00+00:00",
+    "2024-01-03T00:00:00+00:00",
+)
+
+
+def _ms(iso):
+    dt = datetime.fromisoformat(iso)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def _build_v0(path, n=25):
+    conn = sqlite3.connect(path)
+    conn.execute(V0_DDL)
+    conn.executemany("""
+        INSERT INTO patterns (symbol, timeframe, pattern_type, direction, score,
+                              x_time, a_time, b_time, c_time, d_time, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [("BTCUSDT", "1h", "Gartley", "BULLISH", 80.0 + i, *ISO_TIMES,
+           "2024-01-03T00:00:01+00:00") for i in range(n)])
+    conn.commit()
+    conn.close()
+
+
+def test_migrate_v0_to_v1(tmp_path, monkeypatch):
+    path = str(tmp_path / "harmonics.db")
+    monkeypatch.setattr(db, "DB_PATH", path)
+    _build_v0(path)
+
+    db.init_db()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM patterns").fetchone()[0] == 25
+    assert [r[0] for r in conn.execute("SELECT id FROM patterns ORDER BY id")] == list(range(1, 26))
+
+    row = conn.execute("SELECT x_time, a_time, b_time, c_time, d_time, score, created_at "
+                       "FROM patterns WHERE id = 3").fetchone()
+    assert list(row[:5]) == [_ms(t) for t in ISO_TIMES]
+    assert all(isinstance(v, int) for v in row[:5])
+    assert row[5] == 82.0 and row[6] == "2024-01-03T00:00:01+00:00"
+
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(patterns)")}
+    assert {"x_price", "d_price", "ab_xa", "s_ad_xa"} <= cols
+    types = {r[1]: r[2] for r in conn.execute("PRAGMA table_info(patterns)")}
+    assert types["d_time"] == "INTEGER"
+
+    indexes = {r[1] for r in conn.execute("PRAGMA index_list(patterns)")}
+    assert {"idx_patterns_sym_tf", "idx_patterns_type_dir", "idx_patterns_d_time"} <= indexes
+    # el rango por d_time usa el índice nuevo
+    plan = " ".join(r[3] for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM patterns WHERE d_time >= ?", (0,)))
+    assert "idx_patterns_d_time" in plan
+
+    # la tabla nueva sigue numerando después de los ids migrados
+    conn.execute("INSERT INTO patterns (symbol) VALUES ('ETHUSDT')")
+    assert conn.execute("SELECT MAX(id) FROM patterns").fetchone()[0] == 26
+    conn.rollback()
+    conn.close()
+
+
+def test_migrate_second_run_is_noop(tmp_path, monkeypatch):
+    path = str(tmp_path / "harmonics.db")
+    monkeypatch.setattr(db, "DB_PATH", path)
+    _build_v0(path, n=3)
+    db.init_db()
+
+    before = sqlite3.connect(path).execute("SELECT * FROM patterns ORDER BY id").fetchall()
+
+    statements = []
+
+    def traced():
+        conn = sqlite3.connect(path)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(db, "get_conn", traced)
+    db.init_db()
+
+    assert not [s for s in statements if "patterns_v1" in s or "DROP TABLE" in s]
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT * FROM patterns ORDER BY id").fetchall() == before
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+    conn.close()
+
+
+def test_fresh_db_starts_at_current_version(tmp_db):
+    conn = sqlite3.connect(tmp_db)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+    conn.close()
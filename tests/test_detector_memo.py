@@ -0,0 +1,115 @@
+# tests/test_detector_memo.py
+import random
+
+import pytest
+
+import detector
+from candles import Candles
+from detector import (
+    StageMemo, TEMPLATES, _closed_stages, _with_forming_tail, _evaluate_staged, _evaluate,
+    build_candidates, find_pivots, PIVOT_LEFT, PIVOT_RIGHT, PIVOT_ATR_PERIOD,
+)
+from indicators import significant_pivots
+
+T0 = 1_700_000_000_000
+H = 3_600_000
+
+
+def _walk(n, seed):
+    """Velas de 1h con random walk y mechas; la última es la que se forma."""
+    rng = random.Random(seed)
+    price = 100.0
+    rows = []
+    for i in range(n):
+        o = price
+        c = max(1.0, o + rng.gauss(0, 1.5))
+        hi = max(o, c) + abs(rng.gauss(0, 0.8))
+        lo = min(o, c) - abs(rng.gauss(0, 0.8))
+        rows.append([T0 + i * H, o, hi, lo, c, 1.0, T0 + (i + 1) * H - 1])
+        price = c
+    return rows
+
+
+def _candles(rows):
+    return Candles.from_klines([[str(v) if isinstance(v, float) else v for v in r] for r in rows])
+
+
+def _cold(klines, tpls):
+    """Scan sin memo: pivots de todas las velas, ZigZag completo y todas las cadenas."""
+    pivots = find_pivots(klines, PIVOT_LEFT, PIVOT_RIGHT)
+    if detector.PIVOT_ATR_MULT > 0:
+        pivots = significant_pivots(pivots, klines, atr_mult=detector.PIVOT_ATR_MULT,
+                                    period=PIVOT_ATR_PERIOD)
+    return pivots, _evaluate(build_candidates(pivots), tpls)
+
+
+def _memo(klines, tpls):
+    entry, _ = _closed_stages("BTCUSDT", "1h", klines)
+    pivots = _with_forming_tail(entry, klines)
+    return pivots, _evaluate_staged(entry, pivots, tpls)
+
+
+def _strip(evaluated):
+    return [(d_time, round(score, 9), pname, cand["direction"], [cand[p]["index"] for p in "xabcd"])
+            for d_time, score, pname, cand, _ in evaluated]
+
+
+@pytest.fixture(params=[0.0, 1.5], ids=["sin-zigzag", "zigzag-atr"])
+def memo(request, monkeypatch):
+    monkeypatch.setattr(detector, "PIVOT_ATR_MULT", request.param)
+    monkeypatch.setattr(detector, "MIN_SCORE", 0.0)   # se comparan todas las cadenas, no solo las válidas
+    stages = StageMemo()
+    monkeypatch.setattr(detector, "STAGES", stages)
+    return stages
+
+
+def _assert_same(klines, tpls):
+    cold_pivots, cold_eval = _cold(klines, tpls)
+    memo_pivots, memo_eval = _memo(klines, tpls)
+    assert [(p["index"], p["type"]) for p in memo_pivots] == [(p["index"], p["type"]) for p in cold_pivots]
+    assert _strip(memo_eval) == _strip(cold_eval)
+    return cold_eval
+
+
+@pytest.mark.parametrize("seed", [1, 7, 42])
+def test_memo_matches_cold_scan_when_forming_candle_changes(memo, seed):
+    tpls = TEMPLATES.current()
+    rows = _walk(300, seed)
+    assert _assert_same(_candles(rows), tpls)          # hay cadenas para comparar
+    rng = random.Random(seed)
+    base = rows[-1]
+    for _ in range(12):
+        # la vela en formación sigue moviéndose: mechas nuevas que pueden crear o
+        # anular el pivot de la cola y hacer que el ZigZag reemplace el último swing
+        o = base[1]
+        spike = rng.choice([-1, 1]) * rng.uniform(0, 12)
+        c = max(1.0, o + spike)
+        rows[-1] = [base[0], o, max(o, c) + rng.uniform(0, 2), min(o, c) - rng.uniform(0, 2), c, 1.0, base[6]]
+        _assert_same(_candles(rows), tpls)
+    # todos los disparos del slot salieron del mismo memo
+    assert memo.misses == 1 and memo.hits == 12
+
+
+@pytest.mark.parametrize("seed", [3, 11])
+def test_memo_matches_cold_scan_when_new_candle_closes(memo, seed):
+    tpls = TEMPLATES.current()
+    rows = _walk(400, seed)
+    window = 300
+    for k in range(window, len(rows), 9):
+        # ventana deslizante de KLINES_LIMIT velas: cada cierre es un slot nuevo
+        klines = _candles(rows[k - window:k])
+        _assert_same(klines, tpls)
+        _assert_same(klines, tpls)                     # segundo disparo del slot, desde el memo
+    assert memo.hits == memo.misses
+
+
+def test_memo_scan_matches_after_template_reload(memo, monkeypatch):
+    tpls = TEMPLATES.current()
+    klines = _candles(_walk(300, 5))
+    _assert_same(klines, tpls)
+    # otra versión de plantillas (mismo slot): el scoring memoizado no se reutiliza
+    strict = detector.CompiledTemplates({"tolerance": 0.01, "templates": [
+        {"name": "Solo", "ab_xa": [0.6, 0.65], "bc_ab": [0.4, 0.9], "cd_bc": [1.2, 1.7], "ad_xa": [0.7, 0.8]}
+    ]}, source="strict")
+    _assert_same(klines, strict)
+    assert memo.hits == 1
@@ -0,0 +1,100 @@
+# tests/test_kline_cache.py
+import json
+import threading
+import time
+
+import kline_cache
+from kline_cache import SingleFlight, fetch_klines
+
+T0 = 1_700_000_000_000
+
+
+class FakeResponse:
+    def __init__(self, n=5):
+        rows = [[T0 + i * 60_000, "1", "2", "0.5", "1.5", "3", T0 + (i + 1) * 60_000 - 1,
+                 "0", 1, "0", "0", "0"] for i in range(n)]
+        self.content = json.dumps(rows).encode()
+
+
+def _run_concurrently(n, fn):
+    start = threading.Barrier(n)
+    results = [None] * n
+    errors = [None] * n
+
+    def worker(i):
+        start.wait()
+        try:
+            results[i] = fn()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join(5)
+    return results, errors
+
+
+def test_concurrent_fetches_share_one_request_and_get_own_copies(monkeypatch):
+    calls = []
+
+    def governed_get(url, params=None, **kwargs):
+        calls.append(params)
+        time.sleep(0.1)                  # los demás llegan mientras este está en vuelo
+        return FakeResponse()
+
+    monkeypatch.setattr(kline_cache, "KLINES", SingleFlight(ttl_s=1.0))
+    monkeypatch.setattr(kline_cache, "governed_get", governed_get)
+    # que un cambio de minuto en medio del test no cambie la clave
+    monkeypatch.setattr(kline_cache, "last_closed_open_time", lambda interval, now_ms=None: T0)
+
+    results, errors = _run_concurrently(8, lambda: fetch_klines("BTCUSDT", "1m", 5))
+    assert errors == [None] * 8
+    assert len(calls) == 1
+    assert kline_cache.KLINES.info()["misses"] == 1
+    assert kline_cache.KLINES.info()["coalesced"] == 7
+
+    # cada llamador tiene su propio contenedor: extender uno no toca a los otros
+    assert len({id(r) for r in results}) == 8
+    assert len({id(r._cols["close"]) for r in results}) == 8
+    results[0].extend(results[1][-1:])
+    assert len(results[0]) == 6 and all(len(r) == 5 for r in results[1:])
+
+    # dentro del TTL sale de cache, también como copia
+    again = fetch_klines("BTCUSDT", "1m", 5)
+    assert len(calls) == 1 and len(again) == 5
+    again.extend(results[1][-1:])
+    assert len(fetch_klines("BTCUSDT", "1m", 5)) == 5
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight(ttl_s=10)
+    calls = []
+
+    def boom():
+        calls.append(1)
+        time.sleep(0.1)
+        raise ConnectionError("sin red")
+
+    results, errors = _run_concurrently(5, lambda: flight.do("k", boom))
+    assert len(calls) == 1
+    assert all(isinstance(e, ConnectionError) for e in errors)
+    assert flight.do("k", lambda: "ok") == "ok"        # el error no quedó en cache
+    assert flight.info()["in_flight"] == 0
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight(ttl_s=10)
+    assert flight.do(("BTCUSDT", "1m"), lambda: 1) == 1
+    assert flight.do(("ETHUSDT", "1m"), lambda: 2) == 2
+    assert flight.info()["misses"] == 2
+
+
+def test_expired_entry_is_fetched_again():
+    flight = SingleFlight(ttl_s=0.05)
+    calls = []
+    flight.do("k", lambda: calls.append(1))
+    time.sleep(0.06)
+    flight.do("k", lambda: calls.append(1))
+    assert len(calls) == 2
@@ -0,0 +1,57 @@
+# tests/test_kline_import.py
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+import kline_import
+from kline_import import import_archives, find_archives, IMPORT_INFLIGHT_PER_WORKER
+
+DAY_MS = 86_400_000
+T0 = 1_704_067_200_000  # 2024-01-01
+
+
+def _write_day(root, symbol, day):
+    t0 = T0 + day * DAY_MS
+    lines = ["open_time,open,high,low,close,volume,close_time,quote_volume,count,"
+             "taker_buy_volume,taker_buy_quote_volume,ignore"]
+    for i in range(0, DAY_MS, 3_600_000):
+        t = t0 + i
+        lines.append(f"{t},1.0,2.0,0.5,1.5,10,{t + 3_599_999},15,3,5,7,0")
+    path = root / f"{symbol}-1h-2024-01-{day + 1:02d}.csv"
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_import_keeps_a_bounded_number_of_files_in_flight(tmp_db, tmp_path, monkeypatch):
+    root = tmp_path / "archives"
+    root.mkdir()
+    for symbol in ("AAAUSDT", "BBBUSDT"):
+        for day in range(10):
+            _write_day(root, symbol, day)
+
+    counts = {"submitted": 0, "written": 0, "max_in_flight": 0}
+
+    class CountingPool(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            counts["submitted"] += 1
+            counts["max_in_flight"] = max(counts["max_in_flight"], counts["submitted"] - counts["written"])
+            return super().submit(fn, *args)
+
+    insert = db.insert_candles
+
+    def counting_insert(conn, symbol, tf, candles):
+        counts["written"] += 1
+        return insert(conn, symbol, tf, candles)
+
+    monkeypatch.setattr(kline_import, "ProcessPoolExecutor", CountingPool)
+    monkeypatch.setattr(db, "insert_candles", counting_insert)
+
+    paths = find_archives(str(root))
+    report = import_archives(paths, workers=2, batch_rows=50, log_fn=lambda msg: None)
+
+    assert report["files"] == 20 and report["rows"] == 480 and report["inserted"] == 480
+    assert report["missing"] == 0 and not report["errors"]
+    assert counts["max_in_flight"] <= 2 * IMPORT_INFLIGHT_PER_WORKER
+    assert db.candle_range("AAAUSDT", "1h")[2] == 240
+
+    # reimportar no duplica
+    again = import_archives(paths, workers=2, log_fn=lambda msg: None)
+    assert again["inserted"] == 0
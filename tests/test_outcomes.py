@@ -0,0 +1,94 @@
+# tests/test_outcomes.py
+import pytest
+
+import db
+from candles import Candles, TF_MS
+from outcomes import update_open_outcomes, _advance
+
+TF = "1h"
+STEP = TF_MS[TF]
+D_TIME = 1_700_000_000_000
+LEVELS = {"entry": 100.0, "stop": 95.0, "target1": 103.0, "target2": 106.0}
+
+
+def _candles(bars):
+    """bars: [(high, low), ...] a partir de la vela siguiente a D."""
+    rows = []
+    for i, (hi, lo) in enumerate(bars, start=1):
+        t = D_TIME + i * STEP
+        rows.append([t, "100", str(hi), str(lo), "100", "1", t + STEP - 1])
+    return Candles.from_klines(rows)
+
+
+def _open(tmp_db, pattern_id=1, direction="BULLISH", horizon_bars=10):
+    db.open_outcome(pattern_id, "BTCUSDT", TF, direction, LEVELS,
+                    D_TIME, D_TIME + horizon_bars * STEP)
+
+
+def _outcome(pattern_id=1):
+    conn = db.get_conn()
+    row = conn.execute(f"SELECT {', '.join(db.OUTCOME_COLUMNS)} FROM pattern_outcomes "
+                       "WHERE pattern_id = ?", (pattern_id,)).fetchone()
+    conn.close()
+    return dict(zip(db.OUTCOME_COLUMNS, row))
+
+
+def test_target_hit(tmp_db):
+    _open(tmp_db)
+    candles = _candles([(101, 99), (104, 100), (107, 102)])
+    assert update_open_outcomes("BTCUSDT", TF, candles) == 1
+    o = _outcome()
+    assert o["status"] == "target"
+    assert o["hit_target1"] == 1 and o["hit_target2"] == 1 and o["hit_stop"] == 0
+    assert o["closed_at"] == candles.open_time[2]
+    assert o["max_favorable"] == pytest.approx(7.0)
+    assert o["max_adverse"] == pytest.approx(1.0)
+    # cerrado: ya no se vuelve a tocar
+    assert update_open_outcomes("BTCUSDT", TF, candles) == 0
+
+
+def test_stop_hit_bearish_keeps_target1_flag(tmp_db):
+    # bajista: stop arriba, targets abajo
+    bearish = {"entry": 100.0, "stop": 105.0, "target1": 97.0, "target2": 94.0}
+    db.open_outcome(2, "BTCUSDT", TF, "BEARISH", bearish, D_TIME, D_TIME + 10 * STEP)
+    candles = _candles([(101, 96), (106, 99)])
+    update_open_outcomes("BTCUSDT", TF, candles)
+    o = _outcome(2)
+    assert o["status"] == "stop"
+    assert o["hit_target1"] == 1 and o["hit_stop"] == 1 and o["hit_target2"] == 0
+    assert o["closed_at"] == candles.open_time[1]
+
+
+def test_candle_touching_stop_and_target_counts_as_stop(tmp_db):
+    _open(tmp_db)
+    candles = _candles([(107, 94)])
+    update_open_outcomes("BTCUSDT", TF, candles)
+    o = _outcome()
+    assert o["status"] == "stop"
+    assert o["hit_stop"] == 1 and o["hit_target2"] == 0
+
+
+def test_expires_at_horizon_end(tmp_db):
+    _open(tmp_db, horizon_bars=3)
+    quiet = [(101, 99)] * 3
+    update_open_outcomes("BTCUSDT", TF, _candles(quiet))
+    o = _outcome()
+    assert o["status"] == "open"                 # la vela del horizonte todavía cuenta
+    assert o["last_checked"] == D_TIME + 3 * STEP
+
+    update_open_outcomes("BTCUSDT", TF, _candles(quiet + [(101, 99)]))
+    o = _outcome()
+    assert o["status"] == "expired"
+    assert o["closed_at"] == D_TIME + 3 * STEP
+
+
+def test_incremental_updates_only_see_new_candles(tmp_db):
+    _open(tmp_db)
+    candles = _candles([(102, 99), (102, 99)])
+    assert update_open_outcomes("BTCUSDT", TF, candles) == 1
+    # mismas velas: nada nuevo
+    assert update_open_outcomes("BTCUSDT", TF, candles) == 0
+    # una vela ya vista no puede cerrar el outcome aunque se reprocese
+    o = _outcome()
+    assert not _advance(o, candles, len(candles))
+    assert o["status"] == "open"
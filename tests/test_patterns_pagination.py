@@ -0,0 +1,108 @@
+# tests/test_patterns_pagination.py
+import json
+import sqlite3
+from datetime import datetime, timezone
+
+import db
+
+TF = "1h"
+T0 = 1_700_000_000_000
+LEVELS = {"entry": 100.0, "stop": 95.0, "target1": 103.0, "target2": 106.0}
+
+
+def _insert(path, n, symbols=("BTCUSDT", "ETHUSDT")):
+    """Inserta n patrones de una vez (save_pattern abre una conexión por fila)."""
+    cols = db.PATTERN_COLUMNS[1:]
+    now = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for i in range(n):
+        times = [T0 + (i * 5 + k) * 3_600_000 for k in range(5)]
+        rows.append((symbols[i % len(symbols)], TF, "Gartley", "BULLISH", 80.0,
+                     *times, 1.0, 2.0, 1.5, 1.8, 1.2,
+                     0.618, 0.5, 1.27, 0.786, 90.0, 90.0, 90.0, 90.0, now))
+    conn = sqlite3.connect(path)
+    conn.executemany(f"INSERT INTO patterns ({', '.join(cols)}) "
+                     f"VALUES ({', '.join('?' * len(cols))})", rows)
+    conn.commit()
+    conn.close()
+
+
+def _walk_back(limit, **filters):
+    """Recorre todas las páginas con before_id como lo hace el frontend."""
+    pages = []
+    before = None
+    while True:
+        page = db.list_patterns(limit=limit, before_id=before, **filters)
+        if not page:
+            return pages
+        pages.append(page)
+        before = page[-1]["id"]
+
+
+def test_pages_cover_everything_once(tmp_db):
+    _insert(tmp_db, 103)
+    pages = _walk_back(10)
+    ids = [p["id"] for page in pages for p in page]
+    assert ids == list(range(103, 0, -1))             # sin huecos ni repetidos
+    assert [len(p) for p in pages] == [10] * 10 + [3]
+    for page in pages:
+        assert [p["id"] for p in page] == sorted((p["id"] for p in page), reverse=True)
+
+
+def test_after_id_returns_the_previous_page(tmp_db):
+    _insert(tmp_db, 40)
+    first = db.list_patterns(limit=10)
+    second = db.list_patterns(limit=10, before_id=first[-1]["id"])
+    back = db.list_patterns(limit=10, after_id=second[0]["id"])
+    assert [p["id"] for p in back] == [p["id"] for p in first]
+    # desde la página más nueva no hay anterior
+    assert db.list_patterns(limit=10, after_id=first[0]["id"]) == []
+    # borde: after_id justo debajo de la primera página devuelve la página pegada, no la cima
+    near = db.list_patterns(limit=5, after_id=20)
+    assert [p["id"] for p in near] == [25, 24, 23, 22, 21]
+
+
+def test_filters_and_outcomes_on_pages(tmp_db):
+    _insert(tmp_db, 30)
+    for pid in (2, 4, 30):
+        db.open_outcome(pid, "ETHUSDT", TF, "BULLISH", LEVELS, T0, T0 + 10 * 3_600_000)
+    db.update_outcomes([{"pattern_id": 4, "last_checked": T0, "max_favorable": 6.0,
+                         "max_adverse": 1.0, "hit_target1": 1, "hit_target2": 1,
+                         "hit_stop": 0, "status": "target", "closed_at": T0}])
+
+    pages = _walk_back(4, symbol="ETHUSDT")
+    rows = [p for page in pages for p in page]
+    # el LEFT JOIN no multiplica ni pierde filas: 15 ETH (ids pares), con o sin outcome
+    assert [p["id"] for p in rows] == list(range(30, 0, -2))
+    by_id = {p["id"]: p for p in rows}
+    assert by_id[4]["outcome"]["status"] == "target" and by_id[4]["outcome"]["hit_target2"] is True
+    assert by_id[2]["outcome"]["status"] == "open"
+    assert by_id[6]["outcome"] is None
+
+
+def test_iter_patterns_streams_in_batches(tmp_db):
+    _insert(tmp_db, 25)
+    it = db.iter_patterns(batch_size=4)
+    first = next(it)
+    assert first[0] == 1
+    ids = [first[0]] + [r[0] for r in it]
+    assert ids == list(range(1, 26))
+    assert [r[0] for r in db.iter_patterns(batch_size=4, after_id=22)] == [23, 24, 25]
+
+
+def test_export_route_spans_several_fetchmany_batches(tmp_db):
+    import main
+
+    n = 2500                                          # > 2 lotes de iter_patterns (1000)
+    _insert(tmp_db, n)
+    client = main.app.test_client()
+
+    resp = client.get("/patterns/export")
+    lines = resp.get_data(as_text=True).splitlines()
+    ids = [json.loads(line)["id"] for line in lines]
+    assert ids == list(range(1, n + 1))
+
+    resp = client.get("/patterns/export?format=csv&symbol=BTCUSDT&after_id=2000")
+    rows = resp.get_data(as_text=True).splitlines()
+    assert rows[0].split(",") == list(db.PATTERN_COLUMNS)
+    assert [int(r.split(",")[0]) for r in rows[1:]] == list(range(2001, n + 1, 2))
@@ -0,0 +1,63 @@
+# tests/test_prz.py
+import main
+from candles import Candles
+from prz import PRZProjector
+from zone_index import ZoneBook
+
+T0 = 1_700_000_000_000
+FAR = T0 * 10
+
+
+def _candles(*ranges):
+    rows = [[T0 + i * 60_000, str(lo), str(hi), str(lo), str(hi), "1", T0 + (i + 1) * 60_000 - 1]
+            for i, (lo, hi) in enumerate(ranges)]
+    return Candles.from_klines(rows)
+
+
+def _zone(proj, symbol, tf, lo, hi, name="Gartley"):
+    key = f"{symbol}:{tf}:{T0}:{name}:BULLISH"
+    proj.book.upsert(key, symbol, "prz", lo, hi, tf=tf, expires_at=FAR,
+                     template=name, direction="BULLISH")
+    return key
+
+
+def test_observe_queues_hits_for_any_symbol():
+    proj = PRZProjector(ZoneBook())
+    _zone(proj, "SOLUSDT", "1h", 90, 95)
+    _zone(proj, "SOLUSDT", "15m", 50, 55, name="Bat")
+
+    assert proj.observe("SOLUSDT", _candles((100, 110), (94, 101))) == 1
+    assert proj.observe("SOLUSDT", _candles((94, 101))) == 0     # una sola alerta por zona
+    pending = proj.drain()
+    assert [(z.symbol, z.tf, z.meta["template"], price) for z, price in pending] == \
+        [("SOLUSDT", "1h", "Gartley", 101.0)]
+    assert proj.drain() == []
+    assert [z["template"] for z in proj.zones("SOLUSDT")] == ["Bat"]
+
+
+def test_check_zones_alerts_screener_symbols_and_respects_tf_switch(monkeypatch):
+    proj = PRZProjector(ZoneBook())
+    monkeypatch.setattr(main, "PROJECTOR", proj)
+    sent = []
+    monkeypatch.setattr(main, "send_telegram", lambda msg, event=None: sent.append(event))
+    main.state["alerts_15m_enabled"] = False
+    try:
+        _zone(proj, "SOLUSDT", "1h", 90, 95)
+        _zone(proj, "DOGEUSDT", "15m", 0.10, 0.11)
+        _zone(proj, main.SYMBOL, "15m", 60, 61)
+        proj.observe("SOLUSDT", _candles((94, 99)))
+        proj.observe("DOGEUSDT", _candles((0.105, 0.12)))
+
+        main.check_zones(main.SYMBOL, _candles((60.5, 62)))
+    finally:
+        main.state["alerts_15m_enabled"] = True
+
+    # la del screener (1h, sin switch) sale; las de 15m no, con el switch apagado
+    assert [(e["symbol"], e["timeframe"], e["price"]) for e in sent] == [("SOLUSDT", "1h", 99.0)]
+    assert proj.drain() == []
+
+    # con el switch prendido, una zona 15m tocada avisa
+    _zone(proj, "DOGEUSDT", "15m", 0.20, 0.21)
+    proj.observe("DOGEUSDT", _candles((0.2, 0.3)))
+    main.check_zones(main.SYMBOL, _candles((1, 2)))
+    assert sent[-1]["symbol"] == "DOGEUSDT" and sent[-1]["kind"] == "prz"
@@ -0,0 +1,118 @@
+# tests/test_ratelimit.py
+import threading
+import time
+
+import pytest
+
+import ratelimit
+from ratelimit import (
+    WeightGovernor, RateLimited, governed_get, USED_WEIGHT_HEADER, DEFAULT_BACKOFF_S,
+    PRIORITY_LIVE, PRIORITY_BACKFILL,
+)
+
+
+class FakeClock:
+    def __init__(self, t: float = 1_000_020.0):  # 20 s dentro de una ventana
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+class FakeResponse:
+    def __init__(self, status_code: int = 200, headers: dict | None = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_used_weight_header_resyncs_bucket(clock):
+    gov = WeightGovernor(limit_1m=1000, budget_ratio=1.0, clock=clock)
+    gov.acquire(10)
+    # otro proceso gastó peso con la misma IP: manda el servidor
+    gov.observe("/fapi/v1/klines", 10, FakeResponse(headers={USED_WEIGHT_HEADER: "900"}))
+    assert gov.info()["used_1m"] == 900
+    with pytest.raises(RateLimited):
+        gov.acquire(101, timeout=0)
+    gov.acquire(100, timeout=0)
+    assert gov.info()["used_1m"] == 1000
+    # un header más bajo que lo contado localmente no lo baja
+    gov.observe("/fapi/v1/klines", 1, FakeResponse(headers={USED_WEIGHT_HEADER: "5"}))
+    assert gov.info()["used_1m"] == 1000
+    # ventana nueva: arranca de cero
+    clock.t += 60
+    assert gov.info()["used_1m"] == 0
+
+
+def test_429_blocks_for_retry_after(clock, monkeypatch):
+    gov = WeightGovernor(limit_1m=1000, clock=clock)
+    monkeypatch.setattr(ratelimit.requests, "get",
+                        lambda url, params=None, timeout=None: FakeResponse(429, {"Retry-After": "7"}))
+    with pytest.raises(RateLimited):
+        governed_get("https://fapi.binance.com/fapi/v1/time", governor=gov)
+    info = gov.info()
+    assert info["backoffs"] == 1 and info["blocked_for_s"] == 7.0
+    with pytest.raises(RateLimited):
+        gov.acquire(1, timeout=0)
+    clock.t += 7
+    gov.acquire(1, timeout=0)
+
+
+def test_418_ban_backs_off(clock):
+    gov = WeightGovernor(limit_1m=1000, clock=clock)
+    gov.observe("/fapi/v1/klines", 5, FakeResponse(418, {"Retry-After": "120"}))
+    assert gov.info()["blocked_for_s"] == 120.0
+    # el bloqueo sobrevive al cambio de ventana de peso
+    clock.t += 60
+    with pytest.raises(RateLimited):
+        gov.acquire(1, timeout=0)
+    clock.t += 60
+    gov.acquire(1, timeout=0)
+    # sin Retry-After: backoff por defecto
+    gov.observe("/fapi/v1/klines", 5, FakeResponse(418))
+    assert gov.info()["blocked_for_s"] == DEFAULT_BACKOFF_S
+
+
+def test_live_priority_goes_before_backfill_when_bucket_is_short(clock):
+    gov = WeightGovernor(limit_1m=10, budget_ratio=1.0, clock=clock)
+    gov.acquire(10)  # ventana agotada
+    order = []
+
+    def worker(name, priority):
+        gov.acquire(6, priority)
+        order.append(name)
+
+    backfill = threading.Thread(target=worker, args=("backfill", PRIORITY_BACKFILL))
+    backfill.start()
+    _wait_queued(gov, 1)
+    bot = threading.Thread(target=worker, args=("bot", PRIORITY_LIVE))
+    bot.start()
+    _wait_queued(gov, 2)
+
+    # ventana nueva: alcanza para uno solo; el bot llegó después pero pasa primero
+    clock.t += 60
+    gov.observe("/fapi/v1/time", 0, FakeResponse())
+    bot.join(2)
+    assert order == ["bot"]
+    assert gov.info()["queued"] == 1
+
+    clock.t += 60
+    gov.observe("/fapi/v1/time", 0, FakeResponse())
+    backfill.join(2)
+    assert order == ["bot", "backfill"]
+    assert gov.info()["throttled"] == 2
+
+
+def _wait_queued(gov, n, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while gov.info()["queued"] < n:
+        assert time.monotonic() < deadline, "los hilos no llegaron a la cola"
+        time.sleep(0.005)
@@ -0,0 +1,104 @@
+# tests/test_retention.py
+import db
+import retention
+from db import save_pattern, open_outcome, update_outcomes, list_rollups, stats
+from retention import run_retention_pass, iter_archived
+
+DAY = 86_400_000
+NOW = 1_700_000_000_000 // DAY * DAY + 12 * 3_600_000   # mediodía UTC
+LEVELS = {"entry": 100.0, "stop": 95.0, "target1": 103.0, "target2": 106.0}
+
+
+def _save(symbol, tf, pname, direction, score, d_time):
+    points = {p: {"time": d_time - (4 - i) * 3_600_000, "price": 100.0 + i} for i, p in enumerate("xabcd")}
+    ratios = {"ab_xa": 0.618, "bc_ab": 0.5, "cd_bc": 1.27, "ad_xa": 0.786}
+    return save_pattern(symbol, tf, pname, direction, score, points, ratios=ratios, subscores=ratios)
+
+
+def _seed():
+    """7 patrones viejos (40 y 41 días) y 3 recientes."""
+    old = []
+    for i in range(4):
+        old.append(_save("BTCUSDT", "1h", "Gartley", "BULLISH", 80.0 + i, NOW - 40 * DAY + i * 60_000))
+    old.append(_save("BTCUSDT", "1h", "Bat", "BEARISH", 75.0, NOW - 40 * DAY))
+    old.append(_save("ETHUSDT", "15m", "Gartley", "BULLISH", 90.0, NOW - 41 * DAY))
+    old.append(_save("ETHUSDT", "15m", "Gartley", "BULLISH", 70.0, NOW - 41 * DAY + 1))
+    recent = [_save("BTCUSDT", "1h", "Gartley", "BULLISH", 85.0, NOW - DAY * k) for k in (1, 2, 3)]
+
+    # outcomes: uno llegó a target, otro a stop (los hits van al rollup)
+    for pid in old[:2]:
+        open_outcome(pid, "BTCUSDT", "1h", "BULLISH", LEVELS, NOW - 40 * DAY, NOW)
+    base = {"last_checked": NOW, "max_favorable": 1.0, "max_adverse": 1.0, "closed_at": NOW}
+    update_outcomes([
+        {**base, "pattern_id": old[0], "hit_target1": 1, "hit_target2": 1, "hit_stop": 0, "status": "target"},
+        {**base, "pattern_id": old[1], "hit_target1": 1, "hit_target2": 0, "hit_stop": 1, "status": "stop"},
+    ])
+    return old, recent
+
+
+def test_pass_compacts_archives_and_keeps_stats(tmp_db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(retention, "RETENTION_PAUSE_S", 0)
+    old, recent = _seed()
+    before = {r["id"]: r for r in db.patterns_older_than(NOW - 30 * DAY, 100)}
+    assert stats()["total"] == 10
+
+    report = run_retention_pass(now_ms=NOW, days=30, batch_size=3)
+    assert report["moved"] == 7 and report["batches"] == 3
+    assert report["free_pages"] is not None                 # base nueva: INCREMENTAL
+
+    # en la base quedan solo los recientes (y ningún outcome huérfano)
+    conn = db.get_conn()
+    assert sorted(r[0] for r in conn.execute("SELECT id FROM patterns")) == sorted(recent)
+    assert conn.execute("SELECT COUNT(*) FROM pattern_outcomes").fetchone()[0] == 0
+    conn.close()
+
+    # rollups por día/símbolo/TF/plantilla/dirección
+    rollups = {(r["day"], r["symbol"], r["pattern_type"], r["direction"]): r for r in list_rollups()}
+    day40 = db._day(NOW - 40 * DAY)
+    g = rollups[(day40, "BTCUSDT", "Gartley", "BULLISH")]
+    assert g["count"] == 4 and g["max_score"] == 83.0
+    assert g["avg_score"] == (80.0 + 81.0 + 82.0 + 83.0) / 4
+    assert (g["hit_target1"], g["hit_target2"], g["hit_stop"]) == (2, 1, 1)
+    assert rollups[(db._day(NOW - 41 * DAY), "ETHUSDT", "Gartley", "BULLISH")]["count"] == 2
+    assert sum(r["count"] for r in rollups.values()) == 7
+
+    # ida y vuelta por el archivo: mismas filas, mismos valores
+    archived = {r["id"]: r for r in iter_archived()}
+    assert archived.keys() == before.keys()
+    for pid, row in before.items():
+        assert archived[pid] == row
+    assert [r["id"] for r in iter_archived(symbol="ETHUSDT")] == old[5:]
+    assert {r["id"] for r in iter_archived(direction="bearish")} == {old[4]}
+    assert list(iter_archived(d_from=NOW - 35 * DAY)) == []
+
+    # stats suma lo vivo y lo compactado
+    s = stats()
+    assert (s["total"], s["live"], s["rolled_up"]) == (10, 3, 7)
+    assert dict(s["by_symbol"]) == {"BTCUSDT": 8, "ETHUSDT": 2}
+    assert dict(s["by_timeframe"]) == {"1h": 8, "15m": 2}
+
+    # segunda pasada: nada que mover
+    assert run_retention_pass(now_ms=NOW, days=30, batch_size=3)["moved"] == 0
+
+
+def test_pass_respects_max_batches(tmp_db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(retention, "RETENTION_PAUSE_S", 0)
+    _seed()
+    first = run_retention_pass(now_ms=NOW, days=30, batch_size=2, max_batches=2)
+    assert first["moved"] == 4
+    rest = run_retention_pass(now_ms=NOW, days=30, batch_size=2, max_batches=10)
+    assert rest["moved"] == 3
+    assert len(db.list_archives()) == 4
+
+
+def test_missing_archive_file_is_skipped(tmp_db, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(retention, "RETENTION_PAUSE_S", 0)
+    _seed()
+    run_retention_pass(now_ms=NOW, days=30, batch_size=5)
+    first = db.list_archives()[0]
+    (tmp_path / first["path"]).unlink()
+    assert len(list(iter_archived())) == 7 - first["rows"]
+    assert "archivo no disponible" in capsys.readouterr().out
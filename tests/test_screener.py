@@ -0,0 +1,122 @@
+# tests/test_screener.py
+import threading
+import time
+
+import pytest
+
+import detector
+import screener
+from candles import Candles
+
+T0 = 1_700_000_000_000
+H = 3_600_000
+
+
+def _item(symbol, d_time, score, pname="Gartley"):
+    """Patrón como lo devuelve scan_symbol (un bucket por vela de D)."""
+    prices = {"x": 100.0, "a": 110.0, "b": 104.0, "c": 108.0, "d": 102.0}
+    cand = {p: {"time": d_time - (4 - i) * 5 * H, "price": prices[p]} for i, p in enumerate("xabcd")}
+    cand["direction"] = "BULLISH"
+    return {"symbol": symbol, "tf": "1h", "score": score, "pname": pname, "cand": cand,
+            "detail": {"ratios": {}, "subscores": {}}}
+
+
+def _stub_market(monkeypatch, results):
+    monkeypatch.setattr(screener, "load_universe", lambda force=False: sorted(results))
+    monkeypatch.setattr(screener, "prioritize", lambda symbols, by=None: list(symbols))
+    monkeypatch.setattr(screener, "scan_symbol", lambda symbol, tf, priority=None, deadline=None: list(results[symbol]))
+
+
+def test_second_slot_emits_new_pattern_below_old_top(tmp_db, monkeypatch):
+    # ventana con patrones viejos de score alto en todos los símbolos
+    results = {
+        "AAAUSDT": [_item("AAAUSDT", T0, 95.0), _item("AAAUSDT", T0 + H, 94.0)],
+        "BBBUSDT": [_item("BBBUSDT", T0, 93.0)],
+    }
+    _stub_market(monkeypatch, results)
+    sent = []
+    seen = set()
+
+    first = screener.screen_slot("1h", send_fn=lambda msg, event=None: sent.append(event),
+                                 seen=seen, top_n=2, workers=2)
+    assert first["emitted"] == 2
+    assert [e["score"] for e in sent] == [95.0, 94.0]
+
+    # slot siguiente: los mismos viejos siguen en la ventana y aparece uno nuevo más flojo
+    results["BBBUSDT"].append(_item("BBBUSDT", T0 + 2 * H, 70.0))
+    sent.clear()
+    second = screener.screen_slot("1h", send_fn=lambda msg, event=None: sent.append(event),
+                                  seen=seen, top_n=2, workers=2)
+
+    assert second["patterns"] == 4
+    assert second["new"] == 2          # el 93 que no entró antes + el nuevo
+    assert second["emitted"] == 2
+    assert [(e["symbol"], e["score"]) for e in sent] == [("BBBUSDT", 93.0), ("BBBUSDT", 70.0)]
+
+
+def test_slot_with_nothing_new_emits_nothing(tmp_db, monkeypatch):
+    results = {"AAAUSDT": [_item("AAAUSDT", T0, 90.0)]}
+    _stub_market(monkeypatch, results)
+    seen = set()
+    assert screener.screen_slot("1h", seen=seen, top_n=5, workers=1)["emitted"] == 1
+    again = screener.screen_slot("1h", seen=seen, top_n=5, workers=1)
+    assert again["new"] == 0 and again["emitted"] == 0
+
+
+def test_slot_deadline_cancels_and_joins_running_scans(tmp_db, monkeypatch):
+    symbols = [f"S{i:02d}USDT" for i in range(6)]
+    monkeypatch.setattr(screener, "load_universe", lambda force=False: symbols)
+    monkeypatch.setattr(screener, "prioritize", lambda s, by=None: list(s))
+    active = set()
+    finished = []
+    lock = threading.Lock()
+
+    def slow_scan(symbol, tf, priority=None, deadline=None):
+        # como scan_symbol: pasos cortos con chequeo de deadline entre ellos
+        with lock:
+            active.add(symbol)
+        try:
+            for _ in range(100):
+                detector._left(deadline)
+                time.sleep(0.02)
+            return [_item(symbol, T0, 80.0)]
+        finally:
+            with lock:
+                active.discard(symbol)
+                finished.append(symbol)
+
+    monkeypatch.setattr(screener, "scan_symbol", slow_scan)
+    started = time.monotonic()
+    report = screener.screen_slot("1h", budget_s=0.3, workers=2)
+    elapsed = time.monotonic() - started
+
+    assert report["scanned"] == 0 and report["skipped"] == 6
+    # ningún scan sigue vivo al volver y el slot no se pasó del presupuesto
+    assert not active
+    assert len(finished) == 2
+    assert elapsed < 0.3 + 0.2
+
+
+def test_scan_symbol_stops_between_steps(monkeypatch):
+    rows = [[T0 + i * H, "1", "2", "0.5", "1.5", "1", T0 + (i + 1) * H - 1] for i in range(50)]
+    steps = []
+
+    def fetch(*args, **kwargs):
+        steps.append(("fetch", kwargs.get("wait_s")))
+        time.sleep(0.05)                      # el pedido se come el presupuesto
+        return Candles.from_klines(rows)
+
+    monkeypatch.setattr(detector, "get_klines", fetch)
+    monkeypatch.setattr(detector, "update_open_outcomes",
+                        lambda *a: steps.append(("outcomes", None)))
+
+    with pytest.raises(detector.ScanCancelled):
+        detector.scan_symbol("AAAUSDT", "1h", deadline=time.monotonic() + 0.03)
+    assert [s for s, _ in steps] == ["fetch"]
+    assert 0 < steps[0][1] <= 0.03
+
+    with_past_deadline = []
+    monkeypatch.setattr(detector, "get_klines", lambda *a, **kw: with_past_deadline.append(1))
+    with pytest.raises(detector.ScanCancelled):
+        detector.scan_symbol("AAAUSDT", "1h", deadline=time.monotonic() - 1)
+    assert not with_past_deadline
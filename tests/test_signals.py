@@ -0,0 +1,86 @@
+# tests/test_signals.py
+import threading
+
+from db import list_signals, latest_signals
+from signals import SignalJournal
+
+T0 = 1_700_000_000_000
+M = 60_000
+
+
+def _sig(symbol, tf, side, candle_time, price=100.0, alerted=True):
+    return {"symbol": symbol, "timeframe": tf, "side": side, "price": price, "tsl": price - 1,
+            "candle_time": candle_time, "emitted_at": candle_time + 500, "latency_ms": 500,
+            "alerted": alerted}
+
+
+def test_concurrent_appends_are_group_committed(tmp_db):
+    journal = SignalJournal(window_s=0.05)
+    threads_n, per_thread = 8, 50
+    start = threading.Barrier(threads_n)
+    seqs = []
+    lock = threading.Lock()
+
+    def writer(k):
+        start.wait()
+        for i in range(per_thread):
+            seq = journal.append(_sig(f"S{k}USDT", "1m", "buy" if i % 2 else "sell", T0 + i * M, price=i))
+            with lock:
+                seqs.append(seq)
+
+    threads = [threading.Thread(target=writer, args=(k,)) for k in range(threads_n)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    total = threads_n * per_thread
+    assert sorted(seqs) == list(range(1, total + 1))        # secuencias únicas, sin huecos
+    assert journal.flush(timeout=5)
+    assert journal.written == total
+    # muchas señales por transacción, no un commit por señal
+    assert journal.commits < total / 4
+    assert journal.info()["pending"] == 0
+
+    rows = list_signals(limit=10_000)
+    assert len(rows) == total
+    for k in range(threads_n):
+        mine = list_signals(symbol=f"S{k}USDT", timeframe="1m", limit=1000)
+        assert [r["price"] for r in mine] == [float(i) for i in reversed(range(per_thread))]
+
+
+def test_wait_returns_once_durable(tmp_db):
+    journal = SignalJournal(window_s=0)
+    seq = journal.append(_sig("BTCUSDT", "1m", "buy", T0))
+    assert journal.wait(seq, timeout=5)
+    assert [r["side"] for r in list_signals(symbol="BTCUSDT")] == ["buy"]
+
+
+def test_replayed_signal_is_deduplicated(tmp_db):
+    journal = SignalJournal(window_s=0)
+    journal.append(_sig("BTCUSDT", "15m", "buy", T0, price=100.0))
+    journal.append(_sig("BTCUSDT", "15m", "buy", T0, price=999.0))      # replay tras reinicio
+    journal.append(_sig("BTCUSDT", "15m", "sell", T0, price=101.0))     # otro lado: es otra señal
+    journal.append(_sig("BTCUSDT", "1m", "buy", T0, price=102.0))       # otro TF
+    assert journal.flush(timeout=5)
+
+    assert journal.written == 3
+    rows = list_signals(symbol="BTCUSDT", timeframe="15m")
+    assert sorted((r["side"], r["price"]) for r in rows) == [("buy", 100.0), ("sell", 101.0)]
+
+
+def test_latest_keeps_newest_candle_per_symbol_and_tf(tmp_db):
+    journal = SignalJournal(window_s=0)
+    journal.append(_sig("BTCUSDT", "1m", "buy", T0 + 2 * M, price=1.0))
+    journal.append(_sig("BTCUSDT", "1m", "sell", T0 + 5 * M, price=2.0, alerted=False))
+    journal.append(_sig("BTCUSDT", "1m", "buy", T0 + 3 * M, price=3.0))  # llega tarde: no pisa
+    journal.append(_sig("ETHUSDT", "1m", "buy", T0, price=4.0))
+    assert journal.flush(timeout=5)
+
+    latest = {(r["symbol"], r["timeframe"]): r for r in latest_signals()}
+    assert len(latest) == 2
+    btc = latest[("BTCUSDT", "1m")]
+    assert (btc["side"], btc["price"], btc["candle_time"], btc["alerted"]) == ("sell", 2.0, T0 + 5 * M, 0)
+    by_id = {r["id"]: r for r in list_signals(symbol="BTCUSDT")}
+    assert by_id[btc["signal_id"]]["price"] == 2.0
+    assert latest_signals(symbol="ETHUSDT")[0]["price"] == 4.0
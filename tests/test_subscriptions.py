@@ -0,0 +1,164 @@
+# tests/test_subscriptions.py
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import db
+import main
+from subscriptions import AlertFanout, KINDS
+
+SYMBOLS = ["LTCUSDT", "BTCUSDT", "ETHUSDT", "SOLUSDT"] + [f"X{i:03d}USDT" for i in range(40)]
+TFS = ["1m", "15m", "1h", "4h"]
+PTYPES = ["Gartley", "Bat", "Butterfly", "Crab", "Cypher"]
+N_SUBS = 3000
+
+
+class Sink(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SinkHandler)
+        self.lock = threading.Lock()
+        self.received = []  # (mensaje, destino)
+
+
+class SinkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/sendMessage"):
+            got = (payload["text"], f"tg:{payload['chat_id']}")
+        else:  # /trigger/<evento>/with/key/<key>
+            got = (payload["value1"], f"ifttt:{self.path.split('/')[2]}")
+        with self.server.lock:
+            self.server.received.append(got)
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    server = Sink()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(main, "TELEGRAM_API_BASE", base)
+    monkeypatch.setattr(main, "TELEGRAM_TOKEN", "sink")
+    monkeypatch.setattr(main, "IFTTT_BASE", base)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _seed(rnd, n):
+    def pick(pool, k):
+        return rnd.sample(pool, k) if rnd.random() < 0.6 else None
+
+    subs = []
+    for i in range(n):
+        channel = "telegram" if i % 4 else "ifttt"
+        subs.append({
+            "name": f"s{i}", "channel": channel,
+            "target": f"chat{i}" if channel == "telegram" else f"evt{i}:key",
+            "symbols": pick(SYMBOLS, 2), "timeframes": pick(TFS, 2),
+            "pattern_types": pick(PTYPES, 2), "kinds": pick(list(KINDS), 2),
+            "min_score": rnd.choice([0, 0, 50, 70, 85]),
+            "enabled": rnd.random() > 0.05,
+        })
+    db.add_subscriptions(subs)
+
+
+def _dest(sub):
+    if sub["channel"] == "telegram":
+        return f"tg:{sub['target']}"
+    return f"ifttt:{sub['target'].split(':', 1)[0]}"
+
+
+def _brute_force(subs, event):
+    score = event.get("score") or 0.0
+    out = set()
+    for sub in subs:
+        if not sub["enabled"] or score < sub["min_score"]:
+            continue
+        for field, key in (("kinds", "kind"), ("symbols", "symbol"),
+                           ("timeframes", "timeframe"), ("pattern_types", "pattern_type")):
+            if sub[field] and event.get(key) not in sub[field]:
+                break
+        else:
+            out.add(_dest(sub))
+    return out
+
+
+def _events(rnd, n):
+    out = []
+    for i in range(n):
+        kind = rnd.choice(KINDS)
+        ev = {"kind": kind, "symbol": rnd.choice(SYMBOLS[:6]), "timeframe": rnd.choice(TFS)}
+        if kind != "signal":
+            ev["pattern_type"] = rnd.choice(PTYPES)
+            ev["score"] = rnd.uniform(40, 100)
+        out.append((f"alerta {i}", ev))
+    return out
+
+
+def test_fanout_delivers_exactly_the_matching_subscribers(tmp_db, sink):
+    rnd = random.Random(50)
+    _seed(rnd, N_SUBS)
+    subs = db.list_subscriptions()
+    events = _events(rnd, 12)
+
+    fanout = AlertFanout(workers=16)
+    expected = set()
+    for msg, ev in events:
+        n = fanout.dispatch(msg, ev, main.deliver_to_subscriber)
+        want = _brute_force(subs, ev)
+        assert n == len(want)
+        expected |= {(msg, dest) for dest in want}
+    assert len(expected) > 500  # el sembrado tiene que ejercitar el fan-out de verdad
+
+    deadline = time.monotonic() + 60
+    while True:
+        info = fanout.info()
+        if info["delivered"] + info["failed"] >= info["matched"]:
+            break
+        assert time.monotonic() < deadline, info
+        time.sleep(0.05)
+
+    assert info["failed"] == 0, info["last_error"]
+    assert info["subscriptions"] == sum(1 for s in subs if s["enabled"])
+    assert info["events"] == len(events) and info["delivered"] == len(expected)
+    with sink.lock:
+        received = list(sink.received)
+    assert len(received) == len(expected)  # nadie recibe la misma alerta dos veces
+    assert set(received) == expected
+
+
+def test_fanout_counts_failed_deliveries(tmp_db):
+    db.add_subscription("telegram", "chat1")
+    db.add_subscription("telegram", "chat2", symbols=["LTCUSDT"])
+    fanout = AlertFanout(workers=4)
+
+    def deliver(sub, msg, event):
+        if sub["target"] == "chat2":
+            raise RuntimeError("HTTP 500")
+
+    assert fanout.dispatch("x", {"kind": "signal", "symbol": "LTCUSDT", "timeframe": "1m"}, deliver) == 2
+    deadline = time.monotonic() + 5
+    while fanout.info()["delivered"] + fanout.info()["failed"] < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    info = fanout.info()
+    assert (info["delivered"], info["failed"]) == (1, 1)
+    assert "HTTP 500" in info["last_error"]
@@ -0,0 +1,100 @@
+# tests/test_templates.py
+import json
+import os
+
+import pytest
+
+import templates
+from templates import TemplateRegistry, TemplateError, RELOAD_CHECK_S
+
+
+def _config(*names, tolerance=0.08):
+    return {"tolerance": tolerance, "templates": [
+        {"name": n, "ab_xa": [0.58, 0.66], "bc_ab": [0.38, 0.89], "cd_bc": [1.27, 1.62], "ad_xa": [0.75, 0.82]}
+        for n in names
+    ]}
+
+
+class Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+def _write(path, content, mtime):
+    path.write_text(content if isinstance(content, str) else json.dumps(content), encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))   # mtime explícito: no depende de la resolución del FS
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(templates.time, "monotonic", c)
+    return c
+
+
+def test_rewrite_is_picked_up_after_check_interval(tmp_path, clock):
+    path = tmp_path / "tpl.json"
+    _write(path, _config("Gartley"), 1_000_000_000)
+    reg = TemplateRegistry(str(path), check_s=RELOAD_CHECK_S)
+    first = reg.current()
+    assert first.names == ("Gartley",)
+
+    _write(path, _config("Gartley", "Bat", tolerance=0.05), 2_000_000_000)
+    clock.t += RELOAD_CHECK_S - 0.1
+    assert reg.current() is first          # todavía no toca mirar el mtime
+
+    clock.t += 0.2
+    second = reg.current()
+    assert second is not first
+    assert second.names == ("Gartley", "Bat") and second.tolerance == 0.05
+    assert reg.reloads == 1 and reg.last_error is None
+    # quien tomó la versión anterior sigue con ella intacta
+    assert first.names == ("Gartley",)
+
+    # sin cambios de mtime no se relee
+    clock.t += RELOAD_CHECK_S
+    assert reg.current() is second and reg.reloads == 1
+
+
+@pytest.mark.parametrize("bad", [
+    '{"templates": [ {"name": "Gartley", ',                         # JSON cortado
+    {"templates": [{"name": "Bat", "ab_xa": [0.5]}]},               # par inválido
+    {"templates": []},                                              # sin plantillas
+])
+def test_malformed_rewrite_keeps_last_good(tmp_path, clock, bad):
+    path = tmp_path / "tpl.json"
+    _write(path, _config("Gartley"), 1_000_000_000)
+    reg = TemplateRegistry(str(path), check_s=2.0)
+    good = reg.current()
+
+    _write(path, bad, 2_000_000_000)
+    clock.t += 2.0
+    assert reg.current() is good
+    assert reg.last_error and reg.reloads == 0
+    assert reg.info()["last_error"] == reg.last_error
+
+    # se arregla el archivo: se recarga y se limpia el error
+    _write(path, _config("Bat"), 3_000_000_000)
+    clock.t += 2.0
+    assert reg.current().names == ("Bat",)
+    assert reg.last_error is None and reg.reloads == 1
+
+
+def test_missing_file_keeps_last_good(tmp_path, clock):
+    path = tmp_path / "tpl.json"
+    _write(path, _config("Gartley"), 1_000_000_000)
+    reg = TemplateRegistry(str(path), check_s=2.0)
+    good = reg.current()
+    path.unlink()
+    clock.t += 2.0
+    assert reg.current() is good and reg.last_error
+
+
+def test_bad_file_at_startup_is_fatal(tmp_path):
+    path = tmp_path / "tpl.json"
+    path.write_text("{", encoding="utf-8")
+    with pytest.raises(TemplateError):
+        TemplateRegistry(str(path))
@@ -0,0 +1,105 @@
+# tests/test_warmstart.py
+import gzip
+
+import pytest
+
+import main
+from candles import Candles, TF_MS
+from signals import SignalJournal
+from warmstart import WarmState, candles_to_json
+
+
+def _candles(n, tf="1m", t0=1_700_000_000_000):
+    step = TF_MS[tf]
+    rows = [[t0 + i * step, "1", "2", "0.5", str(1 + i / 100), "0", t0 + (i + 1) * step - 1] for i in range(n)]
+    return Candles.from_klines(rows)
+
+
+def test_saved_snapshot_round_trips(tmp_path):
+    warm = WarmState(str(tmp_path / "warm.json.gz"))
+    warm.put("bot", {"x": 1})
+    assert warm.save()
+    assert WarmState(warm.path).section("bot") == {"x": 1}
+
+
+@pytest.mark.parametrize("raw", [
+    b"",                                              # vacío
+    b"no es gzip",
+    gzip.compress(b'{"version": 1, "saved_at": 1e12, "sec')[:-6],  # truncado
+    gzip.compress(b"[1, 2, 3]"),                      # JSON pero no un dict
+    gzip.compress(b'{"version": 1, "saved_at": 1e12, "sections": {"bot": [1]}}'),
+])
+def test_unreadable_snapshot_means_cold_start(tmp_path, raw):
+    path = tmp_path / "warm.json.gz"
+    path.write_bytes(raw)
+    warm = WarmState(str(path), max_age_s=1e13)
+    assert warm.section("bot") is None
+
+
+@pytest.mark.parametrize("snap", [
+    {"candles": candles_to_json(_candles(0))},                      # sin velas
+    {"candles": {"open_time": [1]}},                                # columnas faltantes
+    {"candles": candles_to_json(_candles(3))},                      # sin avn_last/prev_*
+    {"candles": candles_to_json(_candles(3)), "avn_last": 0, "prev_close": 1.0},
+])
+def test_bad_warm_section_falls_back_to_cold_start(tmp_db, monkeypatch, snap):
+    cold = _candles(10)
+    fetched = []
+
+    def get_klines(symbol, tf, limit=500):
+        fetched.append(limit)
+        return cold.copy()
+
+    monkeypatch.setattr(main, "get_klines", get_klines)
+    monkeypatch.setattr(main.CLOCK, "server_now_ms", lambda: cold.close_time[-1] + 1)
+    candles, last_ct, avn_last, prev_close, prev_tsl = main.start_timeframe("1m", 500, snap)
+
+    assert fetched[-1] == 500                    # terminó en el arranque en frío
+    assert len(candles) == 10 and last_ct == cold.close_time[-1]
+    assert (avn_last, prev_close, prev_tsl) == (0, cold.close[-1], None)
+
+
+class _StubIndicators:
+    """Niveles fijos (res 10, sup 5): con avn_last=1 el TSL queda en 5."""
+
+    class _V:
+        value = 0.0
+
+    atr = vol = _V()
+
+    def feed(self, candles):
+        return (None, None), (10.0, 5.0)
+
+
+def test_replay_alerts_every_missed_signal(tmp_db, monkeypatch):
+    step = TF_MS["1m"]
+    snap_candles = _candles(5)
+    t0 = snap_candles.open_time[-1] + step
+    # cruces del TSL en cada vela perdida: BUY, SELL, BUY, SELL y la última (actual) BUY
+    closes = [6.0, 4.0, 6.0, 4.0, 6.0]
+    latest = Candles.from_klines([[t0 + i * step, "5", "7", "3", str(c), "0", t0 + (i + 1) * step - 1]
+                                  for i, c in enumerate(closes)])
+
+    monkeypatch.setattr(main, "get_klines", lambda symbol, tf, limit=500: latest.copy())
+    monkeypatch.setattr(main.CLOCK, "server_now_ms", lambda: latest.close_time[-2] + 1)
+    monkeypatch.setitem(main._tf_indicators, "1m", _StubIndicators())
+    # diario propio: el escritor del global quedó atado a la base de otro test
+    monkeypatch.setattr(main, "SIGNALS", SignalJournal(window_s=0))
+    sent, ifttt = [], []
+    monkeypatch.setattr(main, "send_telegram", lambda msg, event=None: sent.append((msg, event)))
+    monkeypatch.setattr(main, "send_ifttt", lambda title, price: ifttt.append(title))
+    main.state["alerts_1m_enabled"] = True
+
+    snap = {"candles": candles_to_json(snap_candles), "avn_last": 1, "prev_close": 4.0, "prev_tsl": 5.0}
+    restored = main._warm_timeframe("1m", 500, snap)
+    main.SIGNALS.flush()
+
+    assert restored is not None and len(restored[0]) == 10
+    signals = [(e["side"], e["price"], e["late"]) for _, e in sent if e and e["kind"] == "signal"]
+    assert signals == [("buy", 6.0, True), ("sell", 4.0, True), ("buy", 6.0, True),
+                       ("sell", 4.0, True), ("buy", 6.0, False)]
+    assert all("tarde" in msg for msg, e in sent if e and e.get("late"))
+    # IFTTT solo para la señal actual; el diario tiene las cinco como avisadas
+    assert ifttt == ["Buy 1m"]
+    journal = main.list_signals(symbol=main.SYMBOL, timeframe="1m")
+    assert len(journal) == 5 and all(s["alerted"] for s in journal)
@@ -0,0 +1,152 @@
+# warmstart.py
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from array import array
+
+from candles import Candles, COLUMNS
+
+# =========================================================
+# CONFIG
+# =========================================================
+WARM_STATE_PATH = os.path.join(os.getenv("RUNTIME_DIR", "."), "warm_state.json.gz")
+WARM_INTERVAL_S = 30             # respaldo periódico (además de los flush por evento)
+WARM_MAX_AGE_S = 6 * 3600        # snapshot más viejo que esto no se restaura
+WARM_SEEN_MAX = 5000             # claves de dedupe del detector que se guardan
+WARM_VERSION = 1
+
+
+def candles_to_json(candles: Candles) -> dict:
+    return {name: candles.column(name).tolist() for name, _, _ in COLUMNS}
+
+
+def candles_from_json(data: dict) -> Candles:
+    return Candles({name: array(tc, data[name]) for name, _, tc in COLUMNS})
+
+
+# =========================================================
+# SNAPSHOT DE ARRANQUE EN CALIENTE
+# =========================================================
+class WarmState:
+    """
+    Secciones de estado (bot, detector, panel) que cada dueño publica con
+    put(); save() las vuelca juntas a un .json.gz con rename atómico. Al
+    arrancar, load() devuelve la última versión si no es demasiado vieja.
+
+    Los valores se guardan por referencia y se serializan recién en save(),
+    desde otro hilo: hay que pasar datos planos (listas, dicts), no objetos
+    que el dueño siga modificando (p. ej. Candles: usar candles_to_json).
+    """
+
+    def __init__(self, path: str = WARM_STATE_PATH, max_age_s: float = WARM_MAX_AGE_S):
+        self.path = path
+        self.max_age_s = max_age_s
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._sections = {}
+        self._providers = {}
+        self._loaded = None
+        self.last_save = None
+        self.last_error = None
+        self._thread = None
+
+    # ---------- escritura ----------
+    def put(self, name: str, data: dict, flush: bool = False):
+        with self._lock:
+            self._sections[name] = data
+        if flush:
+            self.save()
+
+    def provide(self, name: str, fn):
+        """Sección que se arma en cada save() (p. ej. lo que vive en el StateStore)."""
+        with self._lock:
+            self._providers[name] = fn
+
+    def _collect(self) -> dict:
+        with self._lock:
+            sections = dict(self._sections)
+            providers = dict(self._providers)
+        for name, fn in providers.items():
+            sections[name] = fn()
+        return sections
+
+    def save(self) -> bool:
+        # un solo escritor a la vez: el tmp es por proceso
+        with self._save_lock:
+            try:
+                payload = {"version": WARM_VERSION, "saved_at": time.time(),
+                           "sections": self._collect()}
+                raw = json.dumps(payload, separators=(",", ":"), default=_encode).encode()
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(gzip.compress(raw, compresslevel=5))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                self.last_save = payload["saved_at"]
+                self.last_error = None
+                return True
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[warmstart] error guardando snapshot: {e}")
+                return False
+
+    # ---------- lectura ----------
+    def load(self) -> dict:
+        """Secciones del último snapshot válido ({} si no hay o es viejo). Se lee una vez."""
+        with self._lock:
+            if self._loaded is not None:
+                return self._loaded
+            self._loaded = {}
+            try:
+                with open(self.path, "rb") as f:
+                    payload = json.loads(gzip.decompress(f.read()))
+            except FileNotFoundError:
+                return self._loaded
+            except (OSError, ValueError, EOFError, zlib.error) as e:
+                # truncado (EOFError), gzip roto (zlib.error) o JSON inválido
+                print(f"[warmstart] snapshot ilegible, arranque en frío: {e}")
+                return self._loaded
+            if not isinstance(payload, dict) or not isinstance(payload.get("sections"), dict):
+                print("[warmstart] snapshot con formato inesperado, arranque en frío")
+                return self._loaded
+            age = time.time() - payload.get("saved_at", 0)
+            if payload.get("version") != WARM_VERSION or age > self.max_age_s:
+                print(f"[warmstart] snapshot descartado (edad {age:.0f}s)")
+                return self._loaded
+            self._loaded = payload.get("sections", {})
+            return self._loaded
+
+    def section(self, name: str) -> dict | None:
+        sec = self.load().get(name)
+        return sec if isinstance(sec, dict) else None
+
+    # ---------- respaldo periódico ----------
+    def _run(self, interval_s):
+        while True:
+            time.sleep(interval_s)
+            self.save()
+
+    def ensure_started(self, interval_s: float = WARM_INTERVAL_S):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(interval_s,),
+                                            name="warm-snapshot", daemon=True)
+            self._thread.start()
+
+    def info(self) -> dict:
+        return {"path": self.path, "last_save": self.last_save, "last_error": self.last_error}
+
+
+def _encode(obj):
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"no serializable: {type(obj).__name__}")
+
+
+# snapshot compartido por bot, detector y panel
+WARM = WarmState()
@@ -0,0 +1,200 @@
+let alerts1m = true;
+let alerts15m = true;
+let nextPollIso = null;
+const TZ_OFFSET_MIN = -4 * 60; // ya lo tenías así
+
+function formatToTZ(iso) {
+  if (!iso) return "-";
+  const d = new Date(iso);
+  d.setMinutes(d.getMinutes() + TZ_OFFSET_MIN);
+  const base = d.toISOString().replace("T", " ").substring(0, 19);
+  const offHr = TZ_OFFSET_MIN / 60;
+  return base + " (UTC" + (offHr >= 0 ? "+" + offHr : offHr) + ")";
+}
+
+async function loadStatus() {
+  try {
+    const resp = await fetch('/status');
+    const data = await resp.json();
+
+    document.getElementById('status').innerText = data.last_error ? 'ERROR' : 'OK';
+    document.getElementById('started_at').innerText = formatToTZ(data.bot_started_at);
+    document.getElementById('last_price').innerText = data.last_price !== null ? data.last_price : '-';
+    document.getElementById('last_price_time').innerText = formatToTZ(data.last_price_time);
+
+    document.getElementById('last_signal_type').innerText = data.last_signal_type || '-';
+    document.getElementById('last_signal_price').innerText = data.last_signal_price !== null ? data.last_signal_price : '-';
+    document.getElementById('last_signal_time').innerText = formatToTZ(data.last_signal_time);
+
+    document.getElementById('last_signal_1m_type').innerText = data.last_signal_1m_type || '-';
+    document.getElementById('last_signal_1m_price').innerText = data.last_signal_1m_price !== null ? data.last_signal_1m_price : '-';
+    document.getElementById('last_signal_1m_time').innerText = formatToTZ(data.last_signal_1m_time);
+
+    document.getElementById('last_signal_15m_type').innerText = data.last_signal_15m_type || '-';
+    document.getElementById('last_signal_15m_price').innerText = data.last_signal_15m_price !== null ? data.last_signal_15m_price : '-';
+    document.getElementById('last_signal_15m_time').innerText = formatToTZ(data.last_signal_15m_time);
+
+    document.getElementById('next_poll_at').innerText = formatToTZ(data.next_poll_at);
+    document.getElementById('last_error').innerText = data.last_error || '-';
+
+    alerts1m = data.alerts_1m_enabled;
+    alerts15m = data.alerts_15m_enabled;
+    paintButtons();
+
+    nextPollIso = data.next_poll_at;
+  } catch (e) {
+    document.getElementById('status').innerText = 'ERROR';
+  }
+}
+
+function paintButtons() {
+  const b1 = document.getElementById('btn_1m');
+  const b15 = document.getElementById('btn_15m');
+  if (alerts1m) {
+    b1.textContent = 'Alarmas 1m: ON';
+    b1.className = 'on';
+  } else {
+    b1.textContent = 'Alarmas 1m: OFF';
+    b1.className = 'off';
+  }
+  if (alerts15m) {
+    b15.textContent = 'Alarmas 15m: ON';
+    b15.className = 'on';
+  } else {
+    b15.textContent = 'Alarmas 15m: OFF';
+    b15.className = 'off';
+  }
+}
+
+async function toggleAlert(tf) {
+  await fetch('/toggle', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ timeframe: tf })
+  });
+  loadStatus();
+}
+
+function tickCountdown() {
+  if (!nextPollIso) return;
+  const target = new Date(nextPollIso).getTime();
+  const now = Date.now();
+  const diff = Math.floor((target - now) / 1000);
+  document.getElementById('countdown').innerText = diff >= 0 ? diff + ' s' : 'actualizando…';
+}
+
+loadStatus();
+setInterval(loadStatus, 10000);
+setInterval(tickCountdown, 1000);
+
+async function loadConsole() {
+  try {
+    const resp = await fetch('/console?limit=120');
+    const js = await resp.json();
+    if (js.ok) {
+      const lines = js.data || [];
+      document.getElementById('console_box').textContent = lines.join('\n');
+    }
+  } catch (e) {
+    // opcional
+  }
+}
+
+async function clearConsole() {
+  try {
+    await fetch('/console/clear', { method: 'POST' });
+    loadConsole();
+  } catch (e) {}
+}
+
+// refresca la consola cada 5 segundos
+loadConsole();
+setInterval(loadConsole, 5000);
+
+// ===== Util: safe get array =====
+function asArr(x) { return Array.isArray(x) ? x : (x ? [x] : []); }
+
+// ===== Cargar Últimos patrones =====
+async function loadPatterns() {
+  try {
+    const tf = (document.getElementById('pat_tf')?.value || '').trim();
+    const sym = (document.getElementById('pat_symbol')?.value || '').trim();
+    const qs = new URLSearchParams({ limit: '20' });
+    if (tf) qs.set('timeframe', tf);
+    if (sym) qs.set('symbol', sym);
+
+    const resp = await fetch('/patterns?' + qs.toString());
+    const js = await resp.json();
+    const rows = (js && js.ok) ? (js.data || []) : [];
+
+    const tbody = document.querySelector('#pat_table tbody');
+    if (!tbody) return;
+
+    if (!rows.length) {
+      tbody.innerHTML = `<tr><td colspan="6" style="padding:.6rem; opacity:.8;">Sin datos</td></tr>`;
+      return;
+    }
+
+    tbody.innerHTML = rows.map(r => {
+      const dt = r.d_time || r.created_at;      // preferimos D si existe, sino created
+      const when = typeof formatToTZ === 'function' ? formatToTZ(dt) : (dt || '-');
+      const score = (r.score != null) ? Number(r.score).toFixed(1) : '-';
+      const dir = (r.direction || '').toUpperCase();
+      return `
+        <tr>
+          <td style="padding:.45rem; border-bottom:1px solid #222;">${when}</td>
+          <td style="padding:.45rem; border-bottom:1px solid #222;">${r.symbol || '-'}</td>
+          <td style="padding:.45rem; border-bottom:1px solid #222;">${r.timeframe || '-'}</td>
+          <td style="padding:.45rem; border-bottom:1px solid #222;">${r.pattern_type || '-'}</td>
+          <td style="padding:.45rem; border-bottom:1px solid #222;">${dir}</td>
+          <td style="padding:.45rem; border-bottom:1px solid #222; text-align:right;">${score}</td>
+        </tr>
+      `;
+    }).join('');
+  } catch (e) {
+    const tbody = document.querySelector('#pat_table tbody');
+    if (tbody) tbody.innerHTML = `<tr><td colspan="6" style="padding:.6rem; color:#f55;">Error cargando patrones</td></tr>`;
+  }
+}
+
+// ===== Cargar Stats =====
+async function loadPatternStats() {
+  try {
+    const resp = await fetch('/patterns/stats');
+    const js = await resp.json();
+    const d = (js && js.ok) ? (js.data || {}) : {};
+
+    // total
+    const wrap = document.getElementById('pat_stats');
+    if (wrap) {
+      const total = (d.total != null) ? d.total : '—';
+      wrap.querySelector(':scope > div')?.replaceWith((() => {
+        const el = document.createElement('div');
+        el.textContent = `Total: ${total}`;
+        return el;
+      })());
+    }
+
+    // por símbolo
+    const ulSym = document.getElementById('pat_stats_symbol');
+    if (ulSym) {
+      const arr = asArr(d.by_symbol);
+      ulSym.innerHTML = arr.map(([sym, cnt]) => `<li>${sym}: ${cnt}</li>`).join('');
+    }
+
+    // por timeframe
+    const ulTf = document.getElementById('pat_stats_tf');
+    if (ulTf) {
+      const arr = asArr(d.by_timeframe);
+      ulTf.innerHTML = arr.map(([tf, cnt]) => `<li>${tf}: ${cnt}</li>`).join('');
+    }
+  } catch (e) {
+    // opcional: mostrar error
+  }
+}
+
+// ===== Auto-refresh =====
+loadPatterns();
+loadPatternStats();
+setInterval(loadPatterns, 15000);     // 15s
+setInterval(loadPatternStats, 30000); // 30s
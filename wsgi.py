@@ -0,0 +1,12 @@
+# wsgi.py
+"""
+Entrada de producción (multi-worker):
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Cada worker importa este módulo después del fork; start_worker decide cuál
+es el líder que corre bot + detector.
+"""
+from main import app, start_worker
+
+start_worker()
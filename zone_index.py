@@ -0,0 +1,229 @@
+# zone_index.py
+import heapq
+import random
+import threading
+
+# =========================================================
+# ÍNDICE DE INTERVALOS DE PRECIO
+# =========================================================
+# Treap ordenado por (lo, seq) y aumentado con el máximo "hi" de cada
+# subárbol: insert/remove en O(log n) esperado y consultas "qué zonas
+# contienen este precio / tocan este rango" en O(log n + k).
+
+
+class _Node:
+    __slots__ = ("lo", "hi", "key", "seq", "prio", "max_hi", "left", "right")
+
+    def __init__(self, lo, hi, key, seq):
+        self.lo = lo
+        self.hi = hi
+        self.key = key
+        self.seq = seq
+        self.prio = random.random()
+        self.max_hi = hi
+        self.left = None
+        self.right = None
+
+
+def _fix(n):
+    m = n.hi
+    if n.left is not None and n.left.max_hi > m:
+        m = n.left.max_hi
+    if n.right is not None and n.right.max_hi > m:
+        m = n.right.max_hi
+    n.max_hi = m
+
+
+def _split(n, lo, seq):
+    """Parte en (< (lo, seq), >= (lo, seq))."""
+    if n is None:
+        return None, None
+    if (n.lo, n.seq) < (lo, seq):
+        l, r = _split(n.right, lo, seq)
+        n.right = l
+        _fix(n)
+        return n, r
+    l, r = _split(n.left, lo, seq)
+    n.left = r
+    _fix(n)
+    return l, n
+
+
+def _merge(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prio > b.prio:
+        a.right = _merge(a.right, b)
+        _fix(a)
+        return a
+    b.left = _merge(a, b.left)
+    _fix(b)
+    return b
+
+
+def _remove(n, lo, seq):
+    if n is None:
+        return None
+    if n.seq == seq:
+        return _merge(n.left, n.right)
+    if (lo, seq) < (n.lo, n.seq):
+        n.left = _remove(n.left, lo, seq)
+    else:
+        n.right = _remove(n.right, lo, seq)
+    _fix(n)
+    return n
+
+
+class IntervalIndex:
+    """Intervalos cerrados [lo, hi] identificados por una key hashable única."""
+
+    def __init__(self):
+        self._root = None
+        self._bounds = {}  # key -> (lo, hi, seq)
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def __contains__(self, key):
+        return key in self._bounds
+
+    def insert(self, key, lo: float, hi: float):
+        if lo > hi:
+            lo, hi = hi, lo
+        if key in self._bounds:
+            self.remove(key)
+        self._seq += 1
+        self._bounds[key] = (lo, hi, self._seq)
+        l, r = _split(self._root, lo, self._seq)
+        self._root = _merge(_merge(l, _Node(lo, hi, key, self._seq)), r)
+
+    def remove(self, key) -> bool:
+        b = self._bounds.pop(key, None)
+        if b is None:
+            return False
+        self._root = _remove(self._root, b[0], b[2])
+        return True
+
+    def bounds(self, key):
+        b = self._bounds.get(key)
+        return None if b is None else b[:2]
+
+    def overlap(self, lo: float, hi: float) -> list:
+        """Keys de los intervalos que intersectan [lo, hi]."""
+        out = []
+        stack = [self._root]
+        while stack:
+            n = stack.pop()
+            if n is None or n.max_hi < lo:
+                continue
+            stack.append(n.left)
+            if n.lo <= hi:
+                if n.hi >= lo:
+                    out.append(n.key)
+                stack.append(n.right)
+        return out
+
+    def stab(self, price: float) -> list:
+        """Keys de los intervalos que contienen el precio."""
+        return self.overlap(price, price)
+
+
+# =========================================================
+# LIBRO DE ZONAS ACTIVAS (PRZ + niveles res/sup/tsl)
+# =========================================================
+class Zone:
+    __slots__ = ("key", "symbol", "kind", "tf", "lo", "hi", "expires_at", "meta")
+
+    def __init__(self, key, symbol, kind, tf, lo, hi, expires_at, meta):
+        self.key = key
+        self.symbol = symbol
+        self.kind = kind
+        self.tf = tf
+        self.lo = lo
+        self.hi = hi
+        self.expires_at = expires_at
+        self.meta = meta
+
+    def as_dict(self) -> dict:
+        d = {k: getattr(self, k) for k in ("key", "symbol", "kind", "tf", "lo", "hi", "expires_at")}
+        d.update(self.meta)
+        return d
+
+
+class ZoneBook:
+    """
+    Zonas de precio vivas de todos los símbolos: un IntervalIndex por símbolo
+    para consultar "qué zonas contiene o cruzó esta vela" en O(log n + k), y
+    un heap por vencimiento para expirar sin recorrer el libro.
+    Un nivel (res/sup/tsl) es una zona con lo == hi.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = {}   # symbol -> IntervalIndex
+        self._zones = {}   # key -> Zone
+        self._expiry = []  # heap (expires_at, key); entradas viejas se ignoran
+
+    def __len__(self):
+        return len(self._zones)
+
+    def upsert(self, key, symbol, kind, lo, hi, tf=None, expires_at=None, **meta) -> Zone:
+        if lo > hi:
+            lo, hi = hi, lo
+        z = Zone(key, symbol, kind, tf, lo, hi, expires_at, meta)
+        with self._lock:
+            self._zones[key] = z
+            self._index.setdefault(symbol, IntervalIndex()).insert(key, lo, hi)
+            if expires_at is not None:
+                heapq.heappush(self._expiry, (expires_at, key))
+        return z
+
+    def remove(self, key):
+        with self._lock:
+            return self._remove(key)
+
+    def _remove(self, key):
+        z = self._zones.pop(key, None)
+        if z is not None:
+            self._index[z.symbol].remove(key)
+        return z
+
+    def get(self, key):
+        return self._zones.get(key)
+
+    def hits(self, symbol, low: float, high: float, kinds=None) -> list:
+        """Zonas del símbolo que intersectan el rango de la vela [low, high]."""
+        with self._lock:
+            index = self._index.get(symbol)
+            if index is None:
+                return []
+            out = [self._zones[k] for k in index.overlap(low, high)]
+        if kinds is not None:
+            out = [z for z in out if z.kind in kinds]
+        return out
+
+    def expire(self, now_ms: int) -> list:
+        """Retira las zonas vencidas; O(k log n) para k vencidas."""
+        out = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now_ms:
+                exp, key = heapq.heappop(self._expiry)
+                z = self._zones.get(key)
+                # la zona pudo reemplazarse con otro vencimiento
+                if z is not None and z.expires_at == exp:
+                    out.append(self._remove(key))
+        return out
+
+    def zones(self, symbol=None, kind=None) -> list:
+        with self._lock:
+            return [
+                z.as_dict() for z in self._zones.values()
+                if (symbol is None or z.symbol == symbol) and (kind is None or z.kind == kind)
+            ]
+
+
+# libro compartido por detector (PRZ) y bot_loop (niveles)
+ZONES = ZoneBook()